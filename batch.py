@@ -0,0 +1,303 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from duty_scheduler import DutyScheduler
+from form_cache import FormCache
+from form_responses import FormResponses
+from main import (add_backend_arguments, add_solver_arguments, backend_from_args, form_cache_from_args,
+                  solver_config_from_args, validate_break, validate_date, validate_holidays)
+from ra_models import Holidays
+from run_report import run_status
+from solver_config import SolverConfig
+from spreadsheet_backends import SpreadsheetBackend
+from spreadsheet_client import SpreadsheetClient
+
+# the time limit of every solve when neither --timeout nor --time-limit is given
+DEFAULT_TIMEOUT = 600.0
+
+# seconds a solve may run past its time limit (to build the model and explain an infeasible schedule)
+# before its process is stopped
+TIMEOUT_GRACE = 60.0
+
+
+def load_communities(path: str) -> list[dict]:
+    '''
+    Reads the community definitions of a batch, a JSON list of objects with the answers main.py asks for:
+    {"title": ..., "form": url or path of the form responses, "start_date": "yyyy-mm-dd", "end_date": "yyyy-mm-dd",
+    "holidays": "yyyy-mm-dd, yyyy-mm-dd", "break": "yyyy-mm-dd to yyyy-mm-dd", "half_staff": [names]}
+
+    Parameters:
+      path - path of the JSON file
+
+    Returns:
+      the communities, with the dates parsed
+    '''
+    with open(path) as communities_file:
+        definitions = json.load(communities_file)
+
+    communities = []
+    for definition in definitions:
+        title = definition.get('title')
+        start_date = validate_date(definition.get('start_date', ''))
+        end_date = validate_date(definition.get('end_date', ''))
+        holidays = validate_holidays(definition.get('holidays', ''))
+        break_days = validate_break(definition.get('break', ''))
+        if not title or not definition.get('form'):
+            raise ValueError(f'Every community needs a title and a form: {definition}')
+        if start_date is None or end_date is None or start_date > end_date:
+            raise ValueError(f'{title}: invalid start or end date')
+        if holidays is None or break_days is None:
+            raise ValueError(f'{title}: invalid holidays or break')
+        communities.append({
+            'title': title,
+            'form': definition['form'],
+            'start_date': start_date,
+            'end_date': end_date,
+            'holidays': Holidays(holidays if holidays else [], break_days if break_days else []),
+            'half_staff': definition.get('half_staff', []),
+        })
+
+    titles = [community['title'] for community in communities]
+    if len(set(titles)) != len(titles):
+        raise ValueError('Every community needs a different title')
+    return communities
+
+
+def solve_community(community: dict, form_responses: FormResponses, solver_config: SolverConfig) -> dict:
+    '''
+    Creates the schedule of one community (runs in a worker process)
+
+    Parameters:
+      community - the community definition
+      form_responses - the form responses, column by column (they pickle faster than the RA availabilities)
+      solver_config - search parameters and time limits for the solver
+
+    Returns:
+      the status, the schedule, the RAs, the days per month, the seconds spent and the scheduler output
+    '''
+    output = io.StringIO()
+    start = time.perf_counter()
+    result = {'title': community['title']}
+    # every community prints its whole schedule, keep them from interleaving
+    with contextlib.redirect_stdout(output):
+        scheduler = DutyScheduler(community['start_date'], community['end_date'], form_responses.availabilities(),
+                                  community['holidays'], community['half_staff'], solver_config=solver_config,
+                                  form_responses=form_responses)
+        solved = False
+        try:
+            result['schedule'], result['ras'] = scheduler.create_or_model()
+            result['days_per_month'] = scheduler.days_per_month
+            solved = True
+        except SystemExit:
+            # the scheduler exits when there is no schedule
+            pass
+    result['status'] = run_status(solved, scheduler.feasibility_problems, scheduler.solver_stats)
+    result['seconds'] = time.perf_counter() - start
+    result['output'] = output.getvalue()
+    return result
+
+
+def solve_in_process(connection, community: dict, form_responses: FormResponses, solver_config: SolverConfig) -> None:
+    '''
+    Solves the schedule of a community in a process of its own and sends the result back
+
+    Parameters:
+      connection - the end of the pipe the result is sent through
+      community - the community definition
+      form_responses - the form responses, column by column
+      solver_config - search parameters and time limits for the solver
+
+    Returns: None
+    '''
+    try:
+        result = solve_community(community, form_responses, solver_config)
+    except Exception as error:
+        result = {'title': community['title'], 'status': 'error', 'error': repr(error)}
+    connection.send(result)
+    connection.close()
+
+
+def run_batch(communities: list[dict], backend: SpreadsheetBackend, solver_config: SolverConfig = SolverConfig(),
+              num_processes: int = None, timeout: float = None, live_formulas: bool = False,
+              form_cache: FormCache = None, refresh_form: bool = False) -> list[dict]:
+    '''
+    Creates and publishes the schedules of several communities at the same time: the forms are read
+    and the schedules are published in threads, every schedule is solved in a process of its own
+    (at most num_processes at a time), which is stopped if it runs too long past its time limit
+
+    Parameters:
+      communities - the community definitions (from load_communities)
+      backend - where the spreadsheets are read from and written to
+      solver_config - search parameters and time limits for every solve
+      num_processes - number of schedules solved at the same time (defaults to the number of cores)
+      timeout - time limit in seconds for every solve (defaults to the time limit of the solver configuration,
+        or DEFAULT_TIMEOUT if it has none)
+      live_formulas - whether the per RA tallies are formulas that update when the schedule is edited
+      form_cache - snapshots of the form responses from earlier runs (None to always read every response)
+      refresh_form - whether to read every response even if there is a snapshot
+
+    Returns:
+      the result of every community: title, status, seconds, spreadsheet id and the scheduler output
+    '''
+    cores = os.cpu_count() or 1
+    num_processes = min(num_processes or cores, len(communities))
+    if solver_config.num_workers == 0:
+        # share the cores between the solves instead of every solve using all of them
+        solver_config = replace(solver_config, num_workers=max(1, cores // num_processes))
+    if timeout is not None:
+        time_limit = solver_config.max_time_in_seconds
+        solver_config = replace(solver_config, max_time_in_seconds=min(
+            timeout, time_limit) if time_limit is not None else timeout)
+    if solver_config.max_time_in_seconds is None:
+        # a solve with no time limit could keep its process forever
+        solver_config = replace(solver_config, max_time_in_seconds=DEFAULT_TIMEOUT)
+    timeout = solver_config.max_time_in_seconds
+
+    clients = [SpreadsheetClient(community['start_date'], community['title'], backend, form_cache)
+               for community in communities]
+    results = [{'title': community['title'], 'status': 'not started'} for community in communities]
+
+    def read_form(idx: int) -> FormResponses:
+        return clients[idx].get_form_responses(communities[idx]['form'], refresh_form)
+
+    def publish(idx: int, result: dict) -> None:
+        try:
+            result['spreadsheet'] = clients[idx].publish(
+                result.pop('schedule'), result.pop('ras'), result.pop('days_per_month'), live_formulas)
+        except Exception as error:
+            result['status'] = 'publish failed'
+            result['error'] = repr(error)
+        results[idx] = result
+
+    with ThreadPoolExecutor() as threads:
+        forms = [threads.submit(read_form, idx) for idx in range(len(communities))]
+        waiting = []
+        for idx, form in enumerate(forms):
+            try:
+                waiting.append((idx, form.result()))
+            except Exception as error:
+                results[idx] = {'title': communities[idx]['title'], 'status': 'form failed', 'error': repr(error)}
+
+        publishing = []
+        # the processes are started by a server process without the threads of this one (forking a process
+        # with threads running can deadlock the child)
+        context = multiprocessing.get_context('forkserver')
+        # the running solves: the end of the pipe of their result -> (community index, process, deadline)
+        running = {}
+        while waiting or running:
+            while waiting and len(running) < num_processes:
+                idx, form_responses = waiting.pop(0)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=solve_in_process,
+                                           args=(sender, communities[idx], form_responses, solver_config))
+                process.start()
+                sender.close()
+                # the deadline starts when the solve does, not when it was queued
+                running[receiver] = (idx, process, time.perf_counter() + timeout + TIMEOUT_GRACE)
+
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            ready = multiprocessing.connection.wait(list(running), max(next_deadline - time.perf_counter(), 0))
+            for receiver in ready:
+                idx, process, _ = running.pop(receiver)
+                try:
+                    result = receiver.recv()
+                except EOFError:
+                    # the process died without a result
+                    result = None
+                receiver.close()
+                process.join()
+                if result is None:
+                    result = {'title': communities[idx]['title'], 'status': 'error',
+                              'error': f'the solve exited with code {process.exitcode}'}
+                if result['status'] == 'solved':
+                    publishing.append(threads.submit(publish, idx, result))
+                else:
+                    results[idx] = result
+            # stop the solves that did not stop at their time limit
+            now = time.perf_counter()
+            for receiver, (idx, process, deadline) in list(running.items()):
+                if receiver not in ready and deadline <= now:
+                    process.terminate()
+                    process.join()
+                    receiver.close()
+                    del running[receiver]
+                    results[idx] = {'title': communities[idx]['title'], 'status': 'timed out'}
+        for published in publishing:
+            published.result()
+    return results
+
+
+def print_report(results: list[dict], seconds: float) -> None:
+    '''
+    Prints the status of every community of a batch
+
+    Parameters:
+      results - the results of run_batch
+      seconds - how long the batch took
+
+    Returns: None
+    '''
+    for result in results:
+        line = f'{result["title"]}: {result["status"]}'
+        if 'seconds' in result:
+            line += f' in {result["seconds"]:.1f}s'
+        if 'spreadsheet' in result:
+            line += f', published to {result["spreadsheet"]}'
+        if 'error' in result:
+            line += f' ({result["error"]})'
+        print(line)
+        if result['status'] in ['infeasible', 'no solution']:
+            # the reason the scheduler gave
+            reason = result['output'].split('Schedule is infeasible:')[-1].split('Conflicting constraints:')[-1]
+            for reason_line in reason.strip().splitlines()[:10]:
+                print(f'  {reason_line.strip()}')
+    solved = sum(result['status'] == 'solved' for result in results)
+    print(f'{solved} of {len(results)} schedules published in {seconds:.1f}s')
+
+
+def parse_args(args: list[str] = None) -> argparse.Namespace:
+    '''
+    Parses the command line flags for a batch
+
+    Parameters:
+      args - the command line arguments (defaults to sys.argv)
+
+    Returns:
+      the parsed flags
+    '''
+    parser = argparse.ArgumentParser(description='Creates the RA duty schedules of several communities')
+    parser.add_argument('communities', help='JSON file with the definition of every community')
+    parser.add_argument('--processes', type=int, help='number of schedules solved at the same time '
+                        '(defaults to the number of cores)')
+    parser.add_argument('--timeout', type=float, help='time limit in seconds for every schedule (defaults to '
+                        f'--time-limit, or {DEFAULT_TIMEOUT:.0f} if neither is given), a solve still running '
+                        f'{TIMEOUT_GRACE:.0f}s after it is stopped')
+    parser.add_argument('--report', help='path of a JSON file to write the status of every community to')
+    add_solver_arguments(parser)
+    add_backend_arguments(parser)
+    return parser.parse_args(args)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    try:
+        communities = load_communities(args.communities)
+    except (OSError, ValueError) as error:
+        print(error)
+        sys.exit(0)
+    start = time.perf_counter()
+    results = run_batch(communities, backend_from_args(args), solver_config_from_args(args),
+                        args.processes, args.timeout, args.live_formulas, form_cache_from_args(args), args.refresh_form)
+    print_report(results, time.perf_counter() - start)
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump([{key: value for key, value in result.items() if key != 'output'} for result in results],
+                      report_file, indent=2)
@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import io
+import json
+import time
+from constants import ModelMode, ObjectiveMode
+from duty_scheduler import DutyScheduler
+from instance_generator import generate_instance
+from run_report import run_status, stage_objectives
+from solver_config import SolverConfig
+
+
+def run_benchmark(num_ras: int, num_days: int, seed: int = 0, blackout_density: float = 0.03,
+                  returner_share: float = 0.6, break_length: int = 5, model_mode: ModelMode = ModelMode.DAY,
+                  objective_mode: ObjectiveMode = ObjectiveMode.LEXICOGRAPHIC,
+                  solver_config: SolverConfig = SolverConfig()) -> dict:
+    '''
+    Creates a synthetic schedule and times every phase of creating it
+
+    Parameters:
+      num_ras - number of RAs on staff
+      num_days - number of days of duty
+      seed - seed for the random generator
+      blackout_density - average share of the days every RA cannot do
+      returner_share - share of the RAs who have been an RA before
+      break_length - number of days of the break
+      model_mode - the model mode of the scheduler
+      objective_mode - the objective mode of the scheduler
+      solver_config - search parameters and time limits for the solver
+
+    Returns:
+      the instance, the seconds spent in every phase, the model size, the solver status and the objectives
+    '''
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        num_ras, num_days, seed=seed, blackout_density=blackout_density,
+        returner_share=returner_share, break_length=break_length)
+    output = io.StringIO()
+    start = time.perf_counter()
+    # the scheduler prints the whole schedule, keep the benchmark output readable
+    with contextlib.redirect_stdout(output):
+        scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff,
+                                  model_mode=model_mode, objective_mode=objective_mode,
+                                  solver_config=solver_config)
+        solved = False
+        try:
+            scheduler.create_or_model()
+            solved = True
+        except SystemExit:
+            # the scheduler exits when there is no schedule
+            pass
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'num_ras': num_ras,
+        'num_days': num_days,
+        'seed': seed,
+        'blackout_density': blackout_density,
+        'returner_share': returner_share,
+        'break_length': break_length,
+        'model_mode': model_mode.name,
+        'objective_mode': objective_mode.name,
+        'status': run_status(solved, scheduler.feasibility_problems, scheduler.solver_stats),
+        'seconds': round(elapsed, 4),
+        'timings': {phase: round(seconds, 4) for phase, seconds in scheduler.timings.items()},
+        **scheduler.model_size,
+        'solver_stats': scheduler.solver_stats,
+        'memory_estimate': scheduler.memory_estimate,
+        # penalty and reward (or weighted), from the solver statistics
+        **stage_objectives(scheduler.solver_stats),
+    }
+    return result
+
+
+def run_suite(ras_counts: list[int], day_counts: list[int], seeds: list[int], output_path: str,
+              solver_config: SolverConfig = SolverConfig(), **instance_options) -> list[dict]:
+    '''
+    Runs the benchmark for every combination of staff size, schedule length and seed and writes the results as JSON
+
+    Parameters:
+      ras_counts - numbers of RAs on staff
+      day_counts - numbers of days of duty
+      seeds - seeds for the random generator
+      output_path - path of the JSON file to write
+      solver_config - search parameters and time limits for the solver
+      instance_options - other options of run_benchmark (blackout_density, returner_share, break_length, model_mode,
+        objective_mode)
+
+    Returns:
+      the results of every run
+    '''
+    results = []
+    for num_ras in ras_counts:
+        for num_days in day_counts:
+            for seed in seeds:
+                result = run_benchmark(num_ras, num_days, seed, solver_config=solver_config, **instance_options)
+                print(f'{num_ras} RAs, {num_days} days, seed {seed}: {result["status"]} in {result["seconds"]:.2f}s, '
+                      f'{result.get("variables")} variables, {result.get("constraints")} constraints')
+                results.append(result)
+    with open(output_path, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    return results
+
+
+def compare_model_modes(num_ras: int = 40, seed: int = 0,
+                        solver_config: SolverConfig = SolverConfig(max_time_in_seconds=60.0)) -> list[dict]:
+    '''
+    Builds and solves the same 120 day fall term with every model mode and prints the solve time and model size
+
+    Parameters:
+      num_ras - number of RAs on staff
+      seed - seed for the random generator
+      solver_config - search parameters and time limits for the solver
+
+    Returns:
+      the result of every mode (from run_benchmark)
+    '''
+    results = []
+    for mode in ModelMode:
+        result = run_benchmark(num_ras, 120, seed, model_mode=mode, solver_config=solver_config)
+        # the model size is only known if the model was built (not if the feasibility check failed)
+        assignments = result.get('families', {}).get('assignments', {})
+        print(f'{mode.name}: {result["status"]} in {result["seconds"]:.2f}s, '
+              f'{result.get("variables")} variables, {result.get("constraints")} constraints '
+              f'({assignments.get("variables")} assignment variables, '
+              f'{assignments.get("constraints")} assignment constraints)')
+        results.append(result)
+    return results
+
+
+def compare_objective_modes(num_ras: int = 40, seed: int = 0,
+                            solver_config: SolverConfig = SolverConfig(max_time_in_seconds=60.0)) -> list[dict]:
+    '''
+    Builds and solves the same 120 day fall term with every objective mode and prints the solve time and objectives
+
+    Parameters:
+      num_ras - number of RAs on staff
+      seed - seed for the random generator
+      solver_config - search parameters and time limits for the solver
+
+    Returns:
+      the result of every mode (from run_benchmark)
+    '''
+    results = []
+    for mode in ObjectiveMode:
+        result = run_benchmark(num_ras, 120, seed, objective_mode=mode, solver_config=solver_config)
+        objectives = ', '.join(f'{stage} {result[stage]}' for stage in ['penalty', 'reward', 'weighted']
+                               if stage in result)
+        print(f'{mode.name}: {result["status"]} in {result["seconds"]:.2f}s, {objectives}')
+        results.append(result)
+    return results
+
+
+def parse_args(args: list[str] = None) -> argparse.Namespace:
+    '''
+    Parses the command line flags for the benchmark
+
+    Parameters:
+      args - the command line arguments (defaults to sys.argv)
+
+    Returns:
+      the parsed flags
+    '''
+    parser = argparse.ArgumentParser(description='Times the scheduler on synthetic schedules')
+    parser.add_argument('--ras', type=int, nargs='+', default=[20, 40, 80], help='numbers of RAs on staff')
+    parser.add_argument('--days', type=int, nargs='+', default=[120, 240], help='numbers of days of duty')
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0], help='seeds for the random generator')
+    parser.add_argument('--blackout-density', type=float, default=0.03,
+                        help='average share of the days every RA cannot do')
+    parser.add_argument('--returner-share', type=float, default=0.6, help='share of the RAs who are returners')
+    parser.add_argument('--break-length', type=int, default=5, help='number of days of the break')
+    parser.add_argument('--model-mode', choices=[mode.name for mode in ModelMode], default=ModelMode.DAY.name)
+    parser.add_argument('--time-limit', type=float, default=60.0, help='wall clock limit for every solve in seconds')
+    parser.add_argument('--output', default='benchmark_results.json', help='path of the JSON file to write')
+    parser.add_argument('--compare-modes', action='store_true',
+                        help='compare the model and objective modes on a 40 RA fall term instead')
+    return parser.parse_args(args)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    solver_config = SolverConfig(max_time_in_seconds=args.time_limit)
+    if args.compare_modes:
+        compare_model_modes(solver_config=solver_config)
+        compare_objective_modes(solver_config=solver_config)
+    else:
+        run_suite(args.ras, args.days, args.seeds, args.output, solver_config,
+                  blackout_density=args.blackout_density, returner_share=args.returner_share,
+                  break_length=args.break_length, model_mode=ModelMode[args.model_mode])
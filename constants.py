@@ -31,6 +31,24 @@ class Distribution(Enum):
     BACKLOAD = 1
     NONE = 2
 
+class ModelMode(Enum):
+    # one boolean per (RA, day, shift slot); the slots of a day are interchangeable
+    SHIFT = 0
+    # one boolean per (RA, day) with a coverage constraint per day
+    DAY = 1
+
+class ObjectiveMode(Enum):
+    # minimize the penalties, then maximize the distribution rewards keeping the penalties optimal
+    LEXICOGRAPHIC = 0
+    # minimize the penalties minus the distribution rewards in a single solve
+    WEIGHTED = 1
+
+class BudgetAction(Enum):
+    # make the model smaller (fewer workers, one window at a time, no consecutive day penalty) until it fits
+    DEGRADE = 0
+    # stop before the model is built
+    REFUSE = 1
+
 @ dataclass(frozen=True)
 class Constants:
     PPL_PER_SHIFT_WEEKDAY: int
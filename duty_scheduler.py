@@ -1,11 +1,28 @@
-from datetime import datetime, date, timedelta
-import math
+from dataclasses import asdict, replace
+from datetime import date
+import os
 import sys
-from ra_models import DaysOfWeek, Holidays
+import time
+from ra_models import Holidays
 from ortools.sat.python import cp_model
-from schedule_models import Day, ScheduleDay
-from constants import DAYS_OF_WEEK, Semester, WEEKENDS, Distribution
+from schedule_models import Calendar, Day, ScheduleDay
+from constants import DAYS_OF_WEEK, BudgetAction, Semester, Distribution, ModelMode, ObjectiveMode
 from ra_models import RaAvailability, Ra
+from solver_config import SolverConfig
+from feasibility import FeasibilityChecker, explain_infeasibility
+from form_responses import FormResponses, bits
+from warm_start import create_warm_start
+from schedule_snapshot import ScheduleSnapshot
+from point_rules import POINT_RULES, evaluate_point_rules
+from model_estimate import ModelEstimate, estimate_model
+from run_report import record_time, solver_statistics
+
+# the most seconds spent completing the hint of a schedule (the time also counts against the time limit of the solve)
+HINT_TIME_LIMIT = 10.0
+
+# the most of the time left the penalty stage leaves to the distribution reward stage (when the reward stage
+# has no time limit of its own, or a longer one)
+REWARD_TIME_SHARE = 0.5
 
 
 class DutyScheduler:
@@ -18,7 +35,11 @@ class DutyScheduler:
     '''
 
     def __init__(self, start_date: date, end_date: date, ra_availabilities: list[RaAvailability],
-                 holidays: Holidays = Holidays(), half_staff: list[str] = []) -> None:
+                 holidays: Holidays = Holidays(), half_staff: list[str] = [],
+                 model_mode: ModelMode = ModelMode.DAY,
+                 objective_mode: ObjectiveMode = ObjectiveMode.LEXICOGRAPHIC,
+                 solver_config: SolverConfig = SolverConfig(), point_rules: tuple = None,
+                 form_responses: FormResponses = None) -> None:
         '''
         Initializes attributes
 
@@ -26,18 +47,111 @@ class DutyScheduler:
           start_date - first day of duty
           end_date - last day of duty
           ra_availabilities - all the responses from the RAs that indicate their availabilities & preferences
+          holidays - the holidays and breaks in the schedule
+          half_staff - names of the RAs on half staff
+          model_mode - whether the model has a variable per (RA, day) or per (RA, day, shift)
+          objective_mode - whether penalties and distribution rewards are optimized one after the other or as one sum
+          solver_config - search parameters and time limits for the solver
+          point_rules - the rules that add points for the holidays and the break (None for the rules of the semester)
+          form_responses - the form responses the RA availabilities were read from, column by column
+            (None to put the RA availabilities in columns)
         '''
         self.start_date = start_date
         self.end_date = end_date
         self.semester_type = self.determine_semester_season()
         self.ra_availabilities = ra_availabilities
-
-        day_dict_pts = self.create_day_dict()
+        self.form_responses = form_responses
+        # seconds spent in every phase of creating the schedule
+        self.timings = {}
+        # number of variables and constraints of the last model built (in total and by family)
+        self.model_size = {}
+        # statistics of every solve, in the order they ran
+        self.solver_stats = []
+        # the problems the feasibility check found before the model was built
+        self.feasibility_problems = []
+        # the predicted size and memory of the model, and what was given up to fit the memory budget
+        self.memory_estimate = {}
+        self.degradations = []
+        self.consecutive_days_penalty = True
+
+        start = time.perf_counter()
+        day_dict_pts = self.create_day_dict(holidays)
+        self.record_time('create_day_dict', start)
         self.day_dict = day_dict_pts[0]
         self.total_pts = day_dict_pts[1]
         self.days_per_month = day_dict_pts[2]
         self.half_staff = half_staff
         self.holidays = holidays
+        self.point_rules = point_rules if point_rules is not None else POINT_RULES[self.semester_type]
+        # points and break days of every day, before the point rules are applied
+        self.day_pts = self.calendar.pts
+        self.is_break = self.calendar.is_break
+        self.model_mode = model_mode
+        self.objective_mode = objective_mode
+        self.solver_config = solver_config
+
+    @classmethod
+    def from_snapshot(cls, snapshot: ScheduleSnapshot, **kwargs) -> 'DutyScheduler':
+        '''
+        Creates a scheduler with the inputs of an earlier run
+
+        Parameters:
+          snapshot - the snapshot of the run
+          kwargs - the other arguments of the scheduler (model_mode, objective_mode, solver_config)
+
+        Returns:
+          the scheduler
+        '''
+        return cls(snapshot.start_date, snapshot.end_date, snapshot.availabilities(), snapshot.holidays(),
+                   snapshot.half_staff, **kwargs)
+
+    def save_snapshot(self, path: str, schedule: list[ScheduleDay], ras: list[Ra]) -> ScheduleSnapshot:
+        '''
+        Writes the inputs and the schedule of this run to a snapshot file
+
+        Parameters:
+          path - path of the file
+          schedule - the schedule for every day
+          ras - the list of RAs (with their points)
+
+        Returns:
+          the snapshot
+        '''
+        snapshot = ScheduleSnapshot.from_schedule(self.start_date, self.end_date, self.ra_availabilities,
+                                                  self.holidays, self.half_staff, schedule, ras)
+        snapshot.save(path)
+        return snapshot
+
+    def record_time(self, phase: str, start: float) -> float:
+        '''
+        Adds the time since start to the time spent in a phase
+
+        Parameters:
+          phase - name of the phase
+          start - time.perf_counter() value at the start of the phase
+
+        Returns:
+          the current time.perf_counter() value (the start of the next phase)
+        '''
+        return record_time(self.timings, phase, start)
+
+    def count_model_family(self, model: cp_model.CpModel, family_sizes: dict[str, dict[str, int]],
+                           family: str) -> None:
+        '''
+        Records the variables and constraints added to the model since the previous family was counted
+
+        Parameters:
+          model - the OR model
+          family_sizes - the variables and constraints of every family counted so far
+          family - name of the family of constraints
+
+        Returns: None
+        '''
+        proto = model.proto
+        family_sizes[family] = {
+            'variables': len(proto.variables) - sum(size['variables'] for size in family_sizes.values()),
+            'constraints': len(proto.constraints) - sum(size['constraints'] for size in family_sizes.values()),
+        }
 
     def determine_semester_season(self) -> Semester:
         '''
@@ -58,12 +172,13 @@ class DutyScheduler:
         else:
             raise ValueError('Semester type cannot be determined')
 
-    def create_day_dict(self) -> tuple[dict[date, Day], int]:
+    def create_day_dict(self, holidays: Holidays = None) -> tuple[dict[date, Day], int, dict[str, int]]:
         '''
-        Creates a dictionary of information for every single day from start_date to end_date
+        Creates the calendar of every single day from start_date to end_date, a dictionary of its days
         and calculates total points, excluding special cases or holidays
 
-        Parameters: None
+        Parameters:
+          holidays - the holidays and breaks (flagged in the calendar)
 
         Returns:
           a dictionary of info about all days in schedule
@@ -71,85 +186,27 @@ class DutyScheduler:
           the total number of points in the schedule
           a dictionary of how many days per month
         '''
-        num_days = (self.end_date - self.start_date).days + 1
-        cur_date = self.start_date
-        day_idx = self.start_date.weekday()
-        days = {}
-        total_pts = 0
-        months = {}
-
-        for _ in range(num_days):
-            cur_day = Day(cur_date, DAYS_OF_WEEK[day_idx])
-            days[cur_date] = cur_day
-            total_pts += cur_day.pts * cur_day.ppl
-
-            month = cur_date.strftime('%B')
-
-            if month in months:
-                months[month] += 1
-            else:
-                months[month] = 1
-
-            cur_date = cur_date + timedelta(days=1)
-            day_idx = (day_idx + 1) % 7
-        return days, total_pts, months
+        self.calendar = Calendar(self.start_date, self.end_date, holidays)
+        days = {day.date: day for day in self.calendar.days()}
+        return days, self.calendar.total_pts(), self.calendar.days_per_month()
 
     def revise_total_pts(self) -> None:
         '''
-        Handles special case day points (holidays) and
-        evens out the total number of points so that all RAs can have an equal amount of points
+        Handles special case day points (holidays and the break) with the point rules,
+        can be called again (e.g. for every solve) without counting the points twice
 
         Parameters: None
 
         Returns: None
         '''
-        # handles all mandatory holidays that make previous day 24 hour shift
-        for holiday in self.holidays.double_len:
-            prev_shift = self.day_dict[holiday - timedelta(days=1)]
-            prev_shift.add_pts(1)
-            self.total_pts += prev_shift.ppl
-
-        # handles breaks (including the surrounding weekends)
-        # Thanksgiving: assume the dates given are Wednesday - Sunday
-        # add point to Tuesday before
-        if self.semester_type == Semester.FALL:
-            self.holidays.add_previous_day()
-            for holiday in self.holidays.breaks:
-                day = self.day_dict[holiday]
-                if (day.day_of_week == DaysOfWeek.SUNDAY or
-                    day.day_of_week == DaysOfWeek.TUESDAY or
-                        day.day_of_week in WEEKENDS):
-                    pt_increase = 1
-                else:
-                    pt_increase = 2
-                day.add_pts(pt_increase)
-                self.total_pts += pt_increase * day.ppl
-        # Spring break: assume the dates given are Saturday - Sunday (1 week + 1 day)
-        # add point to Friday before
-        elif self.semester_type == Semester.SPRING:
-            self.holidays.add_previous_day()
-            for holiday in self.holidays.breaks:
-                day = self.day_dict[holiday]
-                day.add_pts(1)
-                self.total_pts += day.ppl
-
-    def no_days_for_all_ras(self, ras: list[Ra]) -> dict[DaysOfWeek, list[Ra]]:
-        '''
-        Creates a dict that assigns every day of the week with a list of RAs that cannot work that day
-
-        Parameters:
-          ras - a list of RA objects
-
-        Returns:
-          a dictionary that with all the RAs that cannot work each day of the week
-        '''
-        no_days_for_ras = {DaysOfWeek.MONDAY: [], DaysOfWeek.TUESDAY: [], DaysOfWeek.WEDNESDAY: [],
-                           DaysOfWeek.THURSDAY: [], DaysOfWeek.FRIDAY: [], DaysOfWeek.SATURDAY: [],
-                           DaysOfWeek.SUNDAY: []}
-        for ra, availability in zip(ras, self.ra_availabilities):
-            for day in availability.no_days:
-                no_days_for_ras[day].append(ra)
-        return no_days_for_ras
+        start = time.perf_counter()
+        day_points = evaluate_point_rules(self.calendar, self.holidays, self.point_rules)
+        self.day_pts = day_points.pts
+        self.total_pts = day_points.total_pts
+        self.is_break = day_points.is_break
+        for day in self.day_dict.values():
+            day.pts = day_points.pts[day.idx]
+        self.record_time('revise_total_pts', start)
 
     def create_ras(self) -> list[Ra]:
         '''
@@ -171,98 +228,616 @@ class DutyScheduler:
                        returner=person.returner, community_returner=person.community_returner))
         return ras
 
+    def create_eligibility(self, ras: list[Ra], all_days: list[Day]) -> list[list[bool]]:
+        '''
+        Determines which days every RA can be on duty, based on their move in date, the dates and days
+        they cannot do, their training at the start of the schedule, and half staff over break
+
+        Parameters:
+          ras - a list of RA objects (in the same order as the RA availabilities)
+          all_days - list of day objects in date order
+
+        Returns:
+          a matrix of RA x day: eligibility[ra_idx][day_idx] is True if the RA can be on duty that day
+        '''
+        # every RA's unavailable days as a bitmask over the schedule, bit i is all_days[i]
+        num_days = len(all_days)
+        first_day = all_days[0].date.toordinal() if all_days else 0
+        all_days_mask = (1 << num_days) - 1
+        # bit i is DAYS_OF_WEEK[i], like the days of the week of the form responses
+        weekday_masks = [0] * len(DAYS_OF_WEEK)
+        break_mask = 0
+        for day_idx, day in enumerate(all_days):
+            weekday_masks[DAYS_OF_WEEK.index(day.day_of_week)] |= 1 << day_idx
+            if self.is_break[day.idx]:
+                break_mask |= 1 << day_idx
+        # new RAs cannot be on duty for the first 2 weeks (to account for shadow shifts)
+        # new RAs to the community (but returners) cannot be on duty for the first 1.5 weeks
+        new_ra_mask = (1 << min(14, num_days)) - 1
+        new_to_community_mask = (1 << min(12, num_days)) - 1
+
+        # the masks are built from the columns of the form responses, without the RA availability objects
+        responses = self.form_responses
+        if responses is None:
+            responses = FormResponses.from_availabilities(self.ra_availabilities, self.start_date)
+        # the dates that cannot be done are a bitmap from the start date of the responses
+        shift = first_day - responses.start_date.toordinal()
+
+        eligibility = []
+        for move_in, no_dates, no_days, ra in zip(responses.move_in, responses.no_dates, responses.no_days, ras):
+            unavailable = 0
+            # an RA isn't scheduled to be on duty before they move in
+            if move_in is not None:
+                unavailable |= (1 << min(max(move_in - first_day, 0), num_days)) - 1
+            # dates and days of the week that cannot be done
+            unavailable |= (no_dates >> shift if shift >= 0 else no_dates << -shift) & all_days_mask
+            for weekday in bits(no_days):
+                unavailable |= weekday_masks[weekday]
+            if not ra.returner:
+                unavailable |= new_ra_mask
+            elif not ra.community_returner:
+                unavailable |= new_to_community_mask
+            # only people on half staff can be on duty during break
+            if not ra.half_staff:
+                unavailable |= break_mask
+            # the binary string has the last day first
+            eligibility.append([bit == '0' for bit in reversed(format(unavailable, f'0{num_days}b'))]
+                               if num_days else [])
+        return eligibility
+
+    def pts_per_ra(self, staff_pts: int, staff_size: int) -> tuple[int, int]:
+        '''
+        Calculates the min and max total points per RA
+
+        Parameters:
+          staff_pts - total points of the shifts worked by the staff
+          staff_size - number of RAs on staff
+
+        Returns:
+          min points per RA
+          max points per RA
+        '''
+        min_pts_per_ra = staff_pts // staff_size
+        if staff_pts % staff_size == 0:
+            max_pts_per_ra = min_pts_per_ra
+        else:
+            max_pts_per_ra = min_pts_per_ra + 1
+        return min_pts_per_ra, max_pts_per_ra
+
+    def check_feasibility(self, all_ras: list[Ra], all_days: list[Day], eligibility: list[list[bool]]) -> None:
+        '''
+        Checks the availabilities for problems that make the schedule impossible before the OR model is built,
+        and stops with a description of the problems if any are found
+
+        Parameters:
+          all_ras - list of RA objects
+          all_days - list of day objects in date order
+          eligibility - the RA x day eligibility matrix
+
+        Returns: None
+        '''
+        min_pts_per_ra, max_pts_per_ra = self.pts_per_ra(self.total_pts, len(all_ras))
+        windows = {
+            'training': range(min(14, len(all_days))),
+            'break': [day_idx for day_idx, day in enumerate(all_days) if self.is_break[day.idx]],
+        }
+        checker = FeasibilityChecker(all_ras, all_days, eligibility, min_pts_per_ra, max_pts_per_ra)
+        problems = checker.check(windows)
+        self.feasibility_problems = problems
+        if problems:
+            print('Schedule is infeasible:')
+            for problem in problems:
+                print(f'  {problem}')
+            sys.exit(0)
+
+    def create_assignments(self, model: cp_model.CpModel, eligible_days: list[list[int]],
+                           eligible_ras: dict[int, list[int]], all_ras: list[Ra],
+                           all_days: list[Day]) -> list[list[cp_model.LinearExprT]]:
+        '''
+        Creates the assignment variables (only for eligible RAs) and the constraints that fill every shift
+
+        Parameters:
+          model - the OR model
+          eligible_days - the indices of the days every RA can be on duty (by RA index)
+          eligible_ras - dictionary: key -> index of a scheduled day, value -> indices of the RAs that can be on duty
+          all_ras - list of RA objects (only used to name the variables in debug mode)
+          all_days - list of day objects in date order
+
+        Returns:
+          a RA x day matrix: on_duty[ra_idx][day_idx] is 1 if the RA is on duty that day, otherwise 0
+          (None for the pairs that are not eligible, built once per pair and shared by every constraint on the pair)
+        '''
+        debug_names = self.solver_config.debug_names
+        day_ppl = self.calendar.ppl
+        on_duty = [[None] * len(all_days) for _ in all_ras]
+        if self.model_mode == ModelMode.SHIFT:
+            # creating boolean variables (the assignments), a RA x day x shift slot tensor
+            assignments = [[None] * len(all_days) for _ in all_ras]
+            for ra_idx, day_indices in enumerate(eligible_days):
+                for day_idx in day_indices:
+                    assignments[ra_idx][day_idx] = [
+                        model.new_bool_var(f'assignment_{all_ras[ra_idx].name}_{all_days[day_idx].date}_shift{shift}'
+                                           if debug_names else '')
+                        for shift in range(day_ppl[day_idx])]
+
+            # exactly 1 RA per shift
+            for day_idx, ra_indices in eligible_ras.items():
+                for shift in range(day_ppl[day_idx]):
+                    model.add_exactly_one(assignments[ra_idx][day_idx][shift] for ra_idx in ra_indices)
+
+            # at most 1 shift per day for an RA
+            for ra_idx, day_indices in enumerate(eligible_days):
+                for day_idx in day_indices:
+                    model.add_at_most_one(assignments[ra_idx][day_idx])
+                    on_duty[ra_idx][day_idx] = sum(assignments[ra_idx][day_idx])
+        else:
+            # one boolean per RA per day, the shift slots of a day are interchangeable
+            for ra_idx, day_indices in enumerate(eligible_days):
+                for day_idx in day_indices:
+                    on_duty[ra_idx][day_idx] = model.new_bool_var(
+                        f'assignment_{all_ras[ra_idx].name}_{all_days[day_idx].date}' if debug_names else '')
+
+            # exactly day.ppl RAs on duty every day
+            for day_idx, ra_indices in eligible_ras.items():
+                model.add(sum(on_duty[ra_idx][day_idx] for ra_idx in ra_indices) == day_ppl[day_idx])
+        return on_duty
+
+    def solve_stage(self, model: cp_model.CpModel, stage: str, time_limit: float,
+                    deadline: float) -> tuple[cp_model.CpSolver, int]:
+        '''
+        Solves the model with its current objective
+
+        Parameters:
+          model - the OR model
+          stage - name of the stage (for the solver statistics)
+          time_limit - time limit in seconds for this stage (None for no limit)
+          deadline - time.monotonic() value by which the whole solve has to finish (None for no limit)
+
+        Returns:
+          the solver
+          the solver status
+        '''
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0.0)
+            time_limit = remaining if time_limit is None else min(time_limit, remaining)
+        solver = cp_model.CpSolver()
+        self.solver_config.apply(solver, time_limit)
+        status = solver.solve(model)
+        self.solver_stats.append(solver_statistics(stage, solver, status))
+        return solver, status
+
+    def hint_solution(self, model: cp_model.CpModel, solver: cp_model.CpSolver) -> None:
+        '''
+        Replaces the hints of the model with the solution found by the solver
+
+        Parameters:
+          model - the OR model
+          solver - a solver that found a solution to the model
+
+        Returns: None
+        '''
+        model.clear_hints()
+        for var_idx, value in enumerate(solver.response_proto.solution):
+            model.add_hint(model.get_int_var_from_proto_index(var_idx), value)
+
+    def hint_from_schedule(self, model: cp_model.CpModel, on_duty: list[list[cp_model.LinearExprT]],
+                           all_ras: list[Ra], all_days: list[Day], hint_schedule: dict[date, list[str]],
+                           deadline: float = None) -> None:
+        '''
+        Hints every variable of the model from a schedule, the penalty variables are found by
+        solving a copy of the model with every assignment fixed to the schedule
+        (the solver spends a long time completing a hint of the assignments alone)
+
+        Parameters:
+          model - the OR model
+          on_duty - RA x day matrix: 1 if the RA is on duty that day (None for the pairs that are not eligible)
+          all_ras - list of RA objects
+          all_days - list of day objects in date order
+          hint_schedule - the schedule: key -> date, value -> names of the RAs on duty
+          deadline - time.monotonic() value by which the solve has to finish (None for no limit)
+
+        Returns: None
+        '''
+        names_on = [set(hint_schedule.get(day.date, [])) for day in all_days]
+        hints = [(assignment, int(ra.name in names_on[day_idx]))
+                 for ra, row in zip(all_ras, on_duty)
+                 for day_idx, assignment in enumerate(row) if assignment is not None]
+        fixed_model = model.clone()
+        for assignment, value in hints:
+            # the clone has the same variable indices, so the assignments can be used in its constraints
+            fixed_model.add(assignment == value)
+        solver, status = self.solve_stage(fixed_model, 'hint', HINT_TIME_LIMIT, deadline)
+        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+            self.hint_solution(model, solver)
+            return
+        # the schedule breaks a hard constraint, only hint the assignments
+        for assignment, value in hints:
+            if isinstance(assignment, cp_model.IntVar):
+                model.add_hint(assignment, value)
+
+    def solve_model(self, model: cp_model.CpModel, penalty: cp_model.LinearExprT,
+                    reward: cp_model.LinearExprT, deadline: float = None) -> tuple[cp_model.CpSolver, int]:
+        '''
+        Solves the model, either lexicographically (minimize the penalties, then maximize the
+        distribution rewards without making the penalties worse) or with one weighted objective
+
+        Parameters:
+          model - the OR model
+          penalty - the total penalty of the soft constraints
+          reward - the total distribution reward
+          deadline - time.monotonic() value by which every stage has to finish (None for no limit), the time
+            of the reward stage is kept out of the time of the penalty stage
+
+        Returns:
+          the solver holding the best solution found
+          the solver status
+        '''
+        config = self.solver_config
+        if self.objective_mode == ObjectiveMode.WEIGHTED:
+            model.minimize(penalty - reward)
+            return self.solve_stage(model, 'weighted', None, deadline)
+
+        # stage 1: minimize the penalties, leaving the reward stage its time
+        penalty_deadline = deadline
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0.0)
+            reward_time = remaining * REWARD_TIME_SHARE
+            if config.reward_time_limit is not None:
+                reward_time = min(reward_time, config.reward_time_limit)
+            penalty_deadline = deadline - reward_time
+        model.minimize(penalty)
+        solver, status = self.solve_stage(model, 'penalty', config.penalty_time_limit, penalty_deadline)
+        if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+            return solver, status
+        print(f'Penalty: {solver.objective_value}')
+
+        # stage 2: keep the penalties at the stage 1 value and maximize the distribution rewards,
+        # starting the search from the stage 1 solution
+        model.add(penalty <= round(solver.objective_value))
+        self.hint_solution(model, solver)
+        model.maximize(reward)
+        if deadline is not None and deadline <= time.monotonic():
+            print('No time was left for the distribution rewards, the distribution preferences were not optimized')
+            return solver, status
+        reward_solver, reward_status = self.solve_stage(model, 'reward', config.reward_time_limit, deadline)
+        if reward_status != cp_model.OPTIMAL and reward_status != cp_model.FEASIBLE:
+            print('The distribution reward stage found no solution in its time limit, '
+                  'the distribution preferences were not optimized')
+            return solver, status
+        print(f'Reward: {reward_solver.objective_value}')
+        return reward_solver, reward_status
+
     def create_or_model(self) -> tuple[list[ScheduleDay], list[Ra]]:
         '''
         Creates the OR model, adding constraints, and solving the problem
         '''
-        # define variables
-        staff_size = len(self.ra_availabilities)
         all_ras = self.create_ras()
-        all_days = self.day_dict.values()
+        self.revise_total_pts()
+        start = time.perf_counter()
+        all_days = list(self.day_dict.values())
+        eligibility = self.create_eligibility(all_ras, all_days)
+        self.check_feasibility(all_ras, all_days, eligibility)
+        start = self.record_time('check_feasibility', start)
+        rolling = self.fit_memory_budget(eligibility, can_roll=True)
+        start = self.record_time('estimate_model', start)
+        if rolling:
+            return self.schedule_windows(all_ras, eligibility)
+        hint_schedule = create_warm_start(all_ras, all_days, eligibility,
+                                          *self.pts_per_ra(self.total_pts, len(all_ras)))
+        self.record_time('warm_start', start)
+        return self.schedule_days(all_ras, eligibility=eligibility, hint_schedule=hint_schedule)
+
+    def resolve(self, previous_schedule: dict[date, list[str]], cutoff_date: date,
+                change_penalty: int = 1) -> tuple[list[ScheduleDay], list[Ra]]:
+        '''
+        Re-solves a published schedule (e.g. after an RA drops out or adds dates they cannot do),
+        keeping every shift before the cutoff date and changing as few later shifts as possible
+
+        Parameters:
+          previous_schedule - the published schedule: key -> date, value -> names of the RAs on duty
+          cutoff_date - the first date that can change
+          change_penalty - penalty for every shift on or after the cutoff date that moves to another RA
+
+        Returns:
+          the schedule for every day
+          the list of RAs (with their points)
+        '''
+        all_ras = self.create_ras()
+        self.revise_total_pts()
+        first_day_idx = min(max((cutoff_date - self.start_date).days, 0), len(self.day_dict))
+        fixed_schedule = {day: names for day, names in previous_schedule.items() if day < cutoff_date}
+        eligibility = self.create_eligibility(all_ras, list(self.day_dict.values()))
+        start = time.perf_counter()
+        self.fit_memory_budget(eligibility, first_day_idx)
+        self.record_time('estimate_model', start)
+        return self.schedule_days(all_ras, first_day_idx, fixed_schedule, previous_schedule, change_penalty,
+                                  eligibility=eligibility)
+
+    def create_rolling_model(self, window_days: int = None,
+                             overlap_days: int = 7) -> tuple[list[ScheduleDay], list[Ra]]:
+        '''
+        Creates the schedule one window at a time instead of with one model over the whole schedule,
+        so long schedules take time and memory proportional to their length
+
+        Every window schedules its days plus overlap_days of the next window, then keeps only its own days.
+        The following window starts from the kept days (points earned, shifts in the current week, the day before).
+
+        Parameters:
+          window_days - number of days per window (None for one window per month)
+          overlap_days - number of days of the next window that are scheduled with every window
+
+        Returns:
+          the schedule for every day
+          the list of RAs (with their points)
+        '''
+        all_ras = self.create_ras()
+        self.revise_total_pts()
+        all_days = list(self.day_dict.values())
+        eligibility = self.create_eligibility(all_ras, all_days)
+        self.check_feasibility(all_ras, all_days, eligibility)
+        start = time.perf_counter()
+        self.fit_memory_budget(eligibility, rolling=True, window_days=window_days, overlap_days=overlap_days)
+        self.record_time('estimate_model', start)
+        return self.schedule_windows(all_ras, eligibility, window_days, overlap_days)
+
+    def rolling_windows(self, window_days: int = None, overlap_days: int = 7) -> list[tuple[int, int, int]]:
+        '''
+        Splits the schedule into the windows of a rolling schedule
+
+        Parameters:
+          window_days - number of days per window (None for one window per month)
+          overlap_days - number of days of the next window that are scheduled with every window
+
+        Returns:
+          for every window: the index of its first day, the index after its last kept day
+          and the index after its last scheduled day
+        '''
+        num_days = len(self.day_dict)
+        if window_days is None:
+            window_lengths = self.calendar.month_lengths()
+        else:
+            window_lengths = [window_days] * -(-num_days // window_days)
+
+        windows = []
+        first_day_idx = 0
+        for window_length in window_lengths:
+            kept_end = min(first_day_idx + window_length, num_days)
+            windows.append((first_day_idx, kept_end, min(kept_end + overlap_days, num_days)))
+            first_day_idx = kept_end
+        return windows
+
+    def schedule_windows(self, all_ras: list[Ra], eligibility: list[list[bool]], window_days: int = None,
+                         overlap_days: int = 7) -> tuple[list[ScheduleDay], list[Ra]]:
+        '''
+        Solves the windows of a rolling schedule one after the other
+
+        Parameters:
+          all_ras - list of RA objects
+          eligibility - the RA x day eligibility matrix
+          window_days - number of days per window (None for one window per month)
+          overlap_days - number of days of the next window that are scheduled with every window
+
+        Returns:
+          the schedule for every day
+          the list of RAs (with their points)
+        '''
+        # the time limit is for the whole schedule: every window gets an equal share of the time that is left,
+        # which solve_model splits between the penalty and the reward stage of the window
+        deadline = None
+        if self.solver_config.max_time_in_seconds is not None:
+            deadline = time.monotonic() + self.solver_config.max_time_in_seconds
+        windows = self.rolling_windows(window_days, overlap_days)
+        fixed_schedule = {}
+        for window_idx, (first_day_idx, kept_end, last_day_idx) in enumerate(windows):
+            window_deadline = None
+            if deadline is not None:
+                now = time.monotonic()
+                window_deadline = now + max(deadline - now, 0.0) / (len(windows) - window_idx)
+            schedule, _ = self.schedule_days(all_ras, first_day_idx, fixed_schedule, last_day_idx=last_day_idx,
+                                             eligibility=eligibility, deadline=window_deadline)
+            for day_schedule in schedule[first_day_idx:kept_end]:
+                fixed_schedule[day_schedule.day.date] = [ra.name for ra in day_schedule.ras_on]
+        return schedule, all_ras
+
+    def estimate_model(self, eligibility: list[list[bool]], first_day_idx: int = 0, rolling: bool = False,
+                       consecutive_days: bool = True, window_days: int = None,
+                       overlap_days: int = 7) -> ModelEstimate:
+        '''
+        Predicts the size of the model before it is built
+
+        Parameters:
+          eligibility - the RA x day eligibility matrix
+          first_day_idx - index of the first scheduled day
+          rolling - whether the schedule is solved one window at a time (the largest window is predicted)
+          consecutive_days - whether the model has the consecutive day penalty
+          window_days - number of days per window (None for one window per month)
+          overlap_days - number of days of the next window that are scheduled with every window
+
+        Returns:
+          the estimate
+        '''
+        day_ppl = self.calendar.ppl
+        if not rolling:
+            return estimate_model(eligibility, day_ppl, first_day_idx, len(day_ppl), self.model_mode,
+                                  consecutive_days)
+        return max((estimate_model(eligibility, day_ppl, window_start, window_end, self.model_mode,
+                                   consecutive_days)
+                    for window_start, _, window_end in self.rolling_windows(window_days, overlap_days)),
+                   key=lambda estimate: estimate.terms)
+
+    def fit_memory_budget(self, eligibility: list[list[bool]], first_day_idx: int = 0, rolling: bool = False,
+                          can_roll: bool = False, window_days: int = None, overlap_days: int = 7) -> bool:
+        '''
+        Predicts the memory the model needs before it is built. If it is over the memory budget the run stops,
+        or the model is made smaller until it fits: fewer search workers, then one window per month
+        (if can_roll), then no consecutive day penalty (each with as many workers as fit)
+
+        Parameters:
+          eligibility - the RA x day eligibility matrix
+          first_day_idx - index of the first scheduled day
+          rolling - whether the schedule is solved one window at a time already
+          can_roll - whether the schedule can be solved one window at a time to fit the budget
+          window_days - number of days per window of a rolling schedule (None for one window per month)
+          overlap_days - number of days of the next window that are scheduled with every window
+
+        Returns:
+          whether the schedule has to be solved one window at a time
+        '''
+        config = self.solver_config
+        num_workers = config.num_workers or os.cpu_count() or 1
+        estimate = self.estimate_model(eligibility, first_day_idx, rolling, window_days=window_days,
+                                       overlap_days=overlap_days)
+        memory_bytes = estimate.memory_bytes(num_workers)
+        self.memory_estimate = {**asdict(estimate), 'num_workers': num_workers, 'memory_bytes': memory_bytes}
+        if config.memory_budget_mb is None:
+            return rolling
+        budget_bytes = int(config.memory_budget_mb * 1024 * 1024)
+        self.memory_estimate['budget_bytes'] = budget_bytes
+        if memory_bytes <= budget_bytes:
+            return rolling
+
+        print(f'The model needs about {memory_bytes / 1024 / 1024:.0f} MB, '
+              f'over the memory budget of {config.memory_budget_mb:.0f} MB')
+        if config.memory_budget_action == BudgetAction.REFUSE:
+            sys.exit(0)
+        # the smaller models to try, in order: (one window at a time, with the consecutive day penalty)
+        plans = [(rolling, True)]
+        if can_roll and not rolling:
+            plans.append((True, True))
+        plans.append((rolling or can_roll, False))
+        for plan_rolling, consecutive_days in plans:
+            estimate = self.estimate_model(eligibility, first_day_idx, plan_rolling, consecutive_days,
+                                           window_days, overlap_days)
+            workers = estimate.max_workers(budget_bytes, num_workers)
+            if not workers:
+                continue
+            if workers < num_workers:
+                self.degradations.append(f'{workers} of {num_workers} solver workers')
+                self.solver_config = replace(config, num_workers=workers)
+            if plan_rolling and not rolling:
+                self.degradations.append('one window per month')
+            if not consecutive_days:
+                self.degradations.append('no consecutive days penalty')
+                self.consecutive_days_penalty = False
+            self.memory_estimate = {**asdict(estimate), 'num_workers': workers,
+                                    'memory_bytes': estimate.memory_bytes(workers), 'budget_bytes': budget_bytes}
+            print(f'To fit the memory budget the schedule is solved with {", ".join(self.degradations)}')
+            return plan_rolling
+        print('The model does not fit the memory budget even with 1 solver worker, one window per month '
+              'and no consecutive days penalty')
+        sys.exit(0)
+
+    def schedule_days(self, all_ras: list[Ra], first_day_idx: int = 0,
+                      fixed_schedule: dict[date, list[str]] = {},
+                      previous_schedule: dict[date, list[str]] = {},
+                      change_penalty: int = 1, last_day_idx: int = None,
+                      eligibility: list[list[bool]] = None,
+                      hint_schedule: dict[date, list[str]] = {},
+                      deadline: float = None) -> tuple[list[ScheduleDay], list[Ra]]:
+        '''
+        Creates the OR model for the days from first_day_idx to last_day_idx, solves it and creates the schedule
+
+        Parameters:
+          all_ras - list of RA objects
+          first_day_idx - index of the first day to schedule, the days before it are taken from fixed_schedule
+          fixed_schedule - who is on duty before the first scheduled day: key -> date, value -> names of the RAs
+          previous_schedule - an earlier schedule to stay close to: key -> date, value -> names of the RAs
+          change_penalty - penalty for every shift of previous_schedule that moves to another RA
+          last_day_idx - index after the last day to schedule (None for the end of the schedule), if the window
+            ends early the min points per RA become a target for the days so far
+          eligibility - the RA x day eligibility matrix (None to create it)
+          hint_schedule - a schedule to start the search from, if there is no previous_schedule:
+            key -> date, value -> names of the RAs
+          deadline - time.monotonic() value by which the warm start and the solve have to finish
+            (None to start the time limit of the solver config after the model is built)
+
+        Returns:
+          the schedule up to the last scheduled day
+          the list of RAs (with their points up to the last scheduled day)
+        '''
+        start = time.perf_counter()
+        # define variables
+        # the RAs and days are referred to by their index in all_ras and all_days
+        staff_size = len(all_ras)
+        all_days = list(self.day_dict.values())
         total_days = len(all_days)
+        if last_day_idx is None:
+            last_day_idx = total_days
+        day_pts = self.day_pts
+        day_ppl = self.calendar.ppl
+        ra_indices = {ra.name: ra_idx for ra_idx, ra in enumerate(all_ras)}
+        days_per_week = 7
+        debug_names = self.solver_config.debug_names
 
         model = cp_model.CpModel()
-        self.revise_total_pts()
+        family_sizes = {}
 
-        # creating boolean variables (the assignments)
-        assignments = {}
-        for availability in all_ras:
-            for day in all_days:
-                for shift in range(day.ppl):
-                    assignments[(availability, day, shift)] = model.new_bool_var(
-                        (f'assignment_ra{availability}_date{day}_shift{shift}'))
+        # hard constraints on availability are handled by only creating variables for eligible days
+        if eligibility is None:
+            eligibility = self.create_eligibility(all_ras, all_days)
+        window = range(first_day_idx, last_day_idx)
+        eligible_days = [[day_idx for day_idx in window if row[day_idx]] for row in eligibility]
+        eligible_ras = {day_idx: [ra_idx for ra_idx in range(staff_size) if eligibility[ra_idx][day_idx]]
+                        for day_idx in window}
 
         # adding hard constraints
-        # exactly 1 RA per shift
-        for day in all_days:
-            for shift in range(day.ppl):
-                model.add_exactly_one(
-                    assignments[(ra, day, shift)] for ra in all_ras)
-
-        # at most 1 shift per day for an RA
-        for availability in all_ras:
-            for day in all_days:
-                model.add_at_most_one(
-                    assignments[(availability, day, shift)] for shift in range(day.ppl))
+        # every shift is filled and an RA is on at most 1 shift per day
+        on_duty = self.create_assignments(model, eligible_days, eligible_ras, all_ras, all_days)
+        self.count_model_family(model, family_sizes, 'assignments')
+
+        # shifts before the first scheduled day are fixed
+        worked = [set() for _ in all_ras]
+        worked_per_week = [{} for _ in all_ras]
+        pts_worked = [0] * staff_size
+        departed_pts = 0
+        for day_idx in range(first_day_idx):
+            for name in fixed_schedule.get(all_days[day_idx].date, []):
+                if name not in ra_indices:
+                    # RAs no longer on staff keep the points of the shifts they worked
+                    departed_pts += day_pts[day_idx]
+                    continue
+                ra_idx = ra_indices[name]
+                worked[ra_idx].add(day_idx)
+                week = day_idx // days_per_week
+                worked_per_week[ra_idx][week] = worked_per_week[ra_idx].get(week, 0) + 1
+                pts_worked[ra_idx] += day_pts[day_idx]
 
         # calculate max and min total pts per RA
-        min_pts_per_ra = self.total_pts // staff_size
-        if self.total_pts % staff_size == 0:
-            max_pts_per_ra = min_pts_per_ra
-        else:
-            max_pts_per_ra = min_pts_per_ra + 1
+        min_pts_per_ra, max_pts_per_ra = self.pts_per_ra(self.total_pts - departed_pts, staff_size)
 
-        # enforce max and min points per RA
-        for availability in all_ras:
-            pts_earned = []
-
-            for day in all_days:
-                for shift in range(day.ppl):
-                    pts_earned.append(
-                        assignments[(availability, day, shift)] * day.pts)
-            model.add(min_pts_per_ra <= sum(pts_earned))
-            model.add(sum(pts_earned) <= max_pts_per_ra)
-
-        # ensure that an RA isn't scheduled to be on duty before they move in
-        for availability, ra in zip(self.ra_availabilities, all_ras):
-            for day in all_days:
-                if (day.date < availability.move_in_date):
-                    for shift in range(day.ppl):
-                        model.add(assignments[(ra, day, shift)] == 0)
-                else:
-                    break
-
-        # dates that cannot be done
-        for availability, ra in zip(self.ra_availabilities, all_ras):
-            for date in availability.no_dates:
-                if date in self.day_dict:
-                    day = self.day_dict[date]
-                    for shift in range(day.ppl):
-                        model.add(assignments[(ra, day, shift)] == 0)
-
-        no_days_dict = self.no_days_for_all_ras(all_ras)
-        # days of the week that cannot be done
-        for day in all_days:
-            day_of_week = day.day_of_week
-            for ra in no_days_dict[day_of_week]:
-                for shift in range(day.ppl):
-                    model.add(assignments[(ra, day, shift)] == 0)
-
-        # new RAs cannot be on duty for the first 3 weeks (to account for shadow shifts)
-        # new RAs to the community (but returners) cannot be on duty for the first 1.5 weeks
-        for day_idx, day in zip(range(14), all_days):
-            for ra in all_ras:
-                if not ra.returner or (not ra.community_returner and day_idx <= 11):
-                    for shift in range(day.ppl):
-                        model.add(assignments[(ra, day, shift)] == 0)
+        penalty_terms = []
 
-        # only people on half staff can be on duty during break
-        for date in self.holidays.breaks:
-            day = self.day_dict[date]
-            for ra in all_ras:
-                if not ra.half_staff:
-                    for shift in range(day.ppl):
-                        model.add(assignments[(ra, day, shift)] == 0)
+        # enforce max and min points per RA (including the points already worked)
+        # when the window ends before the schedule does, the RA has to be able to reach the min points
+        # on the days after the window, and is penalized for every point away from their share so far
+        # (and for the most points any RA is ahead, so the points ahead are spread out)
+        pts_bounds = [None] * staff_size
+        balance_penalty = 10
+        if last_day_idx < total_days:
+            most_ahead = model.new_int_var(0, max_pts_per_ra, 'most_pts_ahead_of_target' if debug_names else '')
+            penalty_terms.append(most_ahead * balance_penalty)
+        for ra_idx, ra in enumerate(all_ras):
+            on_duty_ra = on_duty[ra_idx]
+            pts_earned = pts_worked[ra_idx] + sum(on_duty_ra[day_idx] * day_pts[day_idx]
+                                                  for day_idx in eligible_days[ra_idx])
+            ra_max_pts = max(max_pts_per_ra, pts_worked[ra_idx])
+            model.add(pts_earned <= ra_max_pts)
+            if last_day_idx == total_days:
+                model.add(min_pts_per_ra <= pts_earned)
+                pts_bounds[ra_idx] = (min_pts_per_ra, ra_max_pts)
+                continue
+            eligible_pts = [pts if eligible else 0 for pts, eligible in zip(day_pts, eligibility[ra_idx])]
+            pts_after_window = sum(eligible_pts[last_day_idx:])
+            model.add(min_pts_per_ra - pts_after_window <= pts_earned)
+            pts_bounds[ra_idx] = (min_pts_per_ra - pts_after_window, ra_max_pts)
+            if sum(eligible_pts):
+                pts_target = round(min_pts_per_ra * sum(eligible_pts[:last_day_idx]) / sum(eligible_pts))
+                pts_off_target = model.new_int_var(0, max_pts_per_ra + pts_target,
+                                                   f'pts_off_target_{ra.name}' if debug_names else '')
+                model.add_abs_equality(pts_off_target, pts_earned - pts_target)
+                model.add(pts_earned - pts_target <= most_ahead)
+                penalty_terms.append(pts_off_target * balance_penalty)
+        self.count_model_family(model, family_sizes, 'points')
 
         # soft constraints:
         # rewards
@@ -270,8 +845,10 @@ class DutyScheduler:
         distribution_reward_new = 2
         distribution_reward_return = 4
         distribution_reward_double_return = 6
-        reward_terms = []
-        for availability, ra in zip(self.ra_availabilities, all_ras):
+        # every shift is worth 1, shifts in the preferred half of the schedule are worth distribution_reward
+        # (only the extra reward needs variable terms, the 1 per shift is the same for every schedule)
+        reward_terms = [sum(day_ppl[day_idx] for day_idx in eligible_ras)]
+        for ra_idx, availability in enumerate(self.ra_availabilities):
             distribution = availability.distribution
             distribution_reward = distribution_reward_new
 
@@ -280,65 +857,82 @@ class DutyScheduler:
             elif (availability.returner):
                 distribution_reward = distribution_reward_return
 
-            for day_idx, day in zip(range(total_days), all_days):
+            for day_idx in eligible_days[ra_idx]:
                 if (((day_idx < total_days / 2) and (distribution == Distribution.FRONTLOAD)) or
                         ((day_idx >= total_days / 2) and (distribution == Distribution.BACKLOAD))):
-                    for shift in range(day.ppl):
-                        reward_terms.append(
-                            assignments[ra, day, shift] * distribution_reward)
-                else:
-                    for shift in range(day.ppl):
-                        reward_terms.append(assignments[ra, day, shift])
-        model.Maximize(sum(reward_terms))
+                    reward_terms.append(on_duty[ra_idx][day_idx] * (distribution_reward - 1))
 
         # penalties
-        penalty_terms = []
-
         # penalize if an RA has more than 2 shifts a week
         too_many_shifts_penalty = 5
-        days_per_week = 7
-        num_weeks = math.ceil(total_days / days_per_week)
-        days = list(all_days)
-
-        for ra in all_ras:
-            for week in range(num_weeks):
-                shifts_in_week = []
-                for day in range(week * days_per_week, min((week + 1) * days_per_week, total_days)):
-                    day_obj = days[day]
-                    for shift in range(day_obj.ppl):
-                        shifts_in_week.append(
-                            assignments[(ra, day_obj, shift)])
-                # Define an integer variable to hold the total count of shifts in the week
-                week_shift_count = model.NewIntVar(0, len(shifts_in_week), f'week_shift_count_{ra.name}_{week}')
-        
-                # Create a constraint to sum shifts
-                model.Add(week_shift_count == sum(shifts_in_week))
-                penalty_var = model.NewBoolVar(f'too_many_shifts_week{week}')
-                model.Add(week_shift_count <= 2).OnlyEnforceIf(penalty_var.Not())
-                model.Add(week_shift_count > 2).OnlyEnforceIf(penalty_var)
+
+        for ra_idx, ra in enumerate(all_ras):
+            shifts_per_week = {}
+            for day_idx in eligible_days[ra_idx]:
+                shifts_per_week.setdefault(day_idx // days_per_week, []).append(on_duty[ra_idx][day_idx])
+            for week, shifts_in_week in shifts_per_week.items():
+                # shifts of this week that were already worked before the first scheduled day
+                worked_in_week = worked_per_week[ra_idx].get(week, 0)
+                # the penalty can only apply when the RA can have more than 2 shifts that week
+                most_shifts = worked_in_week + len(shifts_in_week)
+                if most_shifts <= 2:
+                    continue
+                # the penalty is only ever pushed down, so it only has to be forced on when the count is over 2:
+                # the shifts over 2 are covered by the penalty literal (which allows up to all of them)
+                penalty_var = model.new_bool_var(f'too_many_shifts_{ra.name}_week{week}' if debug_names else '')
+                model.add(sum(shifts_in_week) - (most_shifts - 2) * penalty_var <= 2 - worked_in_week)
                 penalty_terms.append(penalty_var * too_many_shifts_penalty)
+        self.count_model_family(model, family_sizes, 'too_many_shifts')
 
-        # penalize if an RA is on consecutive days
+        # penalize if an RA is on consecutive days (unless it was dropped to fit the memory budget)
         consecutive_days_penalty = 4
-        for ra in all_ras: 
-            for day_idx in range(len(all_days) - 1):
-                cur_day = days[day_idx]
-                next_day = days[day_idx + 1]
-
-                shifts_today = [assignments[ra, cur_day, shift] for shift in range(cur_day.ppl)]
-                shifts_tomorrow = [assignments[ra, next_day, shift] for shift in range(next_day.ppl)]
-                sum_shifts_today = sum(shifts_today)
-                sum_shifts_tomorrow = sum(shifts_tomorrow)
-                penalty_var = model.NewBoolVar(f'consecutive_shifts_{cur_day.date}_{next_day.date}')
-                model.Add(sum_shifts_today + sum_shifts_tomorrow < 2).OnlyEnforceIf(penalty_var.Not())
-                model.Add(sum_shifts_today + sum_shifts_tomorrow >= 2).OnlyEnforceIf(penalty_var)
-                penalty_terms.append(penalty_var * consecutive_days_penalty)
-                
-        # Minimize the total penalties
-        model.Minimize(sum(penalty_terms))
-
-        solver = cp_model.CpSolver()
-        status = solver.solve(model)
+        seam_idx = max(first_day_idx - 1, 0)
+        if self.consecutive_days_penalty:
+            for ra_idx, ra in enumerate(all_ras):
+                on_duty_ra = on_duty[ra_idx]
+                for day_idx in range(seam_idx, last_day_idx - 1):
+                    next_on_duty = on_duty_ra[day_idx + 1]
+                    if next_on_duty is None:
+                        continue
+                    # the last fixed day before the first scheduled day
+                    if day_idx in worked[ra_idx]:
+                        penalty_terms.append(next_on_duty * consecutive_days_penalty)
+                        continue
+                    if on_duty_ra[day_idx] is None:
+                        continue
+
+                    # on both days implies the penalty (the penalty is only ever pushed down)
+                    penalty_var = model.new_bool_var(
+                        f'consecutive_shifts_{ra.name}_{all_days[day_idx].date}_{all_days[day_idx + 1].date}'
+                        if debug_names else '')
+                    model.add(on_duty_ra[day_idx] + next_on_duty - penalty_var <= 1)
+                    penalty_terms.append(penalty_var * consecutive_days_penalty)
+        self.count_model_family(model, family_sizes, 'consecutive_days')
+
+        # penalize moving a shift of the previous schedule to another RA
+        if previous_schedule:
+            for day_idx, day_ras in eligible_ras.items():
+                previous_names = previous_schedule.get(all_days[day_idx].date, [])
+                for ra_idx in day_ras:
+                    if all_ras[ra_idx].name in previous_names:
+                        penalty_terms.append((1 - on_duty[ra_idx][day_idx]) * change_penalty)
+
+        proto = model.proto
+        self.model_size = {'variables': len(proto.variables), 'constraints': len(proto.constraints),
+                           'families': family_sizes}
+        print(f'Model: {len(proto.variables)} variables, {len(proto.constraints)} constraints')
+        start = self.record_time('build_model', start)
+        if deadline is None and self.solver_config.max_time_in_seconds is not None:
+            deadline = time.monotonic() + self.solver_config.max_time_in_seconds
+
+        # start the search from the previous schedule (or the hinted schedule)
+        hint_schedule = previous_schedule or hint_schedule
+        if hint_schedule:
+            self.hint_from_schedule(model, on_duty, all_ras, all_days, hint_schedule, deadline)
+            start = self.record_time('warm_start', start)
+
+        solver, status = self.solve_model(model, sum(penalty_terms), sum(reward_terms), deadline)
+        start = self.record_time('solve', start)
         print(status)
         # Print solution.
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
@@ -346,22 +940,37 @@ class DutyScheduler:
 
             # Print solution details and create schedule
             schedule = []
-            for day in all_days:
+            for ra in all_ras:
+                ra.pts = 0
+            for day_idx, day in enumerate(all_days[:last_day_idx]):
                 day_schedule = ScheduleDay(day)
-                print(f'Date: {day.date}, Day: {
-                      day.day_of_week}, Pts: {day.pts}')
-                for ra in all_ras:
-                    for shift in range(day.ppl):
-                        if solver.Value(assignments[ra, day, shift]):
-                            ra.pts += day.pts
-                            day_schedule.add_ra(ra)
-                            print(f'  RA {ra.name} works shift {shift}')
+                print(f'Date: {day.date}, Day: {day.day_of_week}, Pts: {day.pts}')
+                if day_idx in eligible_ras:
+                    ras_on = [all_ras[ra_idx] for ra_idx in eligible_ras[day_idx]
+                              if solver.Value(on_duty[ra_idx][day_idx])]
+                else:
+                    # RAs no longer on staff still appear on the days they worked
+                    ras_on = [all_ras[ra_indices[name]] if name in ra_indices else Ra(name=name)
+                              for name in fixed_schedule.get(day.date, [])]
+                for ra in ras_on:
+                    ra.pts += day.pts
+                    print(f'  RA {ra.name} works shift {len(day_schedule.ras_on)}')
+                    day_schedule.add_ra(ra)
                 schedule.append(day_schedule)
 
             for ra in all_ras:
                 print(f'RA {ra.name} has {ra.pts} pts')
-            print(solver.objective_value)
+            self.record_time('extract_schedule', start)
         else:
+            if status == cp_model.INFEASIBLE:
+                # the hard constraints (shift coverage and points) that cannot all hold together
+                print('Conflicting constraints:')
+                for constraint in explain_infeasibility(
+                        {all_days[day_idx]: [all_ras[ra_idx] for ra_idx in day_ras]
+                         for day_idx, day_ras in eligible_ras.items()},
+                        {ra: bounds for ra, bounds in zip(all_ras, pts_bounds)},
+                        {ra: pts for ra, pts in zip(all_ras, pts_worked)}, self.solver_config):
+                    print(f'  {constraint}')
             print('No solution found')
             sys.exit(0);
         return schedule, all_ras
@@ -0,0 +1,374 @@
+from collections import deque
+import time
+from ortools.sat.python import cp_model
+from schedule_models import Day
+from ra_models import Ra
+from solver_config import SolverConfig
+
+# seconds to explain an infeasible schedule if the solver config has no time limit
+EXPLAIN_TIME_LIMIT = 60.0
+
+
+class FeasibilityChecker:
+    '''
+    Checks the inputs of a schedule for problems that make it impossible, before the OR model is built
+
+    Attributes:
+      ras - list of RA objects
+      days - list of day objects in date order
+      eligibility - the RA x day eligibility matrix
+      min_pts - min points per RA
+      max_pts - max points per RA
+
+    Methods:
+      check - runs every check and returns the problems found
+    '''
+
+    def __init__(self, ras: list[Ra], days: list[Day], eligibility: list[list[bool]],
+                 min_pts: int, max_pts: int) -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          ras - list of RA objects
+          days - list of day objects in date order
+          eligibility - matrix of RA x day, True if the RA can be on duty that day
+          min_pts - min points per RA
+          max_pts - max points per RA
+        '''
+        self.ras = ras
+        self.days = days
+        self.eligibility = eligibility
+        self.min_pts = min_pts
+        self.max_pts = max_pts
+
+    def check(self, windows: dict[str, list[int]] = {}) -> list[str]:
+        '''
+        Runs every check
+
+        Parameters:
+          windows - named groups of day indices (e.g. training, break) whose coverage is checked on its own
+
+        Returns:
+          a description of every problem found (empty if none were found)
+        '''
+        problems = self.check_day_counts()
+        if problems:
+            return problems
+        problems += self.check_points()
+        for name, day_indices in windows.items():
+            problems += self.check_coverage(name, day_indices)
+        if not problems:
+            problems += self.check_coverage('whole schedule', range(len(self.days)))
+        return problems
+
+    def check_day_counts(self) -> list[str]:
+        '''
+        Checks that enough RAs can be on duty every day
+
+        Parameters: None
+
+        Returns:
+          a description of every day with fewer eligible RAs than people on duty
+        '''
+        problems = []
+        for day_idx, day in enumerate(self.days):
+            eligible = sum(row[day_idx] for row in self.eligibility)
+            if eligible < day.ppl:
+                problems.append(f'{day.date}: {day.ppl} RAs needed but only {eligible} can be on duty')
+        return problems
+
+    def check_points(self) -> list[str]:
+        '''
+        Checks that every RA can reach a points total between the min and max points on their eligible days
+
+        Parameters: None
+
+        Returns:
+          a description of every RA who cannot reach the points range
+        '''
+        problems = []
+        for ra, row in zip(self.ras, self.eligibility):
+            eligible_pts = [day.pts for day, eligible in zip(self.days, row) if eligible]
+            if sum(eligible_pts) < self.min_pts:
+                problems.append(f'{ra.name}: can only be on duty for {sum(eligible_pts)} points '
+                                f'but needs at least {self.min_pts}')
+                continue
+            # bit i of reachable is set if a set of eligible days is worth exactly i points
+            reachable = 1
+            for pts in eligible_pts:
+                reachable |= reachable << pts
+            in_range = reachable >> self.min_pts & ((1 << (self.max_pts - self.min_pts + 1)) - 1)
+            if not in_range:
+                problems.append(f'{ra.name}: no combination of eligible days is worth '
+                                f'{self.min_pts}-{self.max_pts} points')
+        return problems
+
+    def max_shifts(self, row: list[bool], day_indices: list[int]) -> int:
+        '''
+        Finds the most shifts an RA can take within some days without going over the max points
+
+        Parameters:
+          row - the RA's eligibility for every day
+          day_indices - indices of the days
+
+        Returns:
+          the most shifts the RA can take
+        '''
+        shifts = 0
+        pts = 0
+        for day_pts in sorted(self.days[day_idx].pts for day_idx in day_indices if row[day_idx]):
+            if pts + day_pts > self.max_pts:
+                break
+            pts += day_pts
+            shifts += 1
+        return shifts
+
+    def check_coverage(self, name: str, day_indices: list[int]) -> list[str]:
+        '''
+        Checks that the RAs can fill every shift of some days at once (Hall's condition),
+        by finding a max flow from RAs (at most their max shifts) to days (at most 1 per RA per day)
+
+        Parameters:
+          name - name of the days for the problem description
+          day_indices - indices of the days
+
+        Returns:
+          a description of the shifts that cannot be filled (empty if all can be filled)
+        '''
+        day_indices = list(day_indices)
+        num_ras = len(self.ras)
+        source = 0
+        sink = num_ras + len(day_indices) + 1
+        graph = MaxFlowGraph(sink + 1)
+        for ra_idx, row in enumerate(self.eligibility):
+            graph.add_edge(source, ra_idx + 1, self.max_shifts(row, day_indices))
+            for node_idx, day_idx in enumerate(day_indices):
+                if row[day_idx]:
+                    graph.add_edge(ra_idx + 1, num_ras + 1 + node_idx, 1)
+        shifts_needed = 0
+        for node_idx, day_idx in enumerate(day_indices):
+            graph.add_edge(num_ras + 1 + node_idx, sink, self.days[day_idx].ppl)
+            shifts_needed += self.days[day_idx].ppl
+
+        shifts_filled = graph.max_flow(source, sink)
+        if shifts_filled == shifts_needed:
+            return []
+
+        # the days that cannot reach the sink after the max flow are short of RAs,
+        # and every RA who could still help them is already at their max points
+        short_days = [self.days[day_idx] for node_idx, day_idx in enumerate(day_indices)
+                      if graph.residual(num_ras + 1 + node_idx, sink) > 0]
+        short_ras = {self.ras[ra_idx] for ra_idx, row in enumerate(self.eligibility)
+                     for day_idx in day_indices if row[day_idx] and self.days[day_idx] in short_days}
+        return [f'{name}: only {shifts_filled} of {shifts_needed} shifts can be filled, '
+                f'short on {", ".join(str(day.date) for day in short_days)} '
+                f'(RAs who can work those days: {", ".join(sorted(ra.name for ra in short_ras))})']
+
+
+class MaxFlowGraph:
+    '''
+    A directed graph with edge capacities for finding a max flow (Dinic's algorithm)
+    '''
+
+    def __init__(self, num_nodes: int) -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          num_nodes - number of nodes
+        '''
+        self.edges = [[] for _ in range(num_nodes)]
+        # every edge is [to node, capacity left, index of the reverse edge in edges[to node]]
+        self.edge_idx = {}
+
+    def add_edge(self, start: int, end: int, capacity: int, flow: int = 0) -> None:
+        '''
+        Adds an edge (and its reverse edge, whose capacity is the flow already on the edge)
+
+        Parameters:
+          start - start node
+          end - end node
+          capacity - capacity of the edge
+          flow - flow already on the edge
+
+        Returns: None
+        '''
+        self.edge_idx[(start, end)] = len(self.edges[start])
+        self.edges[start].append([end, capacity - flow, len(self.edges[end])])
+        self.edges[end].append([start, flow, len(self.edges[start]) - 1])
+
+    def residual(self, start: int, end: int) -> int:
+        '''
+        Finds the capacity left on an edge
+
+        Parameters:
+          start - start node
+          end - end node
+
+        Returns:
+          the capacity left
+        '''
+        return self.edges[start][self.edge_idx[(start, end)]][1]
+
+    def max_flow(self, source: int, sink: int) -> int:
+        '''
+        Finds the max flow from the source to the sink
+
+        Parameters:
+          source - source node
+          sink - sink node
+
+        Returns:
+          the max flow
+        '''
+        flow = 0
+        while True:
+            levels = self.bfs_levels(source)
+            if levels[sink] < 0:
+                return flow
+            next_edge = [0] * len(self.edges)
+            pushed = self.push(source, sink, float('inf'), levels, next_edge)
+            while pushed:
+                flow += pushed
+                pushed = self.push(source, sink, float('inf'), levels, next_edge)
+
+    def bfs_levels(self, source: int) -> list[int]:
+        '''
+        Finds the distance of every node from the source over edges with capacity left
+
+        Parameters:
+          source - source node
+
+        Returns:
+          the distance of every node (-1 if unreachable)
+        '''
+        levels = [-1] * len(self.edges)
+        levels[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for end, capacity, _ in self.edges[node]:
+                if capacity > 0 and levels[end] < 0:
+                    levels[end] = levels[node] + 1
+                    queue.append(end)
+        return levels
+
+    def push(self, source: int, sink: int, limit: float, levels: list[int], next_edge: list[int]) -> int:
+        '''
+        Pushes flow along one path of increasing levels from the source to the sink
+
+        Parameters:
+          source - source node
+          sink - sink node
+          limit - most flow to push
+          levels - distance of every node from the source
+          next_edge - index of the next edge to try for every node
+
+        Returns:
+          the flow pushed (0 if there is no such path left)
+        '''
+        # iterative depth first search, path holds (node, edge index)
+        path = []
+        node = source
+        while True:
+            if node == sink:
+                pushed = min(limit, *(self.edges[start][edge][1] for start, edge in path))
+                for start, edge in path:
+                    end, _, reverse = self.edges[start][edge]
+                    self.edges[start][edge][1] -= pushed
+                    self.edges[end][reverse][1] += pushed
+                return pushed
+            edges = self.edges[node]
+            while next_edge[node] < len(edges):
+                end, capacity, _ = edges[next_edge[node]]
+                if capacity > 0 and levels[end] == levels[node] + 1:
+                    break
+                next_edge[node] += 1
+            if next_edge[node] < len(edges):
+                path.append((node, next_edge[node]))
+                node = edges[next_edge[node]][0]
+            elif not path:
+                return 0
+            else:
+                # dead end, never try this node again in this phase
+                levels[node] = -1
+                node, _ = path.pop()
+                next_edge[node] += 1
+
+
+def explain_infeasibility(eligible_ras: dict[Day, list[Ra]], pts_bounds: dict[Ra, tuple[int, int]],
+                          pts_worked: dict[Ra, int], solver_config: SolverConfig = SolverConfig()) -> list[str]:
+    '''
+    Finds a small set of hard constraints that cannot all hold together, by solving the hard
+    constraints alone with an assumption literal per constraint and shrinking the infeasible core
+    (every solve shares the time limit of the solver config, the core found so far is returned when it runs out)
+
+    Parameters:
+      eligible_ras - dictionary: key -> day, value -> RAs that can be on duty that day
+      pts_bounds - dictionary: key -> RA, value -> (min, max) points of the RA
+      pts_worked - dictionary: key -> RA, value -> points already worked before the scheduled days
+      solver_config - search parameters (the time limit is for the whole explanation)
+
+    Returns:
+      a description of every constraint in the conflicting set (empty if none was found)
+    '''
+    model = cp_model.CpModel()
+    on_duty = {(ra, day): model.new_bool_var(f'on_duty_{ra.name}_{day.date}')
+               for day, ras in eligible_ras.items() for ra in ras}
+    constraints = []
+
+    # coverage family: every day has day.ppl RAs on duty
+    for day, ras in eligible_ras.items():
+        literal = model.new_bool_var(f'coverage_{day.date}')
+        model.add(sum(on_duty[(ra, day)] for ra in ras) == day.ppl).only_enforce_if(literal)
+        constraints.append((literal, f'{day.date}: {day.ppl} RAs on duty'))
+
+    # points families: every RA is between the min and max points
+    shifts = {ra: [] for ra in pts_bounds}
+    for (ra, day), var in on_duty.items():
+        shifts[ra].append(var * day.pts)
+    for ra, (min_pts, max_pts) in pts_bounds.items():
+        pts_earned = pts_worked.get(ra, 0) + sum(shifts[ra])
+        literal = model.new_bool_var(f'min_pts_{ra.name}')
+        model.add(pts_earned >= min_pts).only_enforce_if(literal)
+        constraints.append((literal, f'{ra.name}: at least {min_pts} points'))
+        literal = model.new_bool_var(f'max_pts_{ra.name}')
+        model.add(pts_earned <= max_pts).only_enforce_if(literal)
+        constraints.append((literal, f'{ra.name}: at most {max_pts} points'))
+
+    time_limit = solver_config.max_time_in_seconds
+    deadline = time.monotonic() + (EXPLAIN_TIME_LIMIT if time_limit is None else time_limit)
+
+    def solve(assumed: list[int]) -> tuple[int, list[int]]:
+        model.clear_assumptions()
+        model.add_assumptions([constraints[idx][0] for idx in assumed])
+        solver = cp_model.CpSolver()
+        solver_config.apply(solver, max(deadline - time.monotonic(), 0.0))
+        # the infeasible core is only reported by a single worker
+        solver.parameters.num_workers = 1
+        # the constraints with assumption literals are only in the LP relaxation at the full linearization level,
+        # without it a single worker cannot prove that too few RAs share too many shifts
+        solver.parameters.linearization_level = 2
+        status = solver.solve(model)
+        core = [literal_idx for literal_idx in assumed
+                if constraints[literal_idx][0].index in solver.sufficient_assumptions_for_infeasibility()]
+        return status, core
+
+    status, core = solve(list(range(len(constraints))))
+    if status != cp_model.INFEASIBLE:
+        return []
+
+    # drop every constraint of the core that is not needed for the conflict
+    idx = 0
+    while idx < len(core) and time.monotonic() < deadline:
+        candidate = core[:idx] + core[idx + 1:]
+        status, smaller_core = solve(candidate)
+        if status == cp_model.INFEASIBLE:
+            core = [literal_idx for literal_idx in candidate if literal_idx in smaller_core] or candidate
+        elif status == cp_model.UNKNOWN:
+            # out of time, the core is not shrunk any further
+            break
+        else:
+            idx += 1
+    return [constraints[literal_idx][1] for literal_idx in core]
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from datetime import date
+from form_responses import FormResponses
+
+# the last rows of a snapshot that are read again with the new rows and compared with their hash, to find responses
+# that were edited, removed or sorted without reading every row
+CHECKED_ROWS = 50
+
+
+class FormCache:
+    '''
+    Keeps a snapshot of the form responses of every spreadsheet between runs, so a later run only
+    downloads and parses the responses added since (the snapshot is only used while its last rows are unchanged)
+
+    Attributes:
+      cache_dir - directory the snapshots are kept in
+    '''
+
+    def __init__(self, cache_dir: str = '.form_cache') -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          cache_dir - directory the snapshots are kept in
+        '''
+        self.cache_dir = cache_dir
+
+    def snapshot_path(self, spreadsheet_id: str) -> str:
+        '''
+        Finds the file of the snapshot of a spreadsheet
+
+        Parameters:
+          spreadsheet_id - spreadsheet id (the same for every url or path of the spreadsheet)
+
+        Returns:
+          the path of the snapshot
+        '''
+        return os.path.join(self.cache_dir, hashlib.sha1(spreadsheet_id.encode()).hexdigest() + '.pickle')
+
+    def load(self, spreadsheet_id: str, start_date: date) -> dict:
+        '''
+        Reads the snapshot of a spreadsheet
+
+        Parameters:
+          spreadsheet_id - spreadsheet id
+          start_date - first day of duty (the parsed responses depend on it)
+
+        Returns:
+          the snapshot (the number of rows, the hash of the last rows and the parsed responses),
+          or None if there is no usable snapshot
+        '''
+        try:
+            with open(self.snapshot_path(spreadsheet_id), 'rb') as snapshot_file:
+                snapshot = pickle.load(snapshot_file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if (snapshot.get('spreadsheet') != spreadsheet_id or snapshot.get('start_date') != start_date or
+                not snapshot.get('num_rows') or 'checked_hash' not in snapshot):
+            return None
+        return snapshot
+
+    def save(self, spreadsheet_id: str, num_rows: int, last_rows: list[list[str]], responses: FormResponses) -> None:
+        '''
+        Writes the snapshot of a spreadsheet
+
+        Parameters:
+          spreadsheet_id - spreadsheet id
+          num_rows - number of rows of the form responses (including the title row)
+          last_rows - the last rows of the form responses (at least the last CHECKED_ROWS of them, or every row)
+          responses - the parsed responses
+
+        Returns: None
+        '''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        checked_rows = last_rows[-CHECKED_ROWS:]
+        snapshot = {
+            'spreadsheet': spreadsheet_id,
+            'start_date': responses.start_date,
+            'num_rows': num_rows,
+            'num_checked': len(checked_rows),
+            'checked_hash': content_hash(checked_rows),
+            'responses': responses,
+        }
+        # the responses are kept parsed column by column (ints and lists), which pickle far faster than
+        # the RA availability objects they are turned into. The snapshot is written to a temporary file
+        # first so an interrupted run does not leave half a snapshot
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as snapshot_file:
+            pickle.dump(snapshot, snapshot_file)
+        os.replace(temporary_path, self.snapshot_path(spreadsheet_id))
+
+
+def first_checked_row(snapshot: dict) -> int:
+    '''
+    Finds the first row to read again with the rows added since a snapshot
+
+    Parameters:
+      snapshot - the snapshot
+
+    Returns:
+      the index of the row (the title row is 0)
+    '''
+    return snapshot['num_rows'] - snapshot['num_checked']
+
+
+def added_rows(snapshot: dict, rows: list[list[str]]) -> list[list[str]]:
+    '''
+    Finds the rows added since a snapshot, if the last rows of the snapshot have not changed
+
+    Parameters:
+      snapshot - the snapshot
+      rows - the rows from the first checked row on
+
+    Returns:
+      the rows added since, or None if the last rows of the snapshot were edited, removed or sorted
+    '''
+    num_checked = snapshot['num_checked']
+    if len(rows) < num_checked or content_hash(rows[:num_checked]) != snapshot['checked_hash']:
+        return None
+    return rows[num_checked:]
+
+
+def content_hash(rows: list[list[str]]) -> str:
+    '''
+    Hashes the content of the form responses
+
+    Parameters:
+      rows - the rows
+
+    Returns:
+      the hash as hex
+    '''
+    return hashlib.sha256(json.dumps(rows).encode()).hexdigest()
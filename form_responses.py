@@ -0,0 +1,291 @@
+from datetime import date, datetime
+from functools import lru_cache
+from constants import DAYS_OF_WEEK, DaysOfWeek, Distribution
+from ra_models import RaAvailability
+
+
+class FormResponses:
+    '''
+    The duty form responses parsed column by column, one entry per RA in every column
+
+    Attributes:
+      start_date - first day of duty, the dates without a year (the dates that cannot be done) are the next
+        of that date on or after it
+      property_indices - the column index of every RA availability attribute
+      names - names of the RAs
+      move_in - ordinal (date.toordinal) of the move in date of every RA (None if not answered)
+      no_dates - bitmap of the dates every RA cannot do, bit i is start_date + i days
+      no_days - bitmask of the days of the week every RA cannot do, bit i is DAYS_OF_WEEK[i]
+      distribution - whether every RA prefers to frontload or backload (or none)
+      returner - if every RA has been an RA before
+      community_returner - if every RA has been an RA in this community before
+      errors - the answers that could not be read, as 'Row n: ...' (the row number in the spreadsheet)
+    '''
+
+    def __init__(self, form_answers: list[list[str]], start_date: date) -> None:
+        '''
+        Parses the form responses
+
+        Parameters:
+          form_answers - the form responses from the spreadsheet (the first row has the titles of the columns)
+          start_date - first day of duty
+
+        Returns: None
+        '''
+        self.start_date = start_date
+        self.errors = []
+        self.property_indices = match_column_property(form_answers[0]) if form_answers else {}
+        self.names = []
+        self.move_in = []
+        self.no_dates = []
+        self.no_days = []
+        self.distribution = []
+        self.returner = []
+        self.community_returner = []
+        self.add_rows(form_answers[1:])
+
+    @classmethod
+    def from_availabilities(cls, availabilities: list[RaAvailability], start_date: date) -> 'FormResponses':
+        '''
+        Puts RA availabilities that were not read from a form (a snapshot, a generated instance) column by column
+
+        Parameters:
+          availabilities - the RA availabilities
+          start_date - first day of duty (the dates before it are left out of the bitmaps)
+
+        Returns:
+          the responses
+        '''
+        responses = cls([], start_date)
+        first_day = start_date.toordinal()
+        for availability in availabilities:
+            responses.names.append(availability.name)
+            responses.move_in.append(availability.move_in_date.toordinal() if availability.move_in_date else None)
+            no_dates = 0
+            for no_date in availability.no_dates:
+                if no_date >= start_date:
+                    no_dates |= 1 << (no_date.toordinal() - first_day)
+            responses.no_dates.append(no_dates)
+            no_days = 0
+            for day_of_week in availability.no_days:
+                no_days |= 1 << DAYS_OF_WEEK.index(day_of_week)
+            responses.no_days.append(no_days)
+            responses.distribution.append(availability.distribution)
+            responses.returner.append(availability.returner)
+            responses.community_returner.append(availability.community_returner)
+        return responses
+
+    def add_rows(self, rows: list[list[str]]) -> None:
+        '''
+        Parses responses added after the ones already parsed
+
+        Parameters:
+          rows - the new rows of the spreadsheet
+
+        Returns: None
+        '''
+        def column(property: str) -> list[str]:
+            # empty cells at the end of a row are left out of the response
+            idx = self.property_indices.get(property)
+            if idx is None:
+                return [''] * len(rows)
+            return [row[idx] if idx < len(row) else '' for row in rows]
+
+        # the title row is row 1
+        first_row = len(self.names) + 2
+        start_date = self.start_date
+        self.names += column('name')
+        self.move_in += self.parse_column(column('move_in_date'), first_row, 'move in date', parse_full_date)
+        self.no_dates += self.parse_column(column('no_dates'), first_row, 'dates',
+                                           lambda response: parse_month_days(response, start_date), 0)
+        self.no_days += self.parse_column(column('no_days'), first_row, 'days of the week', parse_days_of_week, 0)
+        self.distribution += [parse_distribution(response) for response in column('distribution')]
+        self.returner += [response == 'Returner' for response in column('returner')]
+        self.community_returner += [response == 'Yes' for response in column('community_returner')]
+
+    def parse_column(self, responses: list[str], first_row: int, description: str, parse, default=None) -> list:
+        '''
+        Parses every response of a column, recording the responses that cannot be read
+
+        Parameters:
+          responses - the responses of the column
+          first_row - row number of the first response in the spreadsheet
+          description - what the column is, for the errors
+          parse - function from a (non-empty) response to its value
+          default - value of an empty or unreadable response
+
+        Returns:
+          the values of the column
+        '''
+        values = []
+        for row_idx, response in enumerate(responses):
+            if not response:
+                values.append(default)
+                continue
+            try:
+                values.append(parse(response))
+            except (ValueError, KeyError):
+                self.errors.append(f'Row {first_row + row_idx}: cannot read the {description} "{response}"')
+                values.append(default)
+        return values
+
+    def availabilities(self) -> list[RaAvailability]:
+        '''
+        Creates the RA availability objects
+
+        Parameters: None
+
+        Returns:
+          list of RA availabilities
+        '''
+        first_day = self.start_date.toordinal()
+        return [RaAvailability(name=name,
+                               move_in_date=date.fromordinal(move_in) if move_in is not None else None,
+                               no_dates=[date.fromordinal(first_day + day_idx) for day_idx in bits(no_dates)],
+                               no_days=[DAYS_OF_WEEK[weekday] for weekday in bits(no_days)],
+                               distribution=distribution,
+                               returner=returner,
+                               community_returner=community_returner)
+                for name, move_in, no_dates, no_days, distribution, returner, community_returner in zip(
+                    self.names, self.move_in, self.no_dates, self.no_days, self.distribution,
+                    self.returner, self.community_returner)]
+
+
+def match_column_property(title_columns: list[str]) -> dict[str, int]:
+    '''
+    Finds the column index for each attribute of the RA availability class
+
+    Parameters:
+        title_columns - the first row of the spreadsheet that has all the names of the columns
+
+    Returns:
+        a dict matching every RA availability attribute with its column index
+    '''
+    availability_properties = {}
+    for idx, col in enumerate(title_columns):
+        col = col.lower()
+        if 'preferred name' in col:
+            availability_properties['name'] = idx
+        elif all(word in col for word in ['move in', 'date']):
+            availability_properties['move_in_date'] = idx
+        elif all(word in col for word in ['dates', 'not', 'duty']):
+            availability_properties['no_dates'] = idx
+        elif all(word in col for word in ['days', 'not', 'duty']):
+            availability_properties['no_days'] = idx
+        elif any(word in col for word in ['frontload', 'backload', 'distribution']):
+            availability_properties['distribution'] = idx
+        elif all(word in col for word in ['returning', 'ra']):
+            availability_properties['returner'] = idx
+        elif all(word in col for word in ['been', 'community', 'previously']):
+            availability_properties['community_returner'] = idx
+        else:
+            continue
+    return availability_properties
+
+
+# the same few dates and answers come up in most responses, so every distinct one is only parsed once
+@lru_cache(maxsize=None)
+def parse_full_date(response: str) -> int:
+    '''
+    Parses a date answered as mm/dd/yyyy
+
+    Parameters:
+      response - the response
+
+    Returns:
+      the ordinal of the date
+    '''
+    return datetime.strptime(response, '%m/%d/%Y').toordinal()
+
+
+@lru_cache(maxsize=None)
+def parse_month_day(month_day: str, start_date: date) -> int:
+    '''
+    Parses a date answered as mm-dd, in the year it is next on or after the start date
+    (the January dates of a schedule that starts in December are in the next year)
+
+    Parameters:
+      month_day - the date
+      start_date - first day of duty
+
+    Returns:
+      the ordinal of the date
+    '''
+    try:
+        day = datetime.strptime(f'{start_date.year}-{month_day}', '%Y-%m-%d').date()
+        if day >= start_date:
+            return day.toordinal()
+    except ValueError:
+        # February 29 of a schedule that starts in the year before a leap year
+        pass
+    return datetime.strptime(f'{start_date.year + 1}-{month_day}', '%Y-%m-%d').toordinal()
+
+
+def parse_month_days(response: str, start_date: date) -> int:
+    '''
+    Parses a list of dates answered as mm-dd, mm-dd
+
+    Parameters:
+      response - the response
+      start_date - first day of duty
+
+    Returns:
+      bitmap of the dates, bit i is start_date + i days
+    '''
+    first_day = start_date.toordinal()
+    mask = 0
+    for month_day in response.split(','):
+        mask |= 1 << (parse_month_day(month_day.strip(), start_date) - first_day)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def parse_days_of_week(response: str) -> int:
+    '''
+    Parses a list of days of the week answered as Monday, Tuesday
+
+    Parameters:
+      response - the response
+
+    Returns:
+      bitmask of the days, bit i is DAYS_OF_WEEK[i]
+    '''
+    mask = 0
+    for day in response.split(', '):
+        mask |= 1 << DAYS_OF_WEEK.index(DaysOfWeek[day.strip().upper()])
+    return mask
+
+
+def parse_distribution(response: str) -> Distribution:
+    '''
+    Parses the frontload or backload answer
+
+    Parameters:
+      response - the response
+
+    Returns:
+      the distribution
+    '''
+    if response == 'Frontload':
+        return Distribution.FRONTLOAD
+    elif response == 'Backload':
+        return Distribution.BACKLOAD
+    return Distribution.NONE
+
+
+def bits(mask: int) -> list[int]:
+    '''
+    Lists the bits that are set in a bitmask
+
+    Parameters:
+      mask - the bitmask
+
+    Returns:
+      the indices of the set bits, in increasing order
+    '''
+    indices = []
+    while mask:
+        low_bit = mask & -mask
+        indices.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return indices
@@ -0,0 +1,138 @@
+import random
+from datetime import date, timedelta
+from constants import DAYS_OF_WEEK, Distribution, Semester
+from ra_models import RaAvailability, Holidays
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    '''
+    Finds the nth weekday of a month (e.g. the 4th Thursday of November)
+
+    Parameters:
+      year - the year
+      month - the month
+      weekday - the day of the week (0 is Monday)
+      n - which occurrence of the day of the week (starting from 1)
+
+    Returns:
+      the date
+    '''
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def generate_availabilities(num_ras: int, start_date: date, end_date: date, blackout_density: float = 0.03,
+                            returner_share: float = 0.6, community_returner_share: float = 0.6,
+                            late_move_in_share: float = 0.05, seed: int = 0) -> list[RaAvailability]:
+    '''
+    Creates random RA availabilities for a schedule
+
+    Parameters:
+      num_ras - number of RAs on staff
+      start_date - first day of duty
+      end_date - last day of duty
+      blackout_density - average share of the days every RA cannot do (single dates and trips of 2-4 days)
+      returner_share - share of the RAs who have been an RA before
+      community_returner_share - share of the returners who have been an RA in this community before
+      late_move_in_share - share of the RAs who move in after the first day of duty
+      seed - seed for the random generator
+
+    Returns:
+      list of RA availabilities
+    '''
+    rng = random.Random(seed)
+    num_days = (end_date - start_date).days + 1
+    availabilities = []
+    for ra_idx in range(num_ras):
+        no_dates = set()
+        blackout_days = rng.randint(0, round(2 * blackout_density * num_days))
+        while len(no_dates) < blackout_days:
+            first_day = rng.randrange(num_days)
+            # most blackouts are single dates, some are trips
+            trip_length = 1 if rng.random() < 0.7 else rng.randint(2, 4)
+            no_dates.update(start_date + timedelta(days=min(day_idx, num_days - 1))
+                            for day_idx in range(first_day, first_day + trip_length))
+        no_days = rng.sample(DAYS_OF_WEEK, rng.choice([0, 0, 0, 1]))
+        if rng.random() < late_move_in_share:
+            move_in_date = start_date + timedelta(days=rng.randint(1, min(14, num_days - 1)))
+        else:
+            move_in_date = start_date - timedelta(days=rng.randint(0, 3))
+        returner = rng.random() < returner_share
+        availabilities.append(RaAvailability(
+            name=f'RA {ra_idx}',
+            move_in_date=move_in_date,
+            no_dates=sorted(no_dates),
+            no_days=no_days,
+            distribution=rng.choice(list(Distribution)),
+            returner=returner,
+            community_returner=returner and rng.random() < community_returner_share))
+    return availabilities
+
+
+def generate_holidays(start_date: date, end_date: date, break_length: int = 5) -> Holidays:
+    '''
+    Creates the holidays of a schedule: Labor Day and Thanksgiving break in the fall,
+    Martin Luther King Jr. Day and spring break in the spring, Independence Day in the summer
+    (only the ones that fall within the schedule)
+
+    Parameters:
+      start_date - first day of duty
+      end_date - last day of duty
+      break_length - number of days of the break (0 for no break)
+
+    Returns:
+      the holidays
+    '''
+    year = start_date.year
+    if start_date.month == 8:
+        semester = Semester.FALL
+        holiday = nth_weekday(year, 9, 0, 1)
+        # the Wednesday before Thanksgiving
+        break_start = nth_weekday(year, 11, 3, 4) - timedelta(days=1)
+    elif start_date.month == 1:
+        semester = Semester.SPRING
+        holiday = nth_weekday(year, 1, 0, 3)
+        # the second Saturday of March
+        break_start = nth_weekday(year, 3, 5, 2)
+    else:
+        semester = Semester.SUMMER
+        holiday = date(year, 7, 4)
+        break_start = None
+
+    # the day before a holiday or a break is part of the schedule too
+    double_len = [holiday] if start_date < holiday <= end_date else []
+    breaks = []
+    if semester != Semester.SUMMER and break_length > 0:
+        break_dates = [break_start + timedelta(days=day_idx) for day_idx in range(break_length)]
+        if start_date < break_start and break_dates[-1] <= end_date:
+            breaks = break_dates
+    return Holidays(double_len=double_len, breaks=breaks)
+
+
+def generate_instance(num_ras: int = 40, num_days: int = 120, start_date: date = date(2024, 8, 15),
+                      blackout_density: float = 0.03, returner_share: float = 0.6,
+                      break_length: int = 5, seed: int = 0) -> tuple[date, date, list[RaAvailability],
+                                                                    Holidays, list[str]]:
+    '''
+    Creates a random schedule input, as it would be read from the form and asked for on the command line
+
+    Parameters:
+      num_ras - number of RAs on staff
+      num_days - number of days of duty
+      start_date - first day of duty (in January, May or August)
+      blackout_density - average share of the days every RA cannot do
+      returner_share - share of the RAs who have been an RA before
+      break_length - number of days of the break (0 for no break)
+      seed - seed for the random generator
+
+    Returns:
+      start date, end date, RA availabilities, holidays, names of the half staff
+    '''
+    end_date = start_date + timedelta(days=num_days - 1)
+    availabilities = generate_availabilities(num_ras, start_date, end_date, blackout_density,
+                                             returner_share, seed=seed)
+    holidays = generate_holidays(start_date, end_date, break_length)
+    # returners make up the half staff so the break can be covered, topped up with new RAs if there are too few
+    ras = sorted(availabilities, key=lambda availability: not availability.returner)
+    half_staff = [availability.name for availability in ras[:num_ras // 2]]
+    return start_date, end_date, availabilities, holidays, half_staff
@@ -1,12 +1,25 @@
+import argparse
 import sys
-from constants import Constants
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from constants import BudgetAction
 from duty_scheduler import DutyScheduler
+from solver_config import SolverConfig, solver_config_from_env
+from form_cache import FormCache
+from run_report import RunReport, record_time
+from schedule_snapshot import ScheduleSnapshot
 from spreadsheet_client import SpreadsheetClient
-from ra_models import Holidays, RaAvailability, DaysOfWeek, Distribution
+from spreadsheet_backends import SpreadsheetBackend, GoogleSheetsBackend, LocalFileBackend
+from ra_models import Holidays
 from datetime import datetime, date, timedelta
 from typing import Callable
 
-def user_input():
+def user_input(solver_config: SolverConfig = SolverConfig(), previous_schedule_url: str = None,
+               cutoff_date: date = None, rolling: bool = False, backend: SpreadsheetBackend = None,
+               live_formulas: bool = False, form_cache: FormCache = None, refresh_form: bool = False,
+               republish_url: str = None, snapshot_path: str = None, report_path: str = None,
+               metrics_path: str = None):
     start_date = handle_input(
         'What is the first day of duty (yyyy-mm-dd)?\n', validate_date)
     end_date = handle_input(
@@ -19,28 +32,240 @@ def user_input():
         'Provide the date range for break (yyyy-mm-dd to yyyy-mm-dd):\n', validate_break)
     half_staff = input(
         'List the names (as they appear in the form responses) of the RAs on half staff:\n')
-    form_responses_url = input(
-        'Please enter the url to the form containing the responses:\n')
-    schedule_name = input('What would you like to title the schedule?\n')
+    if isinstance(backend, LocalFileBackend):
+        form_responses_url = input(
+            'Please enter the path to the .csv or .xlsx file containing the responses:\n')
+    else:
+        form_responses_url = input(
+            'Please enter the url to the form containing the responses:\n')
+    # a republished schedule keeps its title
+    schedule_name = input('What would you like to title the schedule?\n') if not republish_url else None
 
-    spreadsheet_parser = SpreadsheetClient(start_date, schedule_name)
-    form_answers = spreadsheet_parser.get_form_answers(form_responses_url)
-    ra_availabilities = spreadsheet_parser.construct_availabilities(
-        form_answers)
+    run_start = time.perf_counter()
+    spreadsheet_parser = SpreadsheetClient(start_date, schedule_name, backend, form_cache)
+    with ThreadPoolExecutor(max_workers=2) as threads:
+        # the previous schedule is read while the form responses are
+        previous_schedule = None
+        if previous_schedule_url:
+            previous_schedule = threads.submit(spreadsheet_parser.get_schedule, previous_schedule_url)
+        form_responses = spreadsheet_parser.get_form_responses(form_responses_url, refresh_form)
 
-    holidays_object = Holidays(
-        holidays if holidays else [], extended_holiday if extended_holiday else [])
+        holidays_object = Holidays(
+            holidays if holidays else [], extended_holiday if extended_holiday else [])
 
-    scheduler = DutyScheduler(start_date, end_date, ra_availabilities,
-                              holidays_object, half_staff if half_staff else [])
-    schedule, ras = scheduler.create_or_model()
+        scheduler = DutyScheduler(start_date, end_date, form_responses.availabilities(),
+                                  holidays_object, half_staff if half_staff else [],
+                                  solver_config=solver_config, form_responses=form_responses)
+        # the spreadsheet and its headings only depend on the dates, so they are written while the schedule is solved
+        prepared_sheet = None
+        if not republish_url:
+            prepared_sheet = threads.submit(spreadsheet_parser.prepare_sheet, scheduler.days_per_month)
+        try:
+            if previous_schedule:
+                schedule, ras = scheduler.resolve(previous_schedule.result(),
+                                                  cutoff_date if cutoff_date else date.today())
+            elif rolling:
+                schedule, ras = scheduler.create_rolling_model()
+            else:
+                schedule, ras = scheduler.create_or_model()
+        except SystemExit:
+            if prepared_sheet and prepared_sheet.exception() is None:
+                print(f'The spreadsheet created for the schedule was left empty: {prepared_sheet.result()[0]}')
+            write_run_report(scheduler, spreadsheet_parser, run_start, report_path, metrics_path)
+            raise
 
-    spreadsheet_id, sheet_ids = spreadsheet_parser.create_sheet()
-    spreadsheet_parser.base_schedule(spreadsheet_id, sheet_ids[0], scheduler.days_per_month)
-    response, cols = spreadsheet_parser.add_schedule(spreadsheet_id, schedule)
-    spreadsheet_parser.add_half_staff(spreadsheet_id, ras, cols)
-    spreadsheet_parser.add_ra_points(spreadsheet_id, ras)
-    spreadsheet_parser.format_sheet(spreadsheet_id, sheet_ids)
+        if snapshot_path:
+            scheduler.save_snapshot(snapshot_path, schedule, ras)
+        if republish_url:
+            num_changed = spreadsheet_parser.republish(republish_url, schedule, ras, live_formulas)
+            print(f'{num_changed} cells changed in {republish_url}')
+        else:
+            # if the spreadsheet could not be prepared, the solved schedule is published to a new one
+            prepared = None
+            if prepared_sheet.exception() is None:
+                prepared = prepared_sheet.result()
+            else:
+                print(f'The spreadsheet could not be prepared while solving ({prepared_sheet.exception()}), '
+                      'it is created now')
+            spreadsheet_parser.publish(schedule, ras, scheduler.days_per_month, live_formulas, prepared)
+    write_run_report(scheduler, spreadsheet_parser, run_start, report_path, metrics_path)
+
+
+def write_run_report(scheduler: DutyScheduler, spreadsheet_parser: SpreadsheetClient, run_start: float,
+                     report_path: str = None, metrics_path: str = None) -> None:
+    '''
+    Writes where the time of the run went, the size of the model and the solver statistics
+
+    Parameters:
+      scheduler - the duty scheduler of the run
+      spreadsheet_parser - the spreadsheet client of the run
+      run_start - time.perf_counter() value after the questions were answered
+      report_path - path of the JSON report (None to not write it)
+      metrics_path - path of the Prometheus text format file (None to not write it)
+
+    Returns: None
+    '''
+    if not report_path and not metrics_path:
+        return
+    timings = {}
+    record_time(timings, 'total', run_start)
+    report = RunReport.from_run(scheduler, spreadsheet_parser, timings)
+    if report_path:
+        report.write_json(report_path)
+    if metrics_path:
+        report.write_metrics(metrics_path)
+
+
+def publish_snapshot(snapshot_path: str, backend: SpreadsheetBackend = None, live_formulas: bool = False,
+                     republish_url: str = None):
+    '''
+    Publishes the schedule of an earlier run from its snapshot, without reading the form or solving again
+
+    Parameters:
+      snapshot_path - path of the snapshot
+      backend - where the schedule is written to
+      live_formulas - whether the per RA tallies are formulas that update when the schedule is edited
+      republish_url - url of the published schedule to write over (None to create a new spreadsheet)
+
+    Returns: None
+    '''
+    try:
+        snapshot = ScheduleSnapshot.load(snapshot_path)
+    except (OSError, ValueError) as error:
+        print(error)
+        sys.exit(0)
+    schedule_name = input('What would you like to title the schedule?\n') if not republish_url else None
+    spreadsheet_parser = SpreadsheetClient(snapshot.start_date, schedule_name, backend)
+    print(f'Published {spreadsheet_parser.publish_snapshot(snapshot, live_formulas, republish_url)}')
+
+
+def parse_args(args: list[str] = None) -> argparse.Namespace:
+    '''
+    Parses the command line flags for the solver
+
+    Parameters:
+      args - the command line arguments (defaults to sys.argv)
+
+    Returns:
+      the parsed flags
+    '''
+    parser = argparse.ArgumentParser(description='Creates an RA duty schedule')
+    add_solver_arguments(parser)
+    parser.add_argument('--previous-schedule', help='url (or local path) of a published schedule to re-solve '
+                        'instead of starting over')
+    parser.add_argument('--cutoff', type=date.fromisoformat, help='first date (yyyy-mm-dd) of the previous schedule '
+                        'that can change, defaults to today')
+    parser.add_argument('--rolling', action='store_true', help='solve the schedule one month at a time '
+                        '(for long schedules)')
+    parser.add_argument('--republish', help='url (or local path) of a published schedule with the same dates '
+                        'to write the new schedule over, only the cells that changed are written')
+    parser.add_argument('--save-snapshot', help='path of a file to save the inputs and the schedule of this run to')
+    parser.add_argument('--from-snapshot', help='path of a saved snapshot to publish instead of creating a schedule')
+    parser.add_argument('--report', help='path of a JSON file to write the time of every phase, the size of the '
+                        'model and the solver statistics of this run to')
+    parser.add_argument('--metrics', help='path of a file to write the same report to in the Prometheus text format')
+    add_backend_arguments(parser)
+    return parser.parse_args(args)
+
+
+def add_solver_arguments(parser: argparse.ArgumentParser) -> None:
+    '''
+    Adds the solver flags (read by solver_config_from_args) to a parser
+
+    Parameters:
+      parser - the parser
+
+    Returns: None
+    '''
+    parser.add_argument('--profile', help='solver profile (default, fast_draft, overnight_optimal), '
+                        'overrides RA_SCHEDULER_PROFILE')
+    parser.add_argument('--workers', type=int, help='number of solver workers (0 uses every core)')
+    parser.add_argument('--time-limit', type=float, help='wall clock limit for the solve in seconds')
+    parser.add_argument('--gap', type=float, help='relative gap at which a solver stage stops')
+    parser.add_argument('--seed', type=int, help='random seed for the solver')
+    parser.add_argument('--log-search', action='store_true', default=None, help='print the solver search log')
+    parser.add_argument('--debug-names', action='store_true', default=None, help='give the model variables readable '
+                        'names (slower, for debugging the model)')
+    parser.add_argument('--memory-budget', type=float, help='megabytes the model may use, predicted before it is '
+                        'built')
+    parser.add_argument('--memory-budget-action', choices=['degrade', 'refuse'], help='make a model over the memory '
+                        'budget smaller (fewer workers, one month at a time, no consecutive days penalty) or stop')
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    '''
+    Adds the spreadsheet flags (read by backend_from_args) to a parser
+
+    Parameters:
+      parser - the parser
+
+    Returns: None
+    '''
+    parser.add_argument('--backend', choices=['google', 'local'], default='google',
+                        help='read the form responses from and write the schedule to Google Sheets, '
+                        'or to local .csv/.xlsx files')
+    parser.add_argument('--output-dir', default='.', help='directory the local backend writes the schedule to')
+    parser.add_argument('--output-format', choices=['csv', 'xlsx'], default='csv',
+                        help='file format the local backend writes the schedule in')
+    parser.add_argument('--live-formulas', action='store_true', help='write the per RA tallies as formulas that '
+                        'update when the schedule is edited, instead of values')
+    parser.add_argument('--form-cache', default='.form_cache', help='directory the form responses are kept in '
+                        'between runs, so only new responses are read (empty to turn off)')
+    parser.add_argument('--refresh-form', action='store_true', help='read every form response again '
+                        '(e.g. after an early response was edited)')
+
+
+def backend_from_args(args: argparse.Namespace) -> SpreadsheetBackend:
+    '''
+    Creates the spreadsheet backend chosen on the command line
+
+    Parameters:
+      args - the parsed command line flags
+
+    Returns:
+      the spreadsheet backend
+    '''
+    if args.backend == 'local':
+        return LocalFileBackend(args.output_dir, args.output_format)
+    return GoogleSheetsBackend()
+
+
+def form_cache_from_args(args: argparse.Namespace) -> FormCache:
+    '''
+    Creates the form cache chosen on the command line
+
+    Parameters:
+      args - the parsed command line flags
+
+    Returns:
+      the form cache (None if turned off)
+    '''
+    return FormCache(args.form_cache) if args.form_cache else None
+
+
+def solver_config_from_args(args: argparse.Namespace) -> SolverConfig:
+    '''
+    Creates the solver configuration: the profile from the environment (or --profile),
+    the RA_SCHEDULER_* environment variables, then the command line flags
+
+    Parameters:
+      args - the parsed command line flags
+
+    Returns:
+      the solver configuration
+    '''
+    config = solver_config_from_env(profile=args.profile)
+    flags = {
+        'num_workers': args.workers,
+        'max_time_in_seconds': args.time_limit,
+        'relative_gap_limit': args.gap,
+        'random_seed': args.seed,
+        'log_search_progress': args.log_search,
+        'debug_names': args.debug_names,
+        'memory_budget_mb': args.memory_budget,
+        'memory_budget_action': BudgetAction[args.memory_budget_action.upper()] if args.memory_budget_action else None,
+    }
+    return replace(config, **{field: value for field, value in flags.items() if value is not None})
 
 
 def handle_input(prompt: str, validate_function: Callable[[str], any]):
@@ -148,4 +373,10 @@ def validate_break(extended_holiday: str):
 
 
 if __name__ == '__main__':
-    user_input()
+    args = parse_args()
+    if args.from_snapshot:
+        publish_snapshot(args.from_snapshot, backend_from_args(args), args.live_formulas, args.republish)
+    else:
+        user_input(solver_config_from_args(args), args.previous_schedule, args.cutoff, args.rolling,
+                   backend_from_args(args), args.live_formulas, form_cache_from_args(args), args.refresh_form,
+                   args.republish, args.save_snapshot, args.report, args.metrics)
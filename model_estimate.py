@@ -0,0 +1,132 @@
+from dataclasses import dataclass, field
+from constants import ModelMode
+
+# bytes of memory per term of the model, measured on models of 40 - 160 RAs, 120 - 240 days and 1 - 16 workers:
+# the Python expressions while the model is built, the solver's copy of the model and presolve,
+# and every search worker (which has its own copy of the model on top of a fixed cost).
+# SHIFT models use less than their terms predict, so their estimate is on the safe side
+BUILD_BYTES_PER_TERM = 400
+SOLVER_BYTES_PER_TERM = 350
+WORKER_BYTES = 10 * 1024 * 1024
+WORKER_BYTES_PER_TERM = 150
+
+# the weeks of the too many shifts penalty start on the first day of the schedule
+DAYS_PER_WEEK = 7
+
+
+@dataclass(frozen=True)
+class ModelEstimate:
+    '''
+    The predicted size of a model, from the eligible (RA, day) pairs before the model is built
+
+    Attributes:
+      variables - number of variables
+      constraints - number of constraints
+      terms - number of terms of the constraints and the objectives
+      families - variables and constraints of every family of constraints (the same families the scheduler counts)
+    '''
+    variables: int
+    constraints: int
+    terms: int
+    families: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    def memory_bytes(self, num_workers: int) -> int:
+        '''
+        Predicts the peak memory of building and solving the model
+
+        Parameters:
+          num_workers - number of search workers
+
+        Returns:
+          the memory in bytes
+        '''
+        return ((BUILD_BYTES_PER_TERM + SOLVER_BYTES_PER_TERM) * self.terms +
+                num_workers * (WORKER_BYTES + WORKER_BYTES_PER_TERM * self.terms))
+
+    def max_workers(self, budget_bytes: int, num_workers: int) -> int:
+        '''
+        Finds the most search workers the model can be solved with in a memory budget
+
+        Parameters:
+          budget_bytes - the memory budget in bytes
+          num_workers - the most workers to use
+
+        Returns:
+          the number of workers (0 if the model does not fit the budget even with 1 worker)
+        '''
+        fixed_bytes = self.memory_bytes(0)
+        worker_bytes = self.memory_bytes(1) - fixed_bytes
+        return max(min(num_workers, (budget_bytes - fixed_bytes) // worker_bytes), 0)
+
+
+def estimate_model(eligibility: list[list[bool]], day_ppl: bytes, first_day_idx: int, last_day_idx: int,
+                   model_mode: ModelMode = ModelMode.DAY, consecutive_days: bool = True) -> ModelEstimate:
+    '''
+    Predicts the size of the model of the days from first_day_idx to last_day_idx, following how the
+    scheduler builds it (every count is linear in the eligible pairs, no model objects are created)
+
+    Parameters:
+      eligibility - the RA x day eligibility matrix
+      day_ppl - number of people on duty every day
+      first_day_idx - index of the first scheduled day
+      last_day_idx - index after the last scheduled day
+      model_mode - whether the model has a variable per (RA, day) or per (RA, day, shift)
+      consecutive_days - whether the model has the consecutive day penalty
+
+    Returns:
+      the estimate
+    '''
+    staff_size = len(eligibility)
+    total_days = len(day_ppl)
+    windowed = last_day_idx < total_days
+    families = {}
+    terms = 0
+
+    # the assignments: a literal per eligible pair (per shift slot in SHIFT mode), on_duty sums the literals
+    num_pairs = 0
+    num_literals = 0
+    too_many_shifts = 0
+    too_many_shifts_terms = 0
+    consecutive = 0
+    for row in eligibility:
+        eligible_days = [day_idx for day_idx in range(first_day_idx, last_day_idx) if row[day_idx]]
+        num_pairs += len(eligible_days)
+        ra_literals = sum(day_ppl[day_idx] for day_idx in eligible_days) if model_mode == ModelMode.SHIFT else (
+            len(eligible_days))
+        num_literals += ra_literals
+        shifts_per_week = {}
+        for day_idx in eligible_days:
+            week = day_idx // DAYS_PER_WEEK
+            shifts_per_week[week] = shifts_per_week.get(week, 0) + 1
+        for num_shifts in shifts_per_week.values():
+            if num_shifts > 2:
+                too_many_shifts += 1
+                too_many_shifts_terms += num_shifts + 1
+        if consecutive_days:
+            consecutive += sum(1 for previous, day_idx in zip(eligible_days, eligible_days[1:])
+                               if day_idx == previous + 1)
+    literals_per_pair = num_literals / num_pairs if num_pairs else 1
+    if model_mode == ModelMode.SHIFT:
+        # exactly one RA per shift slot and at most one slot per RA and day
+        families['assignments'] = {'variables': num_literals,
+                                   'constraints': sum(day_ppl[first_day_idx:last_day_idx]) + num_pairs}
+        terms += 2 * num_literals
+    else:
+        families['assignments'] = {'variables': num_pairs, 'constraints': last_day_idx - first_day_idx}
+        terms += num_pairs
+
+    # the max and min points of every RA, and the points off target and the most points ahead if the window ends early
+    points_constraints = 4 if windowed else 2
+    families['points'] = {'variables': 1 + staff_size if windowed else 0,
+                          'constraints': points_constraints * staff_size}
+    terms += points_constraints * num_literals
+
+    families['too_many_shifts'] = {'variables': too_many_shifts, 'constraints': too_many_shifts}
+    terms += round(too_many_shifts_terms * literals_per_pair)
+    families['consecutive_days'] = {'variables': consecutive, 'constraints': consecutive}
+    terms += round(consecutive * (2 * literals_per_pair + 1))
+
+    # the objectives: a term per penalty variable and up to a reward term per assignment
+    terms += too_many_shifts + consecutive + num_literals
+    return ModelEstimate(sum(size['variables'] for size in families.values()),
+                         sum(size['constraints'] for size in families.values()), terms, families)
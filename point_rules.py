@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from constants import DAYS_OF_WEEK, DaysOfWeek, Semester
+from ra_models import Holidays
+from schedule_models import Calendar
+
+
+@dataclass(frozen=True)
+class HolidayRule:
+    '''
+    Adds points to the shift a number of days from every holiday (the shift before a holiday is 24 hours)
+
+    Attributes:
+      offset - days from the holiday to the shift that gets the points
+      pts - points added to the shift
+    '''
+    offset: int = -1
+    pts: int = 1
+
+
+@dataclass(frozen=True)
+class BreakRule:
+    '''
+    Adds points to every shift of the break, the break is extended by the days before it
+
+    Attributes:
+      days_before - number of days before the first day of the break that are part of the break
+      pts_by_weekday - points added to a shift of the break by weekday (in the order of DAYS_OF_WEEK)
+    '''
+    days_before: int = 1
+    pts_by_weekday: tuple[int, ...] = (1,) * 7
+
+
+# Thanksgiving: assume the dates given are Wednesday - Sunday, the Tuesday before is added,
+# the weekdays get 2 points more and Tuesday, the weekend and Sunday 1 point more
+THANKSGIVING_PTS = tuple(1 if day_of_week in [DaysOfWeek.SUNDAY, DaysOfWeek.TUESDAY, DaysOfWeek.FRIDAY,
+                                              DaysOfWeek.SATURDAY] else 2
+                         for day_of_week in DAYS_OF_WEEK)
+# Spring break: assume the dates given are Saturday - Sunday (1 week + 1 day), the Friday before is added,
+# every day gets 1 point more
+SPRING_BREAK_PTS = (1,) * 7
+
+POINT_RULES = {
+    Semester.FALL: (HolidayRule(), BreakRule(1, THANKSGIVING_PTS)),
+    Semester.SPRING: (HolidayRule(), BreakRule(1, SPRING_BREAK_PTS)),
+    Semester.SUMMER: (HolidayRule(),),
+}
+
+
+@dataclass(frozen=True)
+class DayPoints:
+    '''
+    The points of every day of a calendar after the point rules
+
+    Attributes:
+      pts - points of every shift (index i is the first day + i days)
+      total_pts - total points of every shift of every day
+      is_break - 1 for the days of the break in every semester, and the days before it added by the rules
+    '''
+    pts: bytes
+    total_pts: int
+    is_break: bytes
+
+
+def evaluate_point_rules(calendar: Calendar, holidays: Holidays, rules: tuple) -> DayPoints:
+    '''
+    Calculates the points of every day of a calendar: the weekday and weekend points, then every rule on top,
+    without changing the calendar or the holidays (the same inputs always give the same points)
+
+    Parameters:
+      calendar - the calendar
+      holidays - the holidays and breaks
+      rules - the point rules (HolidayRule and BreakRule)
+
+    Returns:
+      the points
+    '''
+    return cached_point_rules(calendar.start_date, calendar.end_date, tuple(holidays.double_len),
+                              tuple(holidays.breaks), tuple(rules))
+
+
+@lru_cache(maxsize=64)
+def cached_point_rules(start_date: date, end_date: date, double_len: tuple[date, ...], breaks: tuple[date, ...],
+                       rules: tuple) -> DayPoints:
+    '''
+    Calculates the points of every day, once per calendar, holidays and rules (the result cannot be changed,
+    so it is shared by every solve of the same schedule)
+
+    Parameters:
+      start_date - first day of the calendar
+      end_date - last day of the calendar
+      double_len - the holidays
+      breaks - the days of the break
+      rules - the point rules
+
+    Returns:
+      the points
+    '''
+    calendar = Calendar(start_date, end_date)
+    num_days = calendar.num_days
+    pts = bytearray(calendar.pts)
+    # only half staff is on duty over the break whatever the semester, the rules only add points
+    # and the days before the break
+    is_break = bytearray(num_days)
+    for break_day in breaks:
+        if 0 <= calendar.index(break_day) < num_days:
+            is_break[calendar.index(break_day)] = 1
+
+    for rule in rules:
+        if isinstance(rule, HolidayRule):
+            for holiday in double_len:
+                day_idx = calendar.index(holiday) + rule.offset
+                if 0 <= day_idx < num_days:
+                    pts[day_idx] += rule.pts
+        elif isinstance(rule, BreakRule):
+            if not breaks:
+                continue
+            break_indices = {calendar.index(break_day) for break_day in breaks}
+            first_idx = min(break_indices)
+            break_indices.update(range(first_idx - rule.days_before, first_idx))
+            for day_idx in break_indices:
+                if 0 <= day_idx < num_days:
+                    # the points added on the day depend on its weekday
+                    pts[day_idx] += rule.pts_by_weekday[calendar.weekdays[day_idx]]
+                    is_break[day_idx] = 1
+        else:
+            raise ValueError(f'Unknown point rule {rule}')
+
+    return DayPoints(bytes(pts), sum(map(int.__mul__, pts, calendar.ppl)), bytes(is_break))
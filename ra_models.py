@@ -1,4 +1,4 @@
-from datetime import date, timedelta
+from datetime import date
 from constants import DaysOfWeek, Distribution
 
 
@@ -86,16 +86,3 @@ class Holidays:
         self.double_len = double_len
         self.breaks = breaks
 
-    def add_previous_day(self) -> None:
-        '''
-        Adds the prepending day of the break to the break
-
-        Parameters: None
-
-        Returns: None
-        '''
-        if not self.breaks:
-            return
-        first_day = self.breaks[0]
-        prev_day = first_day - timedelta(days=1)
-        self.breaks.insert(0, prev_day)
@@ -0,0 +1,306 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from ortools.sat.python import cp_model
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the peak memory of the process is not reported there
+    resource = None
+
+# the timings of a component can be recorded from the thread preparing the spreadsheet and the main thread
+TIMINGS_LOCK = threading.Lock()
+
+# prefix of the names of the Prometheus metrics
+METRICS_PREFIX = 'ra_scheduler'
+
+
+def record_time(timings: dict[str, float], phase: str, start: float) -> float:
+    '''
+    Adds the time since start to the time spent in a phase
+
+    Parameters:
+      timings - seconds spent in every phase
+      phase - name of the phase
+      start - time.perf_counter() value at the start of the phase
+
+    Returns:
+      the current time.perf_counter() value (the start of the next phase)
+    '''
+    now = time.perf_counter()
+    with TIMINGS_LOCK:
+        timings[phase] = timings.get(phase, 0.0) + now - start
+    return now
+
+
+def solver_statistics(stage: str, solver: cp_model.CpSolver, status: int) -> dict:
+    '''
+    Collects the statistics of a solve from the solver response
+
+    Parameters:
+      stage - name of the solver stage
+      solver - the solver after the solve
+      status - the solver status
+
+    Returns:
+      the statistics (the objective, best bound and gap are None if no solution was found)
+    '''
+    stats = {
+        'stage': stage,
+        'status': solver.status_name(status),
+        'conflicts': solver.num_conflicts,
+        'branches': solver.num_branches,
+        'wall_time': solver.wall_time,
+        'user_time': solver.user_time,
+        # the time limit the stage was given (None for no limit)
+        'time_limit': (solver.parameters.max_time_in_seconds
+                       if solver.parameters.max_time_in_seconds != float('inf') else None),
+        'objective': None,
+        'best_bound': None,
+        'gap': None,
+    }
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        objective = solver.objective_value
+        best_bound = solver.best_objective_bound
+        stats['objective'] = objective
+        stats['best_bound'] = best_bound
+        # the relative gap as the solver defines it for relative_gap_limit
+        stats['gap'] = abs(objective - best_bound) / max(abs(objective), 1.0)
+    return stats
+
+
+def run_status(solved: bool, feasibility_problems: list[str], solver_stats: list[dict]) -> str:
+    '''
+    Finds how a run of the scheduler ended
+
+    Parameters:
+      solved - whether the scheduler returned a schedule
+      feasibility_problems - the problems the feasibility check found
+      solver_stats - the statistics of every solve
+
+    Returns:
+      'solved', 'infeasible' if the schedule was proven impossible (by the feasibility check or the solver),
+      or 'no solution' if the time ran out (or the model did not fit the memory budget)
+    '''
+    if solved:
+        return 'solved'
+    if feasibility_problems or any(stats['status'] == 'INFEASIBLE' for stats in solver_stats):
+        return 'infeasible'
+    return 'no solution'
+
+
+def stage_objectives(solver_stats: list[dict]) -> dict[str, float]:
+    '''
+    Finds the objective of every solver stage (of the last window of a rolling schedule)
+
+    Parameters:
+      solver_stats - the statistics of every solve
+
+    Returns:
+      the objective by stage name, for the stages that found a solution
+    '''
+    return {stats['stage']: stats['objective'] for stats in solver_stats if stats['objective'] is not None}
+
+
+def peak_memory() -> dict[str, int]:
+    '''
+    Measures the peak memory of the process so far: the resident set size (including the solver's memory),
+    and the Python allocations if tracemalloc is tracing (e.g. with PYTHONTRACEMALLOC=1)
+
+    Parameters: None
+
+    Returns:
+      the peak memory in bytes, by measurement
+    '''
+    memory = {}
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        memory['peak_rss_bytes'] = max_rss if sys.platform == 'darwin' else max_rss * 1024
+    if tracemalloc.is_tracing():
+        memory['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+    return memory
+
+
+class RunReport:
+    '''
+    Where the time of a run went and how large its model was, written as a JSON report
+    and as a Prometheus text format file (e.g. for the node exporter's textfile collector)
+
+    Attributes:
+      timings - seconds spent in every phase (logging in, reading the form, building the model, solving, publishing...)
+      model_size - variables and constraints of the last model built, in total and by family of constraints
+      solver_stats - the statistics of every solve, in the order they ran
+      memory - the predicted memory of the model, the memory budget, what was given up to fit it
+        and the peak memory measured
+      staff_size - number of RAs
+      num_days - number of days of the schedule
+    '''
+
+    def __init__(self, staff_size: int = 0, num_days: int = 0) -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          staff_size - number of RAs
+          num_days - number of days of the schedule
+        '''
+        self.timings = {}
+        self.model_size = {}
+        self.solver_stats = []
+        self.memory = {}
+        self.staff_size = staff_size
+        self.num_days = num_days
+
+    @classmethod
+    def from_run(cls, scheduler, spreadsheet_client, timings: dict[str, float] = None) -> 'RunReport':
+        '''
+        Collects the report of a run from the scheduler and the spreadsheet client (and its backend)
+
+        Parameters:
+          scheduler - the duty scheduler of the run
+          spreadsheet_client - the spreadsheet client of the run
+          timings - other phases of the run (e.g. the whole run)
+
+        Returns:
+          the report
+        '''
+        report = cls(len(scheduler.ra_availabilities), scheduler.calendar.num_days)
+        # only the Google Sheets backend has phases of its own (logging in)
+        for component_timings in (getattr(spreadsheet_client.backend, 'timings', {}), spreadsheet_client.timings,
+                                  scheduler.timings, timings or {}):
+            report.timings.update(component_timings)
+        report.model_size = scheduler.model_size
+        report.solver_stats = scheduler.solver_stats
+        report.memory = {'estimate': scheduler.memory_estimate, 'degradations': scheduler.degradations,
+                         **peak_memory()}
+        return report
+
+    def to_dict(self) -> dict:
+        '''
+        Creates the JSON report
+
+        Parameters: None
+
+        Returns:
+          the report as a dictionary
+        '''
+        return {
+            'staff_size': self.staff_size,
+            'num_days': self.num_days,
+            'timings': self.timings,
+            'model_size': self.model_size,
+            'solver_stats': self.solver_stats,
+            'memory': self.memory,
+        }
+
+    def metrics(self) -> str:
+        '''
+        Creates the Prometheus text format of the report
+
+        Parameters: None
+
+        Returns:
+          the metrics, one sample per line
+        '''
+        lines = []
+
+        def add_metric(name: str, help_text: str, samples: list[tuple[dict, float]]) -> None:
+            samples = [(labels, value) for labels, value in samples if value is not None]
+            if not samples:
+                return
+            lines.append(f'# HELP {METRICS_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRICS_PREFIX}_{name} gauge')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{escape_label(str(label))}"' for key, label in labels.items())
+                lines.append(f'{METRICS_PREFIX}_{name}{{{label_text}}} {float(value)!r}' if label_text else
+                             f'{METRICS_PREFIX}_{name} {float(value)!r}')
+
+        add_metric('staff_size', 'Number of RAs', [({}, self.staff_size)])
+        add_metric('days', 'Number of days of the schedule', [({}, self.num_days)])
+        add_metric('phase_seconds', 'Seconds spent in every phase of the run',
+                   [({'phase': phase}, seconds) for phase, seconds in self.timings.items()])
+        families = self.model_size.get('families', {})
+        for size in ['variables', 'constraints']:
+            add_metric(f'model_{size}', f'Number of {size} of the last model built',
+                       [({}, self.model_size.get(size))])
+            add_metric(f'model_family_{size}', f'Number of {size} of the last model built by family',
+                       [({'family': family}, family_size[size]) for family, family_size in families.items()])
+        for stat, name, help_text in [
+                ('conflicts', 'conflicts', 'Conflicts of the solve'), ('branches', 'branches', 'Branches of the solve'),
+                ('wall_time', 'wall_seconds', 'Wall clock seconds of the solve'),
+                ('user_time', 'user_seconds', 'User seconds of the solve'),
+                ('time_limit', 'time_limit_seconds', 'Time limit of the solve in seconds'),
+                ('objective', 'objective', 'Objective value of the best solution found'),
+                ('best_bound', 'best_bound', 'Best bound on the objective value'),
+                ('gap', 'gap', 'Relative gap between the objective value and the best bound')]:
+            add_metric(f'solver_{name}', help_text,
+                       [({'solve': solve_idx, 'stage': stats['stage'], 'status': stats['status']}, stats[stat])
+                        for solve_idx, stats in enumerate(self.solver_stats)])
+        estimate = self.memory.get('estimate', {})
+        add_metric('estimated_memory_bytes', 'Predicted memory of building and solving the model',
+                   [({}, estimate.get('memory_bytes'))])
+        add_metric('memory_budget_bytes', 'Memory budget of the model', [({}, estimate.get('budget_bytes'))])
+        add_metric('memory_degradations', 'Number of things given up to fit the memory budget',
+                   [({}, len(self.memory['degradations']) if 'degradations' in self.memory else None)])
+        add_metric('peak_rss_bytes', 'Peak resident set size of the run', [({}, self.memory.get('peak_rss_bytes'))])
+        add_metric('peak_traced_bytes', 'Peak memory of the Python allocations traced by tracemalloc',
+                   [({}, self.memory.get('peak_traced_bytes'))])
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: str) -> None:
+        '''
+        Writes the JSON report
+
+        Parameters:
+          path - path of the file
+
+        Returns: None
+        '''
+        write_atomically(path, json.dumps(self.to_dict(), indent=2))
+
+    def write_metrics(self, path: str) -> None:
+        '''
+        Writes the Prometheus text format of the report (to a temporary file first,
+        so a collector never reads half the metrics)
+
+        Parameters:
+          path - path of the file
+
+        Returns: None
+        '''
+        write_atomically(path, self.metrics())
+
+
+def escape_label(value: str) -> str:
+    '''
+    Escapes the value of a Prometheus label
+
+    Parameters:
+      value - the value
+
+    Returns:
+      the escaped value
+    '''
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_atomically(path: str, text: str) -> None:
+    '''
+    Writes a text file through a temporary file in the same directory, so the file is never half written
+
+    Parameters:
+      path - path of the file
+      text - content of the file
+
+    Returns: None
+    '''
+    descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as report_file:
+        report_file.write(text)
+    os.replace(temporary_path, path)
@@ -1,72 +1,162 @@
-from datetime import date
-from ra_models import Ra
-from constants import WEEKENDS, CONSTANTS, DaysOfWeek
+from array import array
+from calendar import monthrange
+from datetime import date, timedelta
+from ra_models import Holidays
+from constants import WEEKENDS, CONSTANTS, DAYS_OF_WEEK
 
-class Day:
+# people on duty and points of a shift by weekday (index into DAYS_OF_WEEK)
+PPL_BY_WEEKDAY = array('B', [CONSTANTS.PPL_PER_SHIFT_WEEKEND if day_of_week in WEEKENDS
+                             else CONSTANTS.PPL_PER_SHIFT_WEEKDAY for day_of_week in DAYS_OF_WEEK])
+PTS_BY_WEEKDAY = array('B', [2 if day_of_week in WEEKENDS else 1 for day_of_week in DAYS_OF_WEEK])
+
+
+class Calendar:
     '''
-    Represents the information about duty on a specific day
+    Every day from the first to the last day of duty, stored as columns (index i is the first day + i days)
 
     Attributes:
-
-    Methods:
+      start_date - first day
+      end_date - last day
+      num_days - number of days
+      ordinals - ordinal (date.toordinal) of every day
+      weekdays - weekday of every day (index into DAYS_OF_WEEK)
+      ppl - how many people are on every shift
+      pts - how many points every shift is (weekday or weekend, the holidays and the break are added by the point rules)
+      months - index of the month of every day into month_names
+      month_names - name of every month in the calendar, in order
+      is_holiday - 1 for the holidays (double length days)
+      is_break - 1 for the days of the break
     '''
 
-    def __init__(self, date: date, day_of_week: DaysOfWeek) -> None:
+    def __init__(self, start_date: date, end_date: date, holidays: Holidays = None) -> None:
         '''
         Initializes attributes
 
         Parameters:
-          date - the date
-          day_of_week - which day of the week
-          num_of_ppl - how many people are on this shift
-          pts - how many points this shift is
+          start_date - first day
+          end_date - last day
+          holidays - the holidays and breaks (None for neither)
         '''
-        self.date = date
-        self.day_of_week = day_of_week
-        self.ppl = self.calculate_num_ppl_on()
-        self.pts = self.calculate_pts()
+        self.start_date = start_date
+        self.end_date = end_date
+        self.num_days = max((end_date - start_date).days + 1, 0)
+        first_ordinal = start_date.toordinal()
+        self.ordinals = array('i', range(first_ordinal, first_ordinal + self.num_days))
+        # the weekdays repeat every week, and the people and points only depend on the weekday
+        first_week = bytes((start_date.weekday() + day_idx) % 7 for day_idx in range(7))
+        self.weekdays = (first_week * (self.num_days // 7 + 1))[:self.num_days]
+        self.ppl = array('B', [PPL_BY_WEEKDAY[weekday] for weekday in self.weekdays])
+        self.pts = array('B', [PTS_BY_WEEKDAY[weekday] for weekday in self.weekdays])
+
+        # one step per month instead of per day
+        self.months = bytearray()
+        self.month_names = []
+        cur_date = start_date
+        while cur_date <= end_date:
+            month_end = min(date(cur_date.year, cur_date.month, monthrange(cur_date.year, cur_date.month)[1]), end_date)
+            self.months += bytes([len(self.month_names)]) * ((month_end - cur_date).days + 1)
+            self.month_names.append(cur_date.strftime('%B'))
+            cur_date = month_end + timedelta(days=1)
+
+        self.is_holiday = bytearray(self.num_days)
+        self.is_break = bytearray(self.num_days)
+        if holidays:
+            for holiday in holidays.double_len:
+                if 0 <= self.index(holiday) < self.num_days:
+                    self.is_holiday[self.index(holiday)] = 1
+            for break_day in holidays.breaks:
+                if 0 <= self.index(break_day) < self.num_days:
+                    self.is_break[self.index(break_day)] = 1
+
+    def index(self, day: date) -> int:
+        '''
+        Finds the index of a date
+
+        Parameters:
+          day - the date
 
-    def calculate_num_ppl_on(self) -> int:
+        Returns:
+          the index (outside of 0 to num_days - 1 if the date is not in the calendar)
         '''
-        Calculates the number of people on this shift
+        return day.toordinal() - self.start_date.toordinal()
+
+    def total_pts(self) -> int:
+        '''
+        Calculates the total points of every shift of every day
 
         Parameters: None
 
         Returns:
-          number of people on this shift
+          the total points
         '''
-        if self.day_of_week in WEEKENDS:
-            return CONSTANTS.PPL_PER_SHIFT_WEEKEND
-        else: 
-            return CONSTANTS.PPL_PER_SHIFT_WEEKDAY
-    
-    def calculate_pts(self) -> int:
+        return sum(map(int.__mul__, self.pts, self.ppl))
+
+    def days_per_month(self) -> dict[str, int]:
         '''
-        Calculates the number of points on this shift (based on weekday vs weekend)
+        Counts the days of every month
 
         Parameters: None
 
         Returns:
-          number of points this shift is
+          dictionary: key -> month name, value -> number of days
         '''
-        if self.day_of_week in WEEKENDS:
-            return 2
-        else:
-            return 1
-    
-    def add_pts(self, pts: int) -> int:
+        months = {}
+        for month_idx, month_name in enumerate(self.month_names):
+            months[month_name] = months.get(month_name, 0) + self.months.count(month_idx)
+        return months
+
+    def month_lengths(self) -> list[int]:
         '''
-        Adds points to the current amount of points for this shift
+        Counts the days of every month, in calendar order (a month that repeats in a long calendar is counted twice)
 
-        Parameters: 
-          pts - number of pts to add 
+        Parameters: None
+
+        Returns:
+          the number of days of every month
+        '''
+        return [self.months.count(month_idx) for month_idx in range(len(self.month_names))]
 
-        Returns: 
-          new points for this shift
+    def days(self) -> list['Day']:
+        '''
+        Creates the day records of the calendar (their points are kept in the calendar)
+
+        Parameters: None
+
+        Returns:
+          list of days in date order
+        '''
+        return [Day(self, day_idx) for day_idx in range(self.num_days)]
+
+
+class Day:
+    '''
+    Represents the information about duty on a specific day, a record of one day of a calendar
+
+    Attributes:
+      calendar - the calendar the day is in
+      idx - index of the day in the calendar
+      date - the date
+      day_of_week - which day of the week
+      ppl - how many people are on this shift
+      pts - how many points this shift is
+    '''
+    __slots__ = ('calendar', 'idx', 'date', 'day_of_week', 'ppl', 'pts')
+
+    def __init__(self, calendar: Calendar, idx: int) -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          calendar - the calendar the day is in
+          idx - index of the day in the calendar
         '''
-        self.pts += pts
+        self.calendar = calendar
+        self.idx = idx
+        self.date = date.fromordinal(calendar.ordinals[idx])
+        self.day_of_week = DAYS_OF_WEEK[calendar.weekdays[idx]]
+        self.ppl = calendar.ppl[idx]
+        self.pts = calendar.pts[idx]
 
-        return self.pts
 
 class ScheduleDay:
     '''
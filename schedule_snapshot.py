@@ -0,0 +1,324 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from datetime import date, timedelta
+from constants import CONSTANTS, DAYS_OF_WEEK, Constants, Distribution
+from ra_models import Holidays, Ra, RaAvailability
+from schedule_models import Calendar, ScheduleDay
+
+SNAPSHOT_MAGIC = b'RASNAP\x00\x00'
+SNAPSHOT_VERSION = 1
+# magic, version, length of the JSON header
+SNAPSHOT_PREFIX = struct.Struct('<8sII')
+# every array starts on a multiple of this, so it can be used in place from the mapped file
+SNAPSHOT_ALIGNMENT = 8
+
+
+class ScheduleSnapshot:
+    '''
+    The inputs and the result of a run, written to a single file that is read back without the network or a re-solve
+
+    The file is a short JSON header (the dates, names and constants, and where every array starts)
+    followed by the arrays packed little endian, which are used in place from the memory mapped file
+
+    Attributes:
+      start_date - first day of duty
+      end_date - last day of duty
+      constants - the people per shift the schedule was made with
+      half_staff - names of the RAs on half staff
+      availability_names - names of the RAs in the form responses
+      ra_names - names of the RAs in the schedule: the staff, then the RAs no longer on staff who worked a shift
+      num_staff - number of RAs on staff (the first ra_names)
+      arrays - dictionary: key -> name, value -> array or memoryview of the values:
+        move_in - ordinal of the move in date of every RA in the form responses (0 if not answered)
+        no_date_offsets, no_dates - the ordinals of the dates RA i cannot do are no_dates[no_date_offsets[i]:no_date_offsets[i + 1]]
+        no_days - bitmask of the days of the week every RA cannot do, bit i is DAYS_OF_WEEK[i]
+        distribution - Distribution value of every RA
+        returner, community_returner - 1 if the RA has been an RA (in this community) before
+        double_len, breaks - ordinals of the holidays and of the days of the break
+        day_ppl, day_pts - people on duty and points of every scheduled day (after the holidays are added)
+        assignments - 1 if ra_names[i] is on duty on scheduled day j, at i * num_days + j
+        ra_pts - points of every RA on staff
+    '''
+
+    def __init__(self, start_date: date, end_date: date, half_staff: list[str], availability_names: list[str],
+                 ra_names: list[str], num_staff: int, arrays: dict, constants: Constants = CONSTANTS) -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          start_date - first day of duty
+          end_date - last day of duty
+          half_staff - names of the RAs on half staff
+          availability_names - names of the RAs in the form responses
+          ra_names - names of the RAs in the schedule (the staff first)
+          num_staff - number of RAs on staff
+          arrays - the packed inputs and results (see the class attributes)
+          constants - the people per shift the schedule was made with
+        '''
+        self.start_date = start_date
+        self.end_date = end_date
+        self.half_staff = half_staff
+        self.availability_names = availability_names
+        self.ra_names = ra_names
+        self.num_staff = num_staff
+        self.arrays = arrays
+        self.constants = constants
+        # the file the arrays are mapped from (None if they are in memory)
+        self.mapped_file = None
+
+    @classmethod
+    def from_schedule(cls, start_date: date, end_date: date, availabilities: list[RaAvailability],
+                      holidays: Holidays, half_staff: list[str], schedule: list[ScheduleDay],
+                      ras: list[Ra]) -> 'ScheduleSnapshot':
+        '''
+        Packs the inputs and the result of a run
+
+        Parameters:
+          start_date - first day of duty
+          end_date - last day of duty
+          availabilities - the RA availabilities from the form responses
+          holidays - the holidays and breaks as they were given
+          half_staff - names of the RAs on half staff
+          schedule - the schedule information (day & ras on)
+          ras - list of RAs on staff (with their points)
+
+        Returns:
+          the snapshot
+        '''
+        ra_names = [ra.name for ra in ras]
+        ra_indices = {name: ra_idx for ra_idx, name in enumerate(ra_names)}
+        for day_schedule in schedule:
+            for ra in day_schedule.ras_on:
+                if ra.name not in ra_indices:
+                    # an RA no longer on staff who worked a shift before a re-solve
+                    ra_indices[ra.name] = len(ra_names)
+                    ra_names.append(ra.name)
+
+        num_days = len(schedule)
+        assignments = bytearray(len(ra_names) * num_days)
+        for day_idx, day_schedule in enumerate(schedule):
+            for ra in day_schedule.ras_on:
+                assignments[ra_indices[ra.name] * num_days + day_idx] = 1
+
+        no_date_offsets = array('i', [0])
+        no_dates = array('i')
+        for availability in availabilities:
+            no_dates.extend(no_date.toordinal() for no_date in availability.no_dates)
+            no_date_offsets.append(len(no_dates))
+
+        arrays = {
+            'move_in': array('i', [availability.move_in_date.toordinal() if availability.move_in_date else 0
+                                   for availability in availabilities]),
+            'no_date_offsets': no_date_offsets,
+            'no_dates': no_dates,
+            'no_days': array('B', [sum(1 << DAYS_OF_WEEK.index(day) for day in set(availability.no_days))
+                                   for availability in availabilities]),
+            'distribution': array('B', [availability.distribution.value for availability in availabilities]),
+            'returner': array('B', [availability.returner for availability in availabilities]),
+            'community_returner': array('B', [availability.community_returner for availability in availabilities]),
+            'double_len': array('i', [holiday.toordinal() for holiday in holidays.double_len]),
+            'breaks': array('i', [break_day.toordinal() for break_day in holidays.breaks]),
+            'day_ppl': array('B', [day_schedule.day.ppl for day_schedule in schedule]),
+            'day_pts': array('B', [day_schedule.day.pts for day_schedule in schedule]),
+            'assignments': array('B', assignments),
+            'ra_pts': array('i', [ra.pts for ra in ras]),
+        }
+        return cls(start_date, end_date, list(half_staff), [availability.name for availability in availabilities],
+                   ra_names, len(ras), arrays)
+
+    def save(self, path: str) -> None:
+        '''
+        Writes the snapshot to a file
+
+        Parameters:
+          path - path of the file
+
+        Returns: None
+        '''
+        layout = {}
+        offset = 0
+        for name, values in self.arrays.items():
+            offset = -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+            layout[name] = [values.format if isinstance(values, memoryview) else values.typecode, offset, len(values)]
+            offset += len(values) * values.itemsize
+        header = json.dumps({
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'constants': {'ppl_per_shift_weekday': self.constants.PPL_PER_SHIFT_WEEKDAY,
+                          'ppl_per_shift_weekend': self.constants.PPL_PER_SHIFT_WEEKEND},
+            'half_staff': self.half_staff,
+            'availability_names': self.availability_names,
+            'ra_names': self.ra_names,
+            'num_staff': self.num_staff,
+            'arrays': layout,
+        }).encode()
+        # the arrays start after the header, aligned
+        data_start = -(-(SNAPSHOT_PREFIX.size + len(header)) // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+        header += b' ' * (data_start - SNAPSHOT_PREFIX.size - len(header))
+
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # written to a temporary file first so an interrupted run does not leave half a snapshot
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as snapshot_file:
+            snapshot_file.write(SNAPSHOT_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+            snapshot_file.write(header)
+            for name, values in self.arrays.items():
+                snapshot_file.write(b'\x00' * (data_start + layout[name][1] - snapshot_file.tell()))
+                snapshot_file.write(little_endian(values))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ScheduleSnapshot':
+        '''
+        Reads a snapshot, the arrays are mapped from the file instead of read
+
+        Parameters:
+          path - path of the file
+
+        Returns:
+          the snapshot
+        '''
+        with open(path, 'rb') as snapshot_file:
+            mapped_file = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped_file) < SNAPSHOT_PREFIX.size:
+            raise ValueError(f'{path} is not a schedule snapshot')
+        magic, version, header_length = SNAPSHOT_PREFIX.unpack_from(mapped_file)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f'{path} is not a schedule snapshot')
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f'{path} was written by a newer version (snapshot version {version})')
+        data_start = SNAPSHOT_PREFIX.size + header_length
+        header = json.loads(mapped_file[SNAPSHOT_PREFIX.size:data_start])
+
+        data = memoryview(mapped_file)
+        arrays = {}
+        for name, (typecode, offset, length) in header['arrays'].items():
+            start = data_start + offset
+            values = data[start:start + length * array(typecode).itemsize].cast(typecode)
+            if sys.byteorder != 'little':
+                values = array(typecode, values)
+                values.byteswap()
+            arrays[name] = values
+
+        constants = Constants(header['constants']['ppl_per_shift_weekday'],
+                              header['constants']['ppl_per_shift_weekend'])
+        snapshot = cls(date.fromisoformat(header['start_date']), date.fromisoformat(header['end_date']),
+                       header['half_staff'], header['availability_names'], header['ra_names'],
+                       header['num_staff'], arrays, constants)
+        snapshot.mapped_file = mapped_file
+        return snapshot
+
+    def availabilities(self) -> list[RaAvailability]:
+        '''
+        Creates the RA availabilities the schedule was made from
+
+        Parameters: None
+
+        Returns:
+          list of RA availabilities
+        '''
+        arrays = self.arrays
+        offsets = arrays['no_date_offsets']
+        return [RaAvailability(name=name,
+                               move_in_date=date.fromordinal(arrays['move_in'][ra_idx])
+                               if arrays['move_in'][ra_idx] else None,
+                               no_dates=[date.fromordinal(ordinal)
+                                         for ordinal in arrays['no_dates'][offsets[ra_idx]:offsets[ra_idx + 1]]],
+                               no_days=[day for weekday, day in enumerate(DAYS_OF_WEEK)
+                                        if arrays['no_days'][ra_idx] >> weekday & 1],
+                               distribution=Distribution(arrays['distribution'][ra_idx]),
+                               returner=bool(arrays['returner'][ra_idx]),
+                               community_returner=bool(arrays['community_returner'][ra_idx]))
+                for ra_idx, name in enumerate(self.availability_names)]
+
+    def holidays(self) -> Holidays:
+        '''
+        Creates the holidays and breaks the schedule was made with
+
+        Parameters: None
+
+        Returns:
+          the holidays
+        '''
+        return Holidays([date.fromordinal(ordinal) for ordinal in self.arrays['double_len']],
+                        [date.fromordinal(ordinal) for ordinal in self.arrays['breaks']])
+
+    def schedule(self) -> tuple[list[ScheduleDay], list[Ra]]:
+        '''
+        Creates the schedule the run made
+
+        Parameters: None
+
+        Returns:
+          the schedule for every day
+          the list of RAs on staff (with their points)
+        '''
+        availabilities = {availability.name: availability for availability in self.availabilities()}
+        ras = []
+        for ra_idx, name in enumerate(self.ra_names):
+            availability = availabilities.get(name, RaAvailability(name=name))
+            ras.append(Ra(name=name, points=self.arrays['ra_pts'][ra_idx] if ra_idx < self.num_staff else 0,
+                          half_staff=name in self.half_staff, returner=availability.returner,
+                          community_returner=availability.community_returner))
+
+        assignments = self.arrays['assignments']
+        num_days = len(self.arrays['day_pts'])
+        calendar = Calendar(self.start_date, self.start_date + timedelta(days=num_days - 1), self.holidays())
+        calendar.ppl[:] = array('B', self.arrays['day_ppl'])
+        calendar.pts[:] = array('B', self.arrays['day_pts'])
+        schedule = []
+        for day_idx, day in enumerate(calendar.days()):
+            day_schedule = ScheduleDay(day)
+            for ra_idx, ra in enumerate(ras):
+                if assignments[ra_idx * num_days + day_idx]:
+                    day_schedule.add_ra(ra)
+            schedule.append(day_schedule)
+        return schedule, ras[:self.num_staff]
+
+    def previous_schedule(self) -> dict[date, list[str]]:
+        '''
+        Lists who is on duty every day, the way a published schedule is read back for a re-solve
+
+        Parameters: None
+
+        Returns:
+          dictionary: key -> date, value -> names of the RAs on duty that day
+        '''
+        schedule, _ = self.schedule()
+        return {day_schedule.day.date: [ra.name for ra in day_schedule.ras_on] for day_schedule in schedule}
+
+    def days_per_month(self) -> dict[str, int]:
+        '''
+        Counts the scheduled days of every month
+
+        Parameters: None
+
+        Returns:
+          dictionary: key -> month name, value -> number of days
+        '''
+        num_days = len(self.arrays['day_pts'])
+        return Calendar(self.start_date, self.start_date + timedelta(days=num_days - 1)).days_per_month()
+
+
+def little_endian(values) -> bytes:
+    '''
+    Packs an array little endian
+
+    Parameters:
+      values - array or memoryview
+
+    Returns:
+      the bytes
+    '''
+    if isinstance(values, memoryview):
+        values = array(values.format, values)
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
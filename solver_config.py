@@ -0,0 +1,110 @@
+import os
+from dataclasses import dataclass, replace
+from ortools.sat.python import cp_model
+from constants import BudgetAction
+
+
+@dataclass(frozen=True)
+class SolverConfig:
+    '''
+    Search parameters for the CP-SAT solver
+
+    Attributes:
+      num_workers - number of search workers (0 lets the solver use every core)
+      max_time_in_seconds - wall clock limit for the whole solve, over every stage (None for no limit)
+      relative_gap_limit - stop a stage once the objective is within this fraction of the best bound (None for optimal)
+      random_seed - seed for the search (None for the solver default)
+      log_search_progress - if the solver should print its search log
+      penalty_time_limit - time limit in seconds for the penalty stage (None for no limit)
+      reward_time_limit - time limit in seconds for the distribution reward stage (None for no limit)
+      debug_names - if the model variables should have readable names (RA, date), for reading exported models
+      memory_budget_mb - megabytes the model may use to build and solve, as predicted before it is built
+        (None for no budget)
+      memory_budget_action - whether a model over the budget is made smaller until it fits or the run stops
+    '''
+    num_workers: int = 0
+    max_time_in_seconds: float = None
+    relative_gap_limit: float = None
+    random_seed: int = None
+    log_search_progress: bool = False
+    penalty_time_limit: float = None
+    reward_time_limit: float = 30.0
+    debug_names: bool = False
+    memory_budget_mb: float = None
+    memory_budget_action: BudgetAction = BudgetAction.DEGRADE
+
+    def apply(self, solver: cp_model.CpSolver, time_limit: float = None) -> None:
+        '''
+        Sets the search parameters of a solver
+
+        Parameters:
+          solver - the solver
+          time_limit - time limit in seconds for this solve (None for no limit)
+
+        Returns: None
+        '''
+        solver.parameters.num_workers = self.num_workers
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        if self.relative_gap_limit is not None:
+            solver.parameters.relative_gap_limit = self.relative_gap_limit
+        if self.random_seed is not None:
+            solver.parameters.random_seed = self.random_seed
+        solver.parameters.log_search_progress = self.log_search_progress
+
+
+# named profiles, selected with the RA_SCHEDULER_PROFILE environment variable or the --profile flag
+PROFILES = {
+    'default': SolverConfig(),
+    'fast_draft': SolverConfig(max_time_in_seconds=60.0, relative_gap_limit=0.05,
+                               penalty_time_limit=45.0, reward_time_limit=15.0),
+    'overnight_optimal': SolverConfig(max_time_in_seconds=8 * 60 * 60.0, relative_gap_limit=0.0,
+                                      reward_time_limit=None),
+}
+
+# environment variables that override single fields of the profile
+ENV_OVERRIDES = {
+    'RA_SCHEDULER_NUM_WORKERS': ('num_workers', int),
+    'RA_SCHEDULER_TIME_LIMIT': ('max_time_in_seconds', float),
+    'RA_SCHEDULER_GAP': ('relative_gap_limit', float),
+    'RA_SCHEDULER_SEED': ('random_seed', int),
+    'RA_SCHEDULER_LOG_SEARCH': ('log_search_progress', lambda value: value.lower() in ['1', 'true', 'yes']),
+    'RA_SCHEDULER_DEBUG_NAMES': ('debug_names', lambda value: value.lower() in ['1', 'true', 'yes']),
+    'RA_SCHEDULER_MEMORY_BUDGET': ('memory_budget_mb', float),
+    'RA_SCHEDULER_MEMORY_BUDGET_ACTION': ('memory_budget_action', lambda value: BudgetAction[value.upper()]),
+}
+
+
+def get_profile(name: str) -> SolverConfig:
+    '''
+    Finds a named solver profile
+
+    Parameters:
+      name - name of the profile (spaces and dashes are treated as underscores)
+
+    Returns:
+      the solver configuration of the profile
+    '''
+    key = name.strip().lower().replace(' ', '_').replace('-', '_')
+    if key not in PROFILES:
+        raise ValueError(f'Unknown solver profile {name}, expected one of {", ".join(PROFILES)}')
+    return PROFILES[key]
+
+
+def solver_config_from_env(environ: dict[str, str] = os.environ, profile: str = None) -> SolverConfig:
+    '''
+    Creates the solver configuration from the RA_SCHEDULER_* environment variables
+
+    Parameters:
+      environ - the environment variables
+      profile - name of the profile to start from (overrides RA_SCHEDULER_PROFILE)
+
+    Returns:
+      the profile named by RA_SCHEDULER_PROFILE (or the default profile) with the other variables applied on top
+    '''
+    config = get_profile(profile or environ.get('RA_SCHEDULER_PROFILE', 'default'))
+    overrides = {}
+    for variable, (field, parse) in ENV_OVERRIDES.items():
+        if environ.get(variable):
+            overrides[field] = parse(environ[variable])
+    return replace(config, **overrides)
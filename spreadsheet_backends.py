@@ -0,0 +1,635 @@
+from abc import ABC, abstractmethod
+import csv
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from run_report import record_time
+
+try:
+    from google.auth.exceptions import RefreshError
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+except ImportError:
+    # only needed for the Google Sheets backend
+    InstalledAppFlow = None
+    build = None
+
+try:
+    import openpyxl
+except ImportError:
+    # only needed to read and write .xlsx files
+    openpyxl = None
+
+# Define the scope for Sheets API
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+# rows read at a time by get_row_chunks
+CHUNK_ROWS = 500
+
+
+class SpreadsheetBackend(ABC):
+    '''
+    Reads and writes spreadsheets for the spreadsheet client, the requests and values follow the Google Sheets API
+
+    Methods:
+      spreadsheet_id - finds the id of a spreadsheet from its url or path
+      get_values - reads the values of a range
+      create_spreadsheet - creates a new spreadsheet
+      open_spreadsheet - opens an existing spreadsheet to update it
+      batch_update - applies formatting and cell requests
+    '''
+
+    @abstractmethod
+    def spreadsheet_id(self, spreadsheet: str) -> str:
+        '''
+        Finds the id of a spreadsheet from its url or path (the same id for every way of writing them)
+
+        Parameters:
+          spreadsheet - url or path of the spreadsheet
+
+        Returns:
+          the spreadsheet id
+        '''
+
+    @abstractmethod
+    def get_values(self, spreadsheet: str, range_name: str, formulas: bool = False) -> list[list[str]]:
+        '''
+        Reads the values of a range
+
+        Parameters:
+          spreadsheet - url or path of the spreadsheet
+          range_name - range in A1 notation (e.g. 'Duty!B2:G') or the title of a sheet
+          formulas - whether to read the formulas of the cells instead of what they display
+
+        Returns:
+          the values of the range as a list of rows
+        '''
+
+    def get_row_chunks(self, spreadsheet: str, sheet_title: str, chunk_rows: int = CHUNK_ROWS):
+        '''
+        Reads the rows of a sheet a few at a time, so they can be parsed while the rest are read
+        (the rows are the ones get_values reads for the whole sheet)
+
+        Parameters:
+          spreadsheet - url or path of the spreadsheet
+          sheet_title - title of the sheet
+          chunk_rows - the most rows in a chunk
+
+        Returns:
+          a generator of lists of rows
+        '''
+        rows = self.get_values(spreadsheet, sheet_title)
+        for chunk_start in range(0, len(rows), chunk_rows):
+            yield rows[chunk_start:chunk_start + chunk_rows]
+
+    @abstractmethod
+    def create_spreadsheet(self, title: str, sheet_titles: list[str]) -> tuple[str, list[int]]:
+        '''
+        Creates a new spreadsheet
+
+        Parameters:
+          title - title of the spreadsheet
+          sheet_titles - titles of the sheets
+
+        Returns:
+          the spreadsheet id
+          the sheet ids
+        '''
+
+    @abstractmethod
+    def open_spreadsheet(self, spreadsheet: str, sheet_titles: list[str]) -> tuple[str, list[int]]:
+        '''
+        Opens an existing spreadsheet to update it
+
+        Parameters:
+          spreadsheet - url or path of the spreadsheet
+          sheet_titles - titles of the sheets to update
+
+        Returns:
+          the spreadsheet id
+          the sheet ids
+        '''
+
+    @abstractmethod
+    def batch_update(self, spreadsheet_id: str, requests: list[dict]) -> dict:
+        '''
+        Applies formatting and cell requests (mergeCells, updateCells, repeatCell)
+
+        Parameters:
+          spreadsheet_id - spreadsheet id
+          requests - the requests
+
+        Returns:
+          the response
+        '''
+
+
+class GoogleSheetsBackend(SpreadsheetBackend):
+    '''
+    Reads and writes Google Spreadsheets with the Google Sheets API
+
+    Attributes:
+      credentials_path - path of the OAuth client credentials
+      token_path - path the user's token is cached at between runs
+      num_retries - how many times a request is retried (with exponential backoff) after a rate limit,
+        server or connection error
+      creds - OAuth credentials
+      sheet - the spreadsheets resource (created on first use, one per thread)
+      timings - seconds spent logging in and creating the spreadsheets resources
+    '''
+
+    def __init__(self, credentials_path: str = 'credentials.json', token_path: str = 'token.json',
+                 num_retries: int = 5) -> None:
+        '''
+        Initializes attributes (logs the user in, unless a cached token can be used)
+
+        Parameters:
+          credentials_path - path of the OAuth client credentials
+          token_path - path the user's token is cached at between runs
+          num_retries - how many times a request is retried after a rate limit, server or connection error
+        '''
+        if build is None:
+            raise ImportError('The Google Sheets backend needs google-api-python-client and google-auth-oauthlib')
+        self.credentials_path = credentials_path
+        self.token_path = token_path
+        self.num_retries = num_retries
+        self.timings = {}
+        start = time.perf_counter()
+        self.creds = self.authenticate_user()
+        record_time(self.timings, 'auth', start)
+        self._local = threading.local()
+
+    @property
+    def sheet(self):
+        # building the resource generates the docs of every API method, which takes a few hundred ms,
+        # every thread has its own since the http connection of a resource cannot be shared between threads
+        if getattr(self._local, 'sheet', None) is None:
+            start = time.perf_counter()
+            self._local.sheet = self.create_sheet_resource(self.creds)
+            record_time(self.timings, 'create_sheet_resource', start)
+        return self._local.sheet
+
+    def authenticate_user(self):
+        '''
+        Gets session token for spreadsheet API authentication: the cached token if it is still valid,
+        refreshed with its refresh token if it expired, otherwise the user logs in through the browser
+        (the token is cached for the next run)
+
+        Parameters: None
+
+        Returns:
+            OAuth credentials
+        '''
+        creds = None
+        if os.path.exists(self.token_path):
+            try:
+                creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
+            except ValueError:
+                # not a token written by this program, log in again
+                creds = None
+
+        if creds and creds.valid:
+            return creds
+        if creds and creds.expired and creds.refresh_token:
+            try:
+                creds.refresh(Request())
+            except RefreshError:
+                # the refresh token was revoked or expired, log in again
+                creds = None
+        else:
+            creds = None
+        if creds is None:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                self.credentials_path, SCOPES)
+            creds = flow.run_local_server(port=0)
+
+        # Save the credentials for the next run
+        with open(self.token_path, 'w', encoding='utf-8') as token:
+            token.write(creds.to_json())
+        return creds
+
+    def create_sheet_resource(self, cred):
+        '''
+        Creates sheet resource from the discovery document bundled with google-api-python-client
+        (instead of downloading it on every run)
+
+        Parameters:
+            cred - OAuth credentials
+        Returns:
+            sheet resource
+        '''
+        return build('sheets', 'v4', credentials=cred, static_discovery=True).spreadsheets()
+
+    def extract_spreadsheet_id(self, sheet_url: str) -> str:
+        '''
+        Extracts spreadsheet id from the url
+
+        Parameters:
+            sheet_url - the url of the spreadsheet to be parsed (or the id itself)
+
+        Returns:
+            the id of the spreadsheet
+        '''
+        match = re.search(r'/d/([a-zA-Z0-9-_]+)', sheet_url)
+        if match:
+            return match.group(1)
+        elif re.fullmatch(r'[a-zA-Z0-9-_]+', sheet_url):
+            return sheet_url
+        else:
+            raise ValueError('Invalid URL')
+
+    def spreadsheet_id(self, spreadsheet: str) -> str:
+        return self.extract_spreadsheet_id(spreadsheet)
+
+    def get_values(self, spreadsheet: str, range_name: str, formulas: bool = False) -> list[list[str]]:
+        response = self.sheet.values().get(
+            spreadsheetId=self.extract_spreadsheet_id(spreadsheet), range=range_name,
+            valueRenderOption='FORMULA' if formulas else 'FORMATTED_VALUE').execute(
+                num_retries=self.num_retries)
+        return response.get('values', [])
+
+    def get_row_chunks(self, spreadsheet: str, sheet_title: str, chunk_rows: int = CHUNK_ROWS):
+        # the next page is downloaded on another thread while the rows of the last one are parsed
+        with ThreadPoolExecutor(max_workers=1) as threads:
+            first_row = 1
+            page = threads.submit(self.get_values, spreadsheet, f"'{sheet_title}'!A1:ZZ{chunk_rows}")
+            # the empty rows at the end of a page are left out, they are only returned if there are rows after them
+            num_empty = 0
+            while True:
+                rows = page.result()
+                if not rows:
+                    return
+                first_row += chunk_rows
+                page = threads.submit(self.get_values, spreadsheet,
+                                      f"'{sheet_title}'!A{first_row}:ZZ{first_row + chunk_rows - 1}")
+                yield [[] for _ in range(num_empty)] + rows
+                num_empty = chunk_rows - len(rows)
+
+    def create_spreadsheet(self, title: str, sheet_titles: list[str]) -> tuple[str, list[int]]:
+        # the sheet ids are chosen here so the spreadsheet metadata does not have to be fetched
+        sheet_ids = list(range(len(sheet_titles)))
+        spreadsheet = self.sheet.create(body={
+            'properties': {'title': title},
+            'sheets': [{'properties': {'title': sheet_title, 'sheetId': sheet_id}}
+                       for sheet_id, sheet_title in zip(sheet_ids, sheet_titles)]
+        }, fields='spreadsheetId').execute(num_retries=self.num_retries)
+        return spreadsheet.get('spreadsheetId'), sheet_ids
+
+    def open_spreadsheet(self, spreadsheet: str, sheet_titles: list[str]) -> tuple[str, list[int]]:
+        spreadsheet_id = self.extract_spreadsheet_id(spreadsheet)
+        response = self.sheet.get(spreadsheetId=spreadsheet_id, fields='sheets.properties(sheetId,title)').execute(
+            num_retries=self.num_retries)
+        sheet_ids = {sheet['properties']['title']: sheet['properties']['sheetId'] for sheet in response['sheets']}
+        missing = [sheet_title for sheet_title in sheet_titles if sheet_title not in sheet_ids]
+        if missing:
+            raise ValueError(f'{spreadsheet} has no sheet {", ".join(missing)}')
+        return spreadsheet_id, [sheet_ids[sheet_title] for sheet_title in sheet_titles]
+
+    def batch_update(self, spreadsheet_id: str, requests: list[dict]) -> dict:
+        return self.sheet.batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={'requests': requests}
+        ).execute(num_retries=self.num_retries)
+
+
+class LocalFileBackend(SpreadsheetBackend):
+    '''
+    Reads form responses from CSV/XLSX files and writes schedules as CSV files (one per sheet) or an XLSX workbook,
+    with no network access or login
+
+    Attributes:
+      output_dir - directory the schedules are written to
+      output_format - 'csv' or 'xlsx'
+      spreadsheets - the spreadsheets written so far: key -> spreadsheet id (path), value -> LocalSpreadsheet
+    '''
+
+    def __init__(self, output_dir: str = '.', output_format: str = 'csv') -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          output_dir - directory the schedules are written to
+          output_format - 'csv' or 'xlsx'
+        '''
+        if output_format not in ['csv', 'xlsx']:
+            raise ValueError(f'Unsupported output format {output_format}, expected csv or xlsx')
+        if output_format == 'xlsx' and openpyxl is None:
+            raise ImportError('Writing .xlsx files needs openpyxl')
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.spreadsheets = {}
+
+    def spreadsheet_id(self, spreadsheet: str) -> str:
+        return os.path.realpath(spreadsheet)
+
+    def get_values(self, spreadsheet: str, range_name: str, formulas: bool = False) -> list[list[str]]:
+        sheet_title, first_row, first_col, last_col = parse_range(range_name)
+        rows = []
+        for row_idx, row in enumerate(self.read_rows(spreadsheet, sheet_title, formulas)):
+            if row_idx < first_row:
+                continue
+            row = row[first_col:last_col]
+            # like the Sheets API, leave out the empty cells at the end of a row
+            while row and row[-1] == '':
+                row.pop()
+            rows.append(row)
+        # and the empty rows at the end of the range
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def get_row_chunks(self, spreadsheet: str, sheet_title: str, chunk_rows: int = CHUNK_ROWS):
+        chunk = []
+        empty_rows = []
+        for row in self.read_rows(spreadsheet, sheet_title):
+            while row and row[-1] == '':
+                row.pop()
+            # like get_values, the empty rows at the end of the sheet are left out
+            if not row:
+                empty_rows.append(row)
+                continue
+            chunk += empty_rows
+            empty_rows = []
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def read_rows(self, spreadsheet: str, sheet_title: str, formulas: bool = False):
+        '''
+        Reads the rows of a sheet one at a time, as text the way Google Sheets displays it
+
+        Parameters:
+          spreadsheet - path of a .csv file, an .xlsx file, or a schedule written as CSV files (without the suffix)
+          sheet_title - title of the sheet (the first sheet of an .xlsx file if there is no such sheet)
+          formulas - whether to read the formulas of an .xlsx file instead of the values last calculated
+            (CSV files only have the formulas)
+
+        Returns:
+          a generator of rows
+        '''
+        if spreadsheet.endswith('.xlsx'):
+            if openpyxl is None:
+                raise ImportError('Reading .xlsx files needs openpyxl')
+            workbook = openpyxl.load_workbook(spreadsheet, read_only=True, data_only=not formulas)
+            try:
+                worksheet = workbook[sheet_title] if sheet_title in workbook.sheetnames else workbook.worksheets[0]
+                for row in worksheet.iter_rows(values_only=True):
+                    yield [format_cell(value) for value in row]
+            finally:
+                workbook.close()
+            return
+        path = spreadsheet if spreadsheet.endswith('.csv') else f'{spreadsheet} - {sheet_title}.csv'
+        with open(path, newline='', encoding='utf-8-sig') as csv_file:
+            yield from csv.reader(csv_file)
+
+    def create_spreadsheet(self, title: str, sheet_titles: list[str]) -> tuple[str, list[int]]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        spreadsheet_id = os.path.join(self.output_dir, title)
+        if self.output_format == 'xlsx':
+            spreadsheet_id += '.xlsx'
+        self.spreadsheets[spreadsheet_id] = LocalSpreadsheet(sheet_titles)
+        self.save(spreadsheet_id)
+        return spreadsheet_id, list(range(len(sheet_titles)))
+
+    def open_spreadsheet(self, spreadsheet: str, sheet_titles: list[str]) -> tuple[str, list[int]]:
+        if spreadsheet.endswith('.xlsx'):
+            if openpyxl is None:
+                raise ImportError('Reading .xlsx files needs openpyxl')
+            workbook = openpyxl.load_workbook(spreadsheet)
+            local_spreadsheet = LocalSpreadsheet(workbook.sheetnames)
+            for sheet_id, worksheet in enumerate(workbook.worksheets):
+                for row in worksheet.iter_rows():
+                    for cell in row:
+                        if cell.value is not None:
+                            local_spreadsheet.set(worksheet.title, cell.row - 1, cell.column - 1, cell.value)
+                # keep the merged months and the bold headings when the workbook is written again
+                for cell_range in worksheet.merged_cells.ranges:
+                    local_spreadsheet.merges.append({
+                        'sheetId': sheet_id, 'startRowIndex': cell_range.min_row - 1, 'endRowIndex': cell_range.max_row,
+                        'startColumnIndex': cell_range.min_col - 1, 'endColumnIndex': cell_range.max_col})
+                if any(cell.font.bold for cell in worksheet[1]):
+                    local_spreadsheet.bold.append({'sheetId': sheet_id, 'startRowIndex': 0, 'endRowIndex': 1})
+            workbook.close()
+        else:
+            spreadsheet = spreadsheet.removesuffix('.csv')
+            for sheet_title in sheet_titles:
+                # a schedule is written as one CSV file per sheet, the path can be any of them
+                spreadsheet = spreadsheet.removesuffix(f' - {sheet_title}')
+            local_spreadsheet = LocalSpreadsheet(sheet_titles)
+            for sheet_title in sheet_titles:
+                for row_idx, row in enumerate(self.read_rows(spreadsheet, sheet_title)):
+                    for col_idx, value in enumerate(row):
+                        if value != '':
+                            local_spreadsheet.set(sheet_title, row_idx, col_idx, value)
+
+        missing = [sheet_title for sheet_title in sheet_titles if sheet_title not in local_spreadsheet.titles]
+        if missing:
+            raise ValueError(f'{spreadsheet} has no sheet {", ".join(missing)}')
+        self.spreadsheets[spreadsheet] = local_spreadsheet
+        return spreadsheet, [local_spreadsheet.titles.index(sheet_title) for sheet_title in sheet_titles]
+
+    def batch_update(self, spreadsheet_id: str, requests: list[dict]) -> dict:
+        spreadsheet = self.spreadsheets[spreadsheet_id]
+        for request in requests:
+            if 'mergeCells' in request:
+                spreadsheet.merges.append(request['mergeCells']['range'])
+            elif 'updateCells' in request:
+                if 'range' in request['updateCells']:
+                    cell_range = request['updateCells']['range']
+                    sheet_id, first_row, first_col = (cell_range['sheetId'], cell_range['startRowIndex'],
+                                                      cell_range['startColumnIndex'])
+                else:
+                    start = request['updateCells']['start']
+                    sheet_id, first_row, first_col = start['sheetId'], start['rowIndex'], start['columnIndex']
+                sheet_title = spreadsheet.titles[sheet_id]
+                clear = 'userEnteredValue' in request['updateCells']['fields']
+                for row_offset, row in enumerate(request['updateCells']['rows']):
+                    for col_offset, cell in enumerate(row['values']):
+                        value = cell.get('userEnteredValue', {})
+                        if value:
+                            spreadsheet.set(sheet_title, first_row + row_offset,
+                                            first_col + col_offset, next(iter(value.values())))
+                        elif clear:
+                            # like the Sheets API, a cell with no value clears the value when the fields include it
+                            spreadsheet.clear(sheet_title, first_row + row_offset, first_col + col_offset)
+            elif 'repeatCell' in request:
+                text_format = request['repeatCell']['cell']['userEnteredFormat'].get('textFormat', {})
+                if text_format.get('bold'):
+                    spreadsheet.bold.append(request['repeatCell']['range'])
+        self.save(spreadsheet_id)
+        return {'spreadsheetId': spreadsheet_id, 'replies': [{} for _ in requests]}
+
+    def save(self, spreadsheet_id: str) -> None:
+        '''
+        Writes a spreadsheet to its file(s)
+
+        Parameters:
+          spreadsheet_id - spreadsheet id (path of the spreadsheet)
+
+        Returns: None
+        '''
+        spreadsheet = self.spreadsheets[spreadsheet_id]
+        if not spreadsheet_id.endswith('.xlsx'):
+            for sheet_title in spreadsheet.titles:
+                with open(f'{spreadsheet_id} - {sheet_title}.csv', 'w', newline='', encoding='utf-8') as csv_file:
+                    csv.writer(csv_file).writerows(spreadsheet.rows(sheet_title))
+            return
+
+        workbook = openpyxl.Workbook()
+        workbook.remove(workbook.active)
+        for sheet_title in spreadsheet.titles:
+            worksheet = workbook.create_sheet(sheet_title)
+            for row in spreadsheet.rows(sheet_title):
+                worksheet.append(row)
+        for cell_range in spreadsheet.merges:
+            workbook.worksheets[cell_range['sheetId']].merge_cells(
+                start_row=cell_range['startRowIndex'] + 1, end_row=cell_range['endRowIndex'],
+                start_column=cell_range['startColumnIndex'] + 1, end_column=cell_range['endColumnIndex'])
+        for cell_range in spreadsheet.bold:
+            worksheet = workbook.worksheets[cell_range['sheetId']]
+            for row in worksheet.iter_rows(min_row=cell_range.get('startRowIndex', 0) + 1,
+                                           max_row=cell_range.get('endRowIndex', worksheet.max_row)):
+                for cell in row:
+                    cell.font = openpyxl.styles.Font(bold=True)
+        workbook.save(spreadsheet_id)
+
+
+class LocalSpreadsheet:
+    '''
+    The cells of a spreadsheet written by the local file backend
+
+    Attributes:
+      titles - titles of the sheets (the index is the sheet id)
+      cells - dictionary: key -> sheet title, value -> dictionary: key -> (row, column), value -> cell value
+      merges - ranges of merged cells
+      bold - ranges of bold cells
+    '''
+
+    def __init__(self, titles: list[str]) -> None:
+        '''
+        Initializes attributes
+
+        Parameters:
+          titles - titles of the sheets
+        '''
+        self.titles = titles
+        self.cells = {title: {} for title in titles}
+        self.merges = []
+        self.bold = []
+
+    def set(self, sheet_title: str, row: int, col: int, value) -> None:
+        '''
+        Sets the value of a cell
+
+        Parameters:
+          sheet_title - title of the sheet
+          row - row index (starting from 0)
+          col - column index (starting from 0)
+          value - the value
+
+        Returns: None
+        '''
+        self.cells[sheet_title][(row, col)] = value
+
+    def clear(self, sheet_title: str, row: int, col: int) -> None:
+        '''
+        Clears the value of a cell
+
+        Parameters:
+          sheet_title - title of the sheet
+          row - row index (starting from 0)
+          col - column index (starting from 0)
+
+        Returns: None
+        '''
+        self.cells[sheet_title].pop((row, col), None)
+
+    def rows(self, sheet_title: str) -> list[list]:
+        '''
+        Lays out the cells of a sheet as rows
+
+        Parameters:
+          sheet_title - title of the sheet
+
+        Returns:
+          the rows, with empty cells as ''
+        '''
+        cells = self.cells[sheet_title]
+        if not cells:
+            return []
+        num_rows = max(row for row, _ in cells) + 1
+        num_cols = max(col for _, col in cells) + 1
+        return [[cells.get((row, col), '') for col in range(num_cols)] for row in range(num_rows)]
+
+
+def column_index(letters: str) -> int:
+    '''
+    Converts column letters to a column index (A -> 0, AA -> 26)
+
+    Parameters:
+      letters - the column letters
+
+    Returns:
+      the column index
+    '''
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def parse_range(range_name: str) -> tuple[str, int, int, int]:
+    '''
+    Parses a range in A1 notation ('Duty!B2:G', 'Per RA!A1', "'Form responses 1'!A5:ZZ" or the title of a sheet)
+
+    Parameters:
+      range_name - the range
+
+    Returns:
+      the sheet title
+      index of the first row
+      index of the first column
+      index after the last column (None for every column)
+    '''
+    sheet_title, _, cells = range_name.rpartition('!')
+    # sheet titles with spaces are quoted ('Form responses 1'!A2:ZZ)
+    if len(sheet_title) > 1 and sheet_title[0] == sheet_title[-1] == "'":
+        sheet_title = sheet_title[1:-1].replace("''", "'")
+    match = re.fullmatch(r'([A-Za-z]+)(\d*)(?::([A-Za-z]+)\d*)?', cells)
+    if not sheet_title or not match:
+        # the whole sheet
+        return sheet_title or range_name, 0, 0, None
+    first_col, first_row, last_col = match.groups()
+    return (sheet_title, int(first_row) - 1 if first_row else 0, column_index(first_col),
+            column_index(last_col) + 1 if last_col else None)
+
+
+def format_cell(value) -> str:
+    '''
+    Formats the value of an .xlsx cell the way Google Sheets displays it in form responses
+
+    Parameters:
+      value - the cell value
+
+    Returns:
+      the cell as text
+    '''
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        if value.time() == datetime.min.time():
+            return value.strftime('%m/%d/%Y')
+        return value.strftime('%m/%d/%Y %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%m/%d/%Y')
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
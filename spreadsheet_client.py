@@ -1,15 +1,13 @@
-import re
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import time
 from ra_models import RaAvailability, Ra
 from schedule_models import ScheduleDay
 from datetime import datetime, date
-from constants import DaysOfWeek, Distribution, CONSTANTS
-
-# Define the scope for Sheets API
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+from constants import CONSTANTS
+from form_cache import FormCache, added_rows, first_checked_row
+from form_responses import FormResponses
+from run_report import record_time
+from schedule_snapshot import ScheduleSnapshot
+from spreadsheet_backends import SpreadsheetBackend, GoogleSheetsBackend
 
 
 class SpreadsheetClient:
@@ -21,228 +19,320 @@ class SpreadsheetClient:
     Methods:
     '''
 
-    def __init__(self, start_date: date, schedule_name: str) -> None:
+    def __init__(self, start_date: date, schedule_name: str, backend: SpreadsheetBackend = None,
+                 form_cache: FormCache = None) -> None:
         '''
         Initialize attributes
 
         Parameters:
             start_date - first day of duty
+            schedule_name - title of the schedule
+            backend - where the spreadsheets are read from and written to (Google Sheets if not given)
+            form_cache - snapshots of the form responses from earlier runs (None to always read every response)
         '''
+        self.start_date = start_date
         self.year = start_date.year
         self.name = schedule_name if schedule_name else 'New Schedule'
-        creds = self.authenticate_user()
-        self.sheet = self.create_sheet_resource(creds)
+        self.backend = backend if backend else GoogleSheetsBackend()
+        self.form_cache = form_cache
+        # seconds spent reading, parsing and publishing
+        self.timings = {}
         # self.scheduler = scheduler
 
-    def authenticate_user(self):
+    def get_form_answers(self, sheet_url: str) -> list[list[str]]:
         '''
-        Gets session token for spreadsheet API authentication
+        Returns the content of the given spreadsheet
 
-        Parameters: None
+        Parameters:
+            sheet_url - the spreadsheet url (or path for the local file backend)
 
         Returns:
-            OAuth credentials
+            the content of the spreadsheet as a list of lists
         '''
-        flow = InstalledAppFlow.from_client_secrets_file(
-            'credentials.json', SCOPES)
-        creds = flow.run_local_server(port=0)
-        return creds
+        return self.backend.get_values(sheet_url, 'Form responses 1')
 
-    def create_sheet_resource(self, cred):
+    def get_availabilities(self, sheet_url: str, refresh: bool = False) -> list[RaAvailability]:
         '''
-        Creates sheet resource
+        Reads and parses the form responses into RA availabilities
 
         Parameters:
-            cred - OAuth credentials
+            sheet_url - the spreadsheet url (or path for the local file backend)
+            refresh - whether to read every response even if there is a snapshot
+
         Returns:
-            sheet resource
+            list of RA availabilities
         '''
-        return build('sheets', 'v4', credentials=cred).spreadsheets()
+        return self.get_form_responses(sheet_url, refresh).availabilities()
 
-    def extract_spreadsheet_id(self, sheet_url: str) -> str:
+    def get_form_responses(self, sheet_url: str, refresh: bool = False) -> FormResponses:
         '''
-        Extracts spreadsheet id from the url
+        Reads and parses the form responses, only reading and parsing the responses added since the last run
+        if the form cache has a snapshot of the earlier ones (every response is read again if the last responses
+        of the snapshot changed)
 
         Parameters:
-            sheet_url - the url of the spreadsheet to be parsed
+            sheet_url - the spreadsheet url (or path for the local file backend)
+            refresh - whether to read every response even if there is a snapshot
 
         Returns:
-            the id of the spreadsheet
+            the responses parsed column by column
         '''
-        match = re.search(r'/d/([a-zA-Z0-9-_]+)', sheet_url)
-        if match:
-            return match.group(1)
+        start = time.perf_counter()
+        spreadsheet_id = self.backend.spreadsheet_id(sheet_url)
+        snapshot = None
+        if self.form_cache is not None and not refresh:
+            snapshot = self.form_cache.load(spreadsheet_id, self.start_date)
+            start = record_time(self.timings, 'load_form_cache', start)
+
+        changed = True
+        new_rows = None
+        if snapshot is not None:
+            # read the last rows of the snapshot again with the rows added since, to check they did not change
+            first_row = first_checked_row(snapshot)
+            rows = self.backend.get_values(sheet_url, f"'Form responses 1'!A{first_row + 1}:ZZ")
+            start = record_time(self.timings, 'fetch_form', start)
+            num_rows = first_row + len(rows)
+            new_rows = added_rows(snapshot, rows)
+        if new_rows is None:
+            # every response is parsed as soon as its chunk is read, while the next chunk is downloaded
+            rows = []
+            form_responses = None
+            for chunk in self.backend.get_row_chunks(sheet_url, 'Form responses 1'):
+                if form_responses is None:
+                    form_responses = FormResponses(chunk, self.start_date)
+                else:
+                    form_responses.add_rows(chunk)
+                rows += chunk
+            if form_responses is None:
+                form_responses = FormResponses([], self.start_date)
+            start = record_time(self.timings, 'fetch_form', start)
+            num_rows = len(rows)
+        elif new_rows:
+            form_responses = snapshot['responses']
+            form_responses.add_rows(new_rows)
         else:
-            raise ValueError('Invalid URL')
-
-    def get_form_answers(self, sheet_url: str) -> list[list[str]]:
+            form_responses = snapshot['responses']
+            changed = False
+
+        if form_responses.errors:
+            raise ValueError('The form responses could not be read:\n' + '\n'.join(form_responses.errors))
+        start = record_time(self.timings, 'parse_form', start)
+        if self.form_cache is not None and changed:
+            self.form_cache.save(spreadsheet_id, num_rows, rows, form_responses)
+            record_time(self.timings, 'save_form_cache', start)
+        return form_responses
+
+    def get_schedule(self, sheet_url: str) -> dict[date, list[str]]:
         '''
-        Returns the content of the given spreadsheet
+        Reads a published schedule back from its Duty sheet
 
         Parameters:
-            sheet_url - the spreadsheet url
+            sheet_url - the url of the published schedule
 
         Returns:
-            the content of the spreadsheet as a list of lists
+            dictionary: key -> date, value -> names of the RAs on duty that day
         '''
-        sheet_id = self.extract_spreadsheet_id(sheet_url)
-        response = self.sheet.values().get(
-            spreadsheetId=sheet_id, range='Form responses 1').execute()
-        form_answers = response.get('values', [])
-        return form_answers
+        max_ras_per_shift = max(
+            CONSTANTS.PPL_PER_SHIFT_WEEKDAY, CONSTANTS.PPL_PER_SHIFT_WEEKEND)
+        last_ra_col = chr(ord('F') + max_ras_per_shift - 1)
+        start = time.perf_counter()
+        values = self.backend.get_values(sheet_url, f'Duty!B2:{last_ra_col}')
+        start = record_time(self.timings, 'fetch_schedule', start)
+
+        schedule = {}
+        for row in values:
+            if len(row) < 2 or not row[1]:
+                continue
+            schedule[self.parse_schedule_date(row[1])] = [name for name in row[4:] if name]
+        record_time(self.timings, 'parse_schedule', start)
+        return schedule
 
-    def match_column_property(self, title_columns: list[str]) -> dict[str, int]:
+    def parse_schedule_date(self, cell: str) -> date:
         '''
-        Finds the column index for each attribute of the RA availability class
+        Parses the date column of the Duty sheet (written as 'Aug 15', Sheets may display it as a full date),
+        the dates without a year are on or after the first day of duty (in the next year once the schedule
+        crosses Dec 31)
 
         Parameters:
-            title_columns - the first row of the spreadsheet that has all the names of the columns
+            cell - the value of the date cell
 
         Returns:
-            a dict matching every RA availability attribute with its column index
-        '''
-        availability_properties = {}
-        for idx, col in enumerate(title_columns):
-            col = col.lower()
-            if 'preferred name' in col:
-                availability_properties['name'] = idx
-            elif all(word in col for word in ['move in', 'date']):
-                availability_properties['move_in_date'] = idx
-            elif all(word in col for word in ['dates', 'not', 'duty']):
-                availability_properties['no_dates'] = idx
-            elif all(word in col for word in ['days', 'not', 'duty']):
-                availability_properties['no_days'] = idx
-            elif any(word in col for word in ['frontload', 'backload', 'distribution']):
-                availability_properties['distribution'] = idx
-            elif all(word in col for word in ['returning', 'ra']):
-                availability_properties['returner'] = idx
-            elif all(word in col for word in ['been', 'community', 'previously']):
-                availability_properties['community_returner'] = idx
-            else:
+            the date
+        '''
+        for year in [self.year, self.year + 1]:
+            try:
+                day = datetime.strptime(f'{year} {cell}', '%Y %b %d').date()
+            except ValueError:
                 continue
-        return availability_properties
+            if day >= self.start_date or year > self.year:
+                return day
+        return datetime.strptime(cell, '%m/%d/%Y').date()
+
+    def create_sheet(self) -> tuple[str, str]:
+        '''
+        Creates a new spreadsheet
+
+        Parameters: None
+        Returns:
+            the spreadsheet id
+            the sheet id
+        '''
+        start = time.perf_counter()
+        spreadsheet_id, sheet_ids = self.backend.create_spreadsheet(self.name, ['Duty', 'Per RA'])
+        record_time(self.timings, 'create_spreadsheet', start)
+        return spreadsheet_id, sheet_ids
 
-    def construct_availabilities(self, form_answers: list[str]) -> list[RaAvailability]:
+    def prepare_sheet(self, days_per_month: dict) -> tuple[str, list[str]]:
         '''
-        Constructs the list of RA availability objects from all the spreadsheet responses
+        Creates the spreadsheet and writes everything that does not depend on the schedule
+        (the headings and the formatting), so it can be done while the schedule is being solved
 
         Parameters:
-            form_answers - the form responses from the spreadsheet (without the first title row)
+            days_per_month - how many days per month
 
         Returns:
-            list of RA availabilities
+            the spreadsheet id
+            the sheet ids
         '''
-        title_row = form_answers.pop(0)
-        property_indices = self.match_column_property(title_row)
-        ra_availabilities = []
-
-        for row in form_answers:
-            ra_properties = {}
-            for property, idx in property_indices.items():
-                response = row[idx]
-                formatted_response = response
-                if not response:
-                    continue
-                if property == 'move_in_date':
-                    date_object = datetime.strptime(response, '%m/%d/%Y')
-                    formatted_response = date_object.date()
-                elif property == 'no_dates':
-                    date_strings = map(
-                        lambda date: date.strip(), response.split(','))
-                    formatted_response = [datetime.strptime(
-                        f'{self.year}-{month_day}', '%Y-%m-%d').date() for month_day in date_strings]
-                elif property == 'no_days':
-                    days = response.split(', ')
-                    formatted_response = []
-                    for day in days:
-                        formatted_response.append(DaysOfWeek[day.upper()])
-                elif property == 'distribution':
-                    if response == 'Frontload':
-                        formatted_response = Distribution.FRONTLOAD
-                    elif response == 'Backload':
-                        formatted_response = Distribution.BACKLOAD
-                    else:
-                        formatted_response == Distribution.NONE
-                elif property == 'returner':
-                    formatted_response = (response == 'Returner')
-                elif property == 'community_returner':
-                    formatted_response = (response == 'Yes')
-                # else:
-                #     raise ValueError('Unsupported property')
-                ra_properties[property] = formatted_response
-            ra = RaAvailability(**ra_properties)
-            ra_availabilities.append(ra)
-        return ra_availabilities
-
-    # def authenticate_user(self):
-    #     creds = None
-    #     token_path = 'token.pickle'
-    #     credentials_path = 'credentials.json'
-
-    # # Load existing credentials from a file if available
-    #     if os.path.exists(token_path):
-    #         with open(token_path, 'rb') as token:
-    #             creds = pickle.load(token)
-
-    # # If there are no valid credentials available, prompt the user to log in
-    #     if not creds or not creds.valid:
-    #         if creds and creds.expired and creds.refresh_token:
-    #             creds.refresh(Request())
-    #         else:
-    #             flow = InstalledAppFlow.from_client_secrets_file(
-    #                 credentials_path, SCOPES)
-    #             creds = flow.run_local_server(port=0)
-
-    #     # Save the credentials for the next run
-    #     with open(token_path, 'wb') as token:
-    #         pickle.dump(creds, token)
-    #     return creds
+        spreadsheet_id, sheet_ids = self.create_sheet()
+        start = time.perf_counter()
+        self.backend.batch_update(spreadsheet_id, self.base_schedule_requests(sheet_ids[0], days_per_month) +
+                                  self.format_requests(sheet_ids))
+        record_time(self.timings, 'prepare_sheet', start)
+        return spreadsheet_id, sheet_ids
 
-    def create_sheet(self) -> tuple[str, str]:
+    def publish(self, schedule: list[ScheduleDay], ras: list[Ra], days_per_month: dict,
+                live_formulas: bool = False, prepared_sheet: tuple[str, list[str]] = None) -> str:
         '''
-        Creates a new spreadsheet
+        Writes the schedule to a spreadsheet: the spreadsheet is created (unless it was prepared already),
+        then the headings, values and formatting of both sheets are written in a single batch update
+
+        Parameters:
+            schedule - the schedule information (day & ras on)
+            ras - list of RAs
+            days_per_month - how many days per month
+            live_formulas - whether the per RA tallies are formulas that update when the schedule is edited
+            prepared_sheet - the spreadsheet id and sheet ids from prepare_sheet (None to create the spreadsheet)
 
-        Parameters: None
         Returns:
             the spreadsheet id
-            the sheet id
         '''
-        spreadsheet = self.sheet.create(body={
-            'properties': {'title': self.name},
-            'sheets': [
-                {
-                    'properties': {
-                        'title': 'Duty',
-                    }
-                },
-                {
-                    'properties': {
-                        'title': 'Per RA'
-                    }
-                }
-            ]
-        }, fields='spreadsheetId').execute()
-        spreadsheet_id = spreadsheet.get('spreadsheetId')
+        if prepared_sheet:
+            spreadsheet_id, sheet_ids = prepared_sheet
+            requests = []
+        else:
+            spreadsheet_id, sheet_ids = self.create_sheet()
+            requests = self.base_schedule_requests(sheet_ids[0], days_per_month)
+        start = time.perf_counter()
+        schedule_requests, num_columns = self.schedule_requests(sheet_ids[0], schedule)
+        requests += schedule_requests
+        requests += self.half_staff_requests(sheet_ids[0], ras, num_columns)
+        requests += self.ra_points_requests(sheet_ids[1], ras, schedule, live_formulas)
+        if not prepared_sheet:
+            requests += self.format_requests(sheet_ids)
+        self.backend.batch_update(spreadsheet_id, requests)
+        record_time(self.timings, 'publish', start)
+        return spreadsheet_id
+
+    def publish_snapshot(self, snapshot: ScheduleSnapshot, live_formulas: bool = False,
+                         republish_url: str = None) -> str:
+        '''
+        Writes the schedule of an earlier run from its snapshot, without solving it again
 
-        # Fetch the spreadsheet metadata to get the sheet ID
-        spreadsheet_metadata = self.sheet.get(
-            spreadsheetId=spreadsheet_id).execute()
+        Parameters:
+            snapshot - the snapshot of the run
+            live_formulas - whether the per RA tallies are formulas that update when the schedule is edited
+            republish_url - url of the published schedule to write over (None to create a new spreadsheet)
 
-        # Find the sheet ID of the first sheet
-        sheet_ids = [sheet['properties']['sheetId']
-                     for sheet in spreadsheet_metadata['sheets']]
-        return spreadsheet_id, sheet_ids
+        Returns:
+            the spreadsheet id (the url if the schedule was republished)
+        '''
+        schedule, ras = snapshot.schedule()
+        if republish_url:
+            self.republish(republish_url, schedule, ras, live_formulas)
+            return republish_url
+        return self.publish(schedule, ras, snapshot.days_per_month(), live_formulas)
+
+    def republish(self, sheet_url: str, schedule: list[ScheduleDay], ras: list[Ra],
+                  live_formulas: bool = False) -> int:
+        '''
+        Writes the schedule over a schedule published before (with the same dates), in a single batch update
+        of only the cells that changed, so the spreadsheet and its links stay the same
+
+        Parameters:
+            sheet_url - the url of the published schedule (or path for the local file backend)
+            schedule - the schedule information (day & ras on)
+            ras - list of RAs
+            live_formulas - whether the per RA tallies are formulas that update when the schedule is edited
 
-    def base_schedule(self, spreadsheet_id: str, sheet_id: str, days_per_month: dict) -> str:
+        Returns:
+            the number of cells that changed
+        '''
+        start = time.perf_counter()
+        spreadsheet_id, sheet_ids = self.backend.open_spreadsheet(sheet_url, ['Duty', 'Per RA'])
+        duty = self.backend.get_values(spreadsheet_id, 'Duty')
+        # the formulas of the tallies are compared, not what they display
+        per_ra = self.backend.get_values(spreadsheet_id, 'Per RA', formulas=True)
+        start = record_time(self.timings, 'fetch_published', start)
+
+        published_dates = [self.parse_schedule_date(row[2]) for row in duty[1:] if len(row) > 2 and row[2]]
+        if published_dates != [day_prop.day.date for day_prop in schedule]:
+            raise ValueError(f'{sheet_url} has a schedule for other dates, it cannot be republished')
+
+        schedule_values = self.schedule_values(schedule)
+        num_columns = max([len(row) for row in schedule_values])
+        wanted = {}
+        for row_idx, row in enumerate(schedule_values):
+            for col_idx, value in enumerate(row):
+                wanted[(row_idx + 1, col_idx + 1)] = value
+        for row_idx, row in enumerate(self.half_staff_values(ras)):
+            wanted[(row_idx, num_columns + 2)] = row[0]
+
+        # the months (first column) and the headings only depend on the dates
+        max_ras_per_shift = max(
+            CONSTANTS.PPL_PER_SHIFT_WEEKDAY, CONSTANTS.PPL_PER_SHIFT_WEEKEND)
+        changed = {}
+        for row_idx, row in enumerate(duty):
+            for col_idx, value in enumerate(row):
+                if value and (row_idx, col_idx) not in wanted and col_idx > 0 and (
+                        row_idx > 0 or col_idx >= 5 + max_ras_per_shift):
+                    changed[(row_idx, col_idx)] = ''
+        for (row_idx, col_idx), value in wanted.items():
+            if col_idx == 2 and row_idx > 0:
+                # the dates are the same (Sheets may display them differently than they were written)
+                continue
+            row = duty[row_idx] if row_idx < len(duty) else []
+            if cell_text(row[col_idx] if col_idx < len(row) else '') != cell_text(value):
+                changed[(row_idx, col_idx)] = value
+        requests = changed_cells_requests(sheet_ids[0], changed)
+        num_changed = len(changed)
+
+        # a row of the tallies is rewritten whole if any of it changed
+        ra_points_values = self.ra_points_values(ras, schedule, live_formulas)
+        for row_idx in range(max(len(ra_points_values), len(per_ra))):
+            published = per_ra[row_idx] if row_idx < len(per_ra) else []
+            row = ra_points_values[row_idx] if row_idx < len(ra_points_values) else []
+            row = row + [''] * (len(published) - len(row))
+            if [cell_text(value) for value in published] != [cell_text(value) for value in row[:len(published)]] or (
+                    any(cell_text(value) for value in row[len(published):])):
+                requests.append(update_cells_request(sheet_ids[1], row_idx, 0, [row]))
+                num_changed += len(row)
+
+        if requests:
+            self.backend.batch_update(spreadsheet_id, requests)
+        record_time(self.timings, 'republish', start)
+        return num_changed
+
+    def base_schedule_requests(self, sheet_id: str, days_per_month: dict) -> list[dict]:
         '''
         Creates the headings for the schedule
 
         Parameters: 
-            spreadsheet_id - spreadsheet id
             sheet_id - sheet id
             days_per_month - how many days per month
 
-        Returns: None
+        Returns:
+            the requests
         '''
 
         start_row = 1
@@ -431,129 +521,165 @@ class SpreadsheetClient:
                 }
             }
         ]
+        return requests
 
-        response = self.sheet.batchUpdate(
-            spreadsheetId=spreadsheet_id,
-            body={'requests': requests}
-        ).execute()
-        return response
-
-    def add_schedule(self, spreadsheet_id: str, schedule: list[ScheduleDay]):
+    def schedule_requests(self, sheet_id: str, schedule: list[ScheduleDay]) -> tuple[list[dict], int]:
         '''
         Add the schedule to the spreadsheet
 
         Parameters:
-          spreadsheet_id - spreadsheet id
+          sheet_id - sheet id
           schedule - the schedule information (day & ras on)
+
+        Returns:
+          the requests
+          the number of columns that are full
         '''
-        data = [
-            {'range': 'Duty!B2',
-             'values': [
-                 [
-                     day_prop.day.day_of_week.value,
-                     day_prop.day.date.strftime('%b %d'),
-                     day_prop.day.pts,
-                     '24 HRS' if day_prop.day.pts == 2 else ''
-                 ] + [ra.name for ra in day_prop.ras_on]
-                 for day_prop in schedule
-             ]
-             }
-        ]
+        values = self.schedule_values(schedule)
+        num_columns = max([len(row) for row in values])
+        return [update_cells_request(sheet_id, 1, 1, values)], num_columns
+
+    def schedule_values(self, schedule: list[ScheduleDay]) -> list[list]:
+        '''
+        Lays out the schedule as it appears in the Duty sheet (from cell B2)
 
-        num_columns = max([len(row) for row in data[0]['values']])
-        response = self.sheet.values().batchUpdate(spreadsheetId=spreadsheet_id, body={
-            'valueInputOption': 'USER_ENTERED', 'data': data}).execute()
-        return response, num_columns
+        Parameters:
+          schedule - the schedule information (day & ras on)
+
+        Returns:
+          list of rows
+        '''
+        return [
+            [
+                day_prop.day.day_of_week.value,
+                day_prop.day.date.strftime('%b %d'),
+                day_prop.day.pts,
+                '24 HRS' if day_prop.day.pts == 2 else ''
+            ] + [ra.name for ra in day_prop.ras_on]
+            for day_prop in schedule
+        ]
 
-    def add_half_staff(self, spreadsheet_id: str, ras: list[Ra], num_columns: int):
+    def half_staff_requests(self, sheet_id: str, ras: list[Ra], num_columns: int) -> list[dict]:
         '''
         Adds a list of all RAs on half staff to duty sheet
 
         Parameters:
-          spreadsheet_id - id of spreadsheet
+          sheet_id - sheet id
           ras - list of RAs
           num_columns - number of columns that are full
+
+        Returns:
+          the requests
+        '''
+        return [update_cells_request(sheet_id, 0, num_columns + 2, self.half_staff_values(ras))]
+
+    def half_staff_values(self, ras: list[Ra]) -> list[list]:
+        '''
+        Lists the RAs on half staff as they appear in the Duty sheet
+
+        Parameters:
+          ras - list of RAs
+
+        Returns:
+          list of rows
         '''
-        range_start = chr(ord('A') + num_columns + 2)
         values = [['Half Staff']]
         for ra in ras:
             if ra.half_staff:
                 values.append([ra.name])
+        return values
 
-        data = {
-            'values': values
-        }
-
-        self.sheet.values().update(
-            spreadsheetId=spreadsheet_id,
-            range=f'Duty!{range_start}1',
-            valueInputOption='USER_ENTERED',
-            body=data
-        ).execute()
-
-    def add_ra_points(self, spreadsheet_id: str, ras: list[Ra]):
+    def ra_points_requests(self, sheet_id: str, ras: list[Ra], schedule: list[ScheduleDay],
+                           live_formulas: bool = False) -> list[dict]:
         '''
         Adds a table to the spreadsheet that specifies how many 1, 2, and 3 pt shifts 
         and total pts (and shadow shifts, half staff) each RA has (on separate sheet)
 
         Parameters:
-          spreadsheet_id - id of spreadsheet
+          sheet_id - sheet id
           ras - list of RAs 
-          num_columns - number of columns that are full
+          schedule - the schedule information (day & ras on)
+          live_formulas - whether to write formulas instead of values
+
+        Returns:
+          the requests
+        '''
+        return [update_cells_request(sheet_id, 0, 0, self.ra_points_values(ras, schedule, live_formulas))]
+
+    def ra_points_values(self, ras: list[Ra], schedule: list[ScheduleDay], live_formulas: bool = False) -> list[list]:
+        '''
+        Lays out the Per RA sheet
+
+        The tallies are counted from the schedule and written as values, unless live formulas are asked for
+        (they then update when the Duty sheet is edited, over the rows of the schedule only)
+
+        Parameters:
+          ras - list of RAs 
+          schedule - the schedule information (day & ras on)
+          live_formulas - whether to write formulas instead of values
+
+        Returns:
+          list of rows
         '''
         start_col = 'A'
         start_row = 1
-        range_start = f'Per RA!{start_col}{start_row}'
         pts_col = 'D'
         first_ra_col = 'F'
         schedule_sheet = 'Duty'
+        # the schedule starts on the second row of the Duty sheet
+        last_row = len(schedule) + 1
         max_ras_per_shift = max(
             CONSTANTS.PPL_PER_SHIFT_WEEKDAY, CONSTANTS.PPL_PER_SHIFT_WEEKEND)
 
+        # RAs no longer on staff still appear on the days they worked before a resolve's cutoff, so they get a row too
+        staff_names = {ra.name for ra in ras}
+        departed = {}
+        for day_prop in schedule:
+            for ra in day_prop.ras_on:
+                if ra.name not in staff_names:
+                    departed.setdefault(ra.name, ra)
+        ras = ras + list(departed.values())
+
+        shift_counts = {ra.name: {pt_val: 0 for pt_val in range(1, 4)} for ra in ras}
+        total_pts = {ra.name: 0 for ra in ras}
+        for day_prop in schedule:
+            for ra in day_prop.ras_on:
+                if day_prop.day.pts in shift_counts[ra.name]:
+                    shift_counts[ra.name][day_prop.day.pts] += 1
+                total_pts[ra.name] += day_prop.day.pts
+
+        pts_range = f'{schedule_sheet}!{pts_col}2:{pts_col}{last_row}'
+        ra_cols = [chr(ord(first_ra_col) + shift_col) for shift_col in range(max_ras_per_shift)]
+        ra_ranges = [f'{schedule_sheet}!{ra_col}2:{ra_col}{last_row}' for ra_col in ra_cols]
+
         values = [['RA', '1 point', '2 point',
                    '3 point', 'Total points', 'Shadow shifts', 'Half staff']]
         for ra in ras:
             start_row += 1
             row = [ra.name]
-            for pt_val in range(1, 4):
-                pt_count_formula = f'=COUNTIFS({schedule_sheet}!{pts_col}:{pts_col}, {pt_val}, {schedule_sheet}!{first_ra_col}:{
-                    first_ra_col}, {start_col}{start_row})'
-                for shift_col in range(1, max_ras_per_shift):
-                    next_ra_col = chr(
-                        ord('A') + (ord(first_ra_col) - ord('A') + shift_col) % 26)
-                    pt_count_formula += f' + COUNTIFS({schedule_sheet}!{pts_col}:{pts_col}, {pt_val}, {schedule_sheet}!{next_ra_col}:{
-                        next_ra_col}, {start_col}{start_row})'
-                row.append(pt_count_formula)
-            total_pts_formula = f'=SUMIF({schedule_sheet}!{first_ra_col}:{first_ra_col}, {start_col}{
-                start_row}, {schedule_sheet}!{pts_col}:{pts_col})'
-            for shift_col in range(1, max_ras_per_shift):
-                next_ra_col = chr(
-                    ord('A') + (ord(first_ra_col) - ord('A') + shift_col) % 26)
-                total_pts_formula += f' + SUMIF({schedule_sheet}!{next_ra_col}:{next_ra_col}, {start_col}{
-                    start_row}, {schedule_sheet}!{pts_col}:{pts_col})'
-            row.append(total_pts_formula)
-            row.append('0' if (ra.returner and ra.community_returner) else '')
+            if not live_formulas:
+                row += [shift_counts[ra.name][pt_val] for pt_val in range(1, 4)]
+                row.append(total_pts[ra.name])
+            else:
+                for pt_val in range(1, 4):
+                    row.append('=' + ' + '.join(f'COUNTIFS({pts_range}, {pt_val}, {ra_range}, {start_col}{start_row})'
+                                                for ra_range in ra_ranges))
+                row.append('=' + ' + '.join(f'SUMIF({ra_range}, {start_col}{start_row}, {pts_range})'
+                                            for ra_range in ra_ranges))
+            row.append(0 if (ra.returner and ra.community_returner) else '')
             row.append('Yes' if ra.half_staff else 'No')
             values.append(row)
+        return values
 
-        data = {
-            'values': values
-        }
-
-        self.sheet.values().update(
-            spreadsheetId=spreadsheet_id,
-            range=range_start,
-            valueInputOption='USER_ENTERED',
-            body=data
-        ).execute()
-
-    def format_sheet(self, spreadsheet_id: str, sheet_id: str):
+    def format_requests(self, sheet_id: list[str]) -> list[dict]:
         '''
         Formats spreadsheet
 
         Parameters:
-          spreadsheet_id - id of spreadsheet
-          sheet_id - id of sheet
+          sheet_id - ids of the sheets
+
+        Returns:
+          the requests
         '''
         requests = [
             {
@@ -619,9 +745,90 @@ class SpreadsheetClient:
                 }
             }
         ]
+        return requests
+
+
+def changed_cells_requests(sheet_id: str, changed: dict[tuple[int, int], any]) -> list[dict]:
+    '''
+    Creates the requests that write changed cells, one for every run of neighbouring cells in a row
 
-        response = self.sheet.batchUpdate(
-            spreadsheetId=spreadsheet_id,
-            body={"requests": requests}
-        ).execute()
-        return response
+    Parameters:
+      sheet_id - sheet id
+      changed - dictionary: key -> (row index, column index), value -> the new value ('' to clear the cell)
+
+    Returns:
+      the requests
+    '''
+    requests = []
+    # the cells of the current run, and the row and column of its first cell
+    run = []
+    run_row = run_col = None
+    for row_idx, col_idx in sorted(changed):
+        if run and (row_idx != run_row or col_idx != run_col + len(run)):
+            requests.append(update_cells_request(sheet_id, run_row, run_col, [run]))
+            run = []
+        if not run:
+            run_row, run_col = row_idx, col_idx
+        run.append(changed[(row_idx, col_idx)])
+    if run:
+        requests.append(update_cells_request(sheet_id, run_row, run_col, [run]))
+    return requests
+
+
+def cell_text(value) -> str:
+    '''
+    Formats a value to compare it with the text read back from a sheet
+
+    Parameters:
+      value - the value (read back, or to be written)
+
+    Returns:
+      the value as text
+    '''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def update_cells_request(sheet_id: str, row_idx: int, col_idx: int, values: list[list]) -> dict:
+    '''
+    Creates the request that writes values to a sheet, entered as if they were typed into the cells
+    (text starting with = is a formula)
+
+    Parameters:
+      sheet_id - sheet id
+      row_idx - index of the first row
+      col_idx - index of the first column
+      values - list of rows
+
+    Returns:
+      the updateCells request
+    '''
+    rows = []
+    for row in values:
+        cells = []
+        for value in row:
+            if isinstance(value, bool):
+                cells.append({'userEnteredValue': {'boolValue': value}})
+            elif isinstance(value, (int, float)):
+                cells.append({'userEnteredValue': {'numberValue': value}})
+            elif isinstance(value, str) and value.startswith('='):
+                cells.append({'userEnteredValue': {'formulaValue': value}})
+            elif value:
+                cells.append({'userEnteredValue': {'stringValue': value}})
+            else:
+                cells.append({})
+        rows.append({'values': cells})
+    return {
+        'updateCells': {
+            'start': {
+                'sheetId': sheet_id,
+                'rowIndex': row_idx,
+                'columnIndex': col_idx
+            },
+            'rows': rows,
+            'fields': 'userEnteredValue'
+        }
+    }
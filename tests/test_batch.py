@@ -0,0 +1,54 @@
+import csv
+import time
+import batch
+from batch import run_batch
+from instance_generator import generate_instance
+from solver_config import SolverConfig
+from spreadsheet_backends import LocalFileBackend
+
+TITLES = ['Timestamp', 'Preferred name', 'Move in date', 'Dates you can not do duty', 'Days you can not do duty',
+          'Frontload or backload', 'Returning RA?', 'Have you previously been an RA in this community?']
+
+
+def stuck_solve(connection, community, form_responses, solver_config):
+    # a solve that does not stop at its time limit
+    time.sleep(60)
+
+
+def write_communities(tmp_path, titles: list[str]) -> list[dict]:
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    form_path = str(tmp_path / 'form.csv')
+    with open(form_path, 'w', newline='') as form_file:
+        csv.writer(form_file).writerows([TITLES] + [
+            ['', availability.name, availability.move_in_date.strftime('%m/%d/%Y'),
+             ', '.join(day.strftime('%m-%d') for day in availability.no_dates),
+             ', '.join(day_of_week.name.capitalize() for day_of_week in availability.no_days),
+             availability.distribution.name.capitalize(), 'Returner' if availability.returner else 'New',
+             'Yes' if availability.community_returner else '']
+            for availability in availabilities])
+    return [{'title': title, 'form': form_path, 'start_date': start_date, 'end_date': end_date,
+             'holidays': holidays, 'half_staff': half_staff} for title in titles]
+
+
+def test_stuck_solves_are_stopped_at_their_own_deadline(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'solve_in_process', stuck_solve)
+    monkeypatch.setattr(batch, 'TIMEOUT_GRACE', 0.5)
+    communities = write_communities(tmp_path, ['A', 'B'])
+
+    start = time.perf_counter()
+    results = run_batch(communities, LocalFileBackend(str(tmp_path)), SolverConfig(num_workers=1),
+                        num_processes=1, timeout=0.5)
+
+    # one at a time, each stopped 1s after it started, not at the end of the batch
+    assert [result['status'] for result in results] == ['timed out', 'timed out']
+    assert time.perf_counter() - start < 10
+
+
+def test_batch_publishes_every_schedule(tmp_path):
+    communities = write_communities(tmp_path, ['A', 'B'])
+    results = run_batch(communities, LocalFileBackend(str(tmp_path)), SolverConfig(num_workers=1),
+                        num_processes=2, timeout=10.0)
+
+    assert [result['status'] for result in results] == ['solved', 'solved']
+    assert all(result['spreadsheet'] for result in results)
@@ -0,0 +1,24 @@
+from benchmark import compare_model_modes, compare_objective_modes, run_benchmark
+from constants import ModelMode, ObjectiveMode
+from solver_config import SolverConfig
+
+
+def test_compare_modes_reports_a_schedule_that_cannot_be_made(capsys):
+    # 2 RAs cannot cover a fall term, the feasibility check stops the scheduler before a model is built
+    solver_config = SolverConfig(num_workers=1, max_time_in_seconds=5.0)
+    model_results = compare_model_modes(2, solver_config=solver_config)
+    objective_results = compare_objective_modes(2, solver_config=solver_config)
+
+    assert [result['status'] for result in model_results] == ['infeasible'] * len(ModelMode)
+    assert [result['status'] for result in objective_results] == ['infeasible'] * len(ObjectiveMode)
+    assert 'DAY: infeasible' in capsys.readouterr().out
+
+
+def test_benchmark_reads_the_objectives_from_the_solver_statistics():
+    result = run_benchmark(12, 42, break_length=0, returner_share=1.0,
+                           solver_config=SolverConfig(num_workers=1, max_time_in_seconds=10.0))
+
+    assert result['status'] == 'solved'
+    objectives = {stats['stage']: stats['objective'] for stats in result['solver_stats']}
+    assert result['penalty'] == objectives['penalty']
+    assert result['reward'] == objectives['reward']
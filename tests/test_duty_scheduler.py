@@ -0,0 +1,73 @@
+from datetime import timedelta
+from duty_scheduler import REWARD_TIME_SHARE, DutyScheduler
+from instance_generator import generate_instance
+from solver_config import SolverConfig
+
+TIME_LIMIT = 3.0
+
+
+def test_rolling_schedule_keeps_the_time_limit():
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 90, seed=0, break_length=0, returner_share=1.0)
+    scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff,
+                              solver_config=SolverConfig(num_workers=1, max_time_in_seconds=TIME_LIMIT))
+    schedule, _ = scheduler.create_rolling_model()
+    num_windows = len(scheduler.rolling_windows())
+
+    assert len(schedule) == 90
+    # every window solves in its share of the one time limit, not in a time limit of its own,
+    # and its penalty stage leaves its reward stage time
+    stages = [stats['stage'] for stats in scheduler.solver_stats]
+    assert stages == ['penalty', 'reward'] * num_windows
+    penalty_limits = [stats['time_limit'] for stats in scheduler.solver_stats if stats['stage'] == 'penalty']
+    reward_limits = [stats['time_limit'] for stats in scheduler.solver_stats if stats['stage'] == 'reward']
+    assert penalty_limits[0] <= TIME_LIMIT / num_windows * (1 - REWARD_TIME_SHARE)
+    assert all(time_limit <= TIME_LIMIT * (1 - REWARD_TIME_SHARE) for time_limit in penalty_limits)
+    assert all(0 < time_limit <= TIME_LIMIT for time_limit in reward_limits)
+
+
+def test_rolling_windows_follow_the_months_of_a_long_schedule():
+    # 14 months: the August and September of two years are windows of their own
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 411, seed=0, break_length=0, returner_share=1.0)
+    scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff)
+    windows = scheduler.rolling_windows(overlap_days=0)
+
+    assert len(windows) == len(scheduler.calendar.month_names) == 14
+    assert [kept_end - first_day_idx for first_day_idx, kept_end, _ in windows] == (
+        scheduler.calendar.month_lengths())
+    assert windows[-1][1] == scheduler.calendar.num_days
+
+
+def test_warm_start_counts_against_the_time_limit():
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    solver_config = SolverConfig(num_workers=1, max_time_in_seconds=TIME_LIMIT)
+    scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff,
+                              solver_config=solver_config)
+    schedule, _ = scheduler.create_or_model()
+    previous_schedule = {day_schedule.day.date: [ra.name for ra in day_schedule.ras_on] for day_schedule in schedule}
+
+    scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff,
+                              solver_config=solver_config)
+    scheduler.resolve(previous_schedule, start_date + timedelta(days=21))
+
+    hint_stats, penalty_stats = scheduler.solver_stats[:2]
+    assert hint_stats['stage'] == 'hint'
+    assert hint_stats['time_limit'] <= TIME_LIMIT
+    # the penalty stage only gets its share of what the hint left
+    assert penalty_stats['stage'] == 'penalty'
+    assert penalty_stats['time_limit'] <= (TIME_LIMIT - hint_stats['wall_time']) * (1 - REWARD_TIME_SHARE)
+
+
+def test_reward_stage_keeps_its_share_of_the_time_limit():
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff,
+                              solver_config=SolverConfig(num_workers=1, max_time_in_seconds=TIME_LIMIT))
+    scheduler.create_or_model()
+    time_limits = {stats['stage']: stats['time_limit'] for stats in scheduler.solver_stats}
+
+    # the penalty stage has no time limit of its own, but cannot take the time of the reward stage
+    assert time_limits['penalty'] <= TIME_LIMIT * (1 - REWARD_TIME_SHARE)
+    assert 0 < time_limits['reward'] <= TIME_LIMIT
@@ -0,0 +1,39 @@
+import time
+from datetime import date, timedelta
+from feasibility import explain_infeasibility
+from ra_models import Ra
+from schedule_models import Calendar
+from solver_config import SolverConfig
+
+
+def infeasible_inputs(num_days: int):
+    '''
+    Every RA can work every day, but together they can only earn half the points of the shifts
+    '''
+    start_date = date(2024, 9, 2)
+    days = Calendar(start_date, start_date + timedelta(days=num_days - 1)).days()
+    ras = [Ra(name=f'RA {ra_idx}') for ra_idx in range(4)]
+    total_pts = sum(day.pts * day.ppl for day in days)
+    max_pts = total_pts // len(ras) // 2
+    return {day: ras for day in days}, {ra: (0, max_pts) for ra in ras}, {}
+
+
+def test_explanation_is_a_conflicting_set():
+    eligible_ras, pts_bounds, pts_worked = infeasible_inputs(14)
+    conflict = explain_infeasibility(eligible_ras, pts_bounds, pts_worked, SolverConfig(max_time_in_seconds=30.0))
+
+    # the max points of the RAs and just enough days to go over them
+    assert 'at most' in conflict[-1]
+    assert all('at least' not in constraint for constraint in conflict)
+    assert len(conflict) < len(eligible_ras) + len(pts_bounds)
+
+
+def test_explanation_keeps_one_time_limit():
+    inputs = infeasible_inputs(120)
+    start = time.monotonic()
+    conflict = explain_infeasibility(*inputs, SolverConfig(max_time_in_seconds=1.0))
+    elapsed = time.monotonic() - start
+
+    assert elapsed <= 2.0
+    # out of time, the core found so far is the explanation
+    assert len(conflict) > 4
@@ -0,0 +1,145 @@
+import csv
+import os
+import re
+from datetime import date
+import pytest
+from form_cache import CHECKED_ROWS, FormCache
+from instance_generator import generate_availabilities
+from spreadsheet_backends import GoogleSheetsBackend, LocalFileBackend
+from spreadsheet_client import SpreadsheetClient
+
+START_DATE = date(2024, 8, 15)
+TITLES = ['Timestamp', 'Preferred name', 'Move in date', 'Dates you can not do duty', 'Days you can not do duty',
+          'Frontload or backload', 'Returning RA?', 'Have you previously been an RA in this community?']
+
+
+class RecordingBackend(LocalFileBackend):
+    '''
+    Records the ranges read
+    '''
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.ranges = []
+
+    def get_values(self, spreadsheet: str, range_name: str, formulas: bool = False) -> list[list[str]]:
+        self.ranges.append(range_name)
+        return super().get_values(spreadsheet, range_name, formulas)
+
+    def get_row_chunks(self, spreadsheet: str, sheet_title: str, chunk_rows: int = 7):
+        # small chunks, so the responses are parsed a few at a time
+        self.ranges.append(sheet_title)
+        yield from super().get_row_chunks(spreadsheet, sheet_title, chunk_rows)
+
+
+class PagedBackend(GoogleSheetsBackend):
+    '''
+    Reads pages of rows the way the Sheets API does, without the network
+    '''
+
+    def __init__(self, rows: list[list[str]]) -> None:
+        self.rows = rows
+        self.ranges = []
+
+    def get_values(self, spreadsheet: str, range_name: str, formulas: bool = False) -> list[list[str]]:
+        self.ranges.append(range_name)
+        first_row, last_row = map(int, re.fullmatch(r"'Form responses 1'!A(\d+):ZZ(\d+)", range_name).groups())
+        # the empty cells at the end of a row and the empty rows at the end of the range are left out
+        rows = [row[:max((col + 1 for col, value in enumerate(row) if value), default=0)]
+                for row in self.rows[first_row - 1:last_row]]
+        while rows and not rows[-1]:
+            rows = rows[:-1]
+        return rows
+
+
+@pytest.fixture
+def form_rows():
+    availabilities = generate_availabilities(120, START_DATE, date(2024, 12, 15), blackout_density=0.05)
+    return [TITLES] + [
+        ['', availability.name, availability.move_in_date.strftime('%m/%d/%Y'),
+         ', '.join(day.strftime('%m-%d') for day in availability.no_dates),
+         ', '.join(day_of_week.name.capitalize() for day_of_week in availability.no_days),
+         availability.distribution.name.capitalize(), 'Returner' if availability.returner else 'New',
+         'Yes' if availability.community_returner else '']
+        for availability in availabilities]
+
+
+def write_form(path: str, rows: list[list[str]]) -> None:
+    with open(path, 'w', newline='') as form_file:
+        csv.writer(form_file).writerows(rows)
+
+
+def read_form(cache_dir: str, path: str) -> tuple[list, dict, list[str]]:
+    backend = RecordingBackend()
+    client = SpreadsheetClient(START_DATE, 'Test', backend, FormCache(cache_dir))
+    availabilities = client.get_availabilities(path)
+    return [vars(availability) for availability in availabilities], client.timings, backend.ranges
+
+
+def parsed_without_cache(path: str) -> list:
+    return [vars(availability) for availability in
+            SpreadsheetClient(START_DATE, 'Test', LocalFileBackend()).get_availabilities(path)]
+
+
+def test_form_cache_parses_added_responses(form_rows, tmp_path):
+    path = str(tmp_path / 'form.csv')
+    cache_dir = str(tmp_path / 'cache')
+    write_form(path, form_rows[:101])
+    read_form(cache_dir, path)
+
+    # the same file by another path is the same spreadsheet, only the last rows of the snapshot are read again
+    availabilities, timings, ranges = read_form(cache_dir, str(tmp_path / '.' / 'form.csv'))
+    assert availabilities == parsed_without_cache(path)
+    assert ranges == [f"'Form responses 1'!A{101 - CHECKED_ROWS + 1}:ZZ"]
+    assert 'save_form_cache' not in timings
+
+    write_form(path, form_rows)
+    availabilities, timings, ranges = read_form(cache_dir, path)
+    assert availabilities == parsed_without_cache(path)
+    assert len(availabilities) == 120
+    assert ranges == [f"'Form responses 1'!A{101 - CHECKED_ROWS + 1}:ZZ"]
+    assert 'save_form_cache' in timings
+
+    # the snapshot now ends at the last row
+    _, _, ranges = read_form(cache_dir, path)
+    assert ranges == [f"'Form responses 1'!A{121 - CHECKED_ROWS + 1}:ZZ"]
+
+
+def test_form_cache_finds_edited_responses(form_rows, tmp_path):
+    path = str(tmp_path / 'form.csv')
+    cache_dir = str(tmp_path / 'cache')
+    write_form(path, form_rows)
+    read_form(cache_dir, path)
+
+    # an edited response among the last rows of the snapshot
+    form_rows[100][1] = 'Renamed RA'
+    write_form(path, form_rows)
+    availabilities, _, ranges = read_form(cache_dir, path)
+    assert availabilities == parsed_without_cache(path)
+    assert availabilities[99]['name'] == 'Renamed RA'
+    assert ranges[-1] == 'Form responses 1'
+
+    # sorted responses
+    write_form(path, form_rows[:1] + sorted(form_rows[1:], key=lambda row: row[1]))
+    availabilities, _, ranges = read_form(cache_dir, path)
+    assert availabilities == parsed_without_cache(path)
+    assert ranges[-1] == 'Form responses 1'
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_row_chunks_are_the_rows_of_the_sheet(form_rows, tmp_path):
+    # empty rows between the responses are kept, the ones at the end are left out
+    form_rows = form_rows[:60] + [[], []] + form_rows[60:] + [[], ['', ''], []]
+    path = str(tmp_path / 'form.csv')
+    write_form(path, form_rows)
+    backend = LocalFileBackend()
+    rows = backend.get_values(path, 'Form responses 1')
+    chunks = list(backend.get_row_chunks(path, 'Form responses 1', 25))
+    assert [row for chunk in chunks for row in chunk] == rows
+    assert len(chunks) == 5
+
+    # a page ending in the empty rows is followed by the next one
+    backend = PagedBackend(form_rows[:-3])
+    chunks = list(backend.get_row_chunks('form', 'Form responses 1', 31))
+    assert [row for chunk in chunks for row in chunk] == rows
+    assert backend.ranges == [f"'Form responses 1'!A{first_row}:ZZ{first_row + 30}" for first_row in range(1, 156, 31)]
@@ -0,0 +1,43 @@
+import csv
+from datetime import date
+from duty_scheduler import DutyScheduler
+from form_responses import FormResponses
+from instance_generator import generate_instance
+from spreadsheet_backends import LocalFileBackend
+from spreadsheet_client import SpreadsheetClient
+
+TITLES = ['Timestamp', 'Preferred name', 'Move in date', 'Dates you can not do duty', 'Days you can not do duty',
+          'Frontload or backload', 'Returning RA?', 'Have you previously been an RA in this community?']
+
+
+def test_eligibility_from_the_form_columns(tmp_path):
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    form_path = str(tmp_path / 'form.csv')
+    with open(form_path, 'w', newline='') as form_file:
+        csv.writer(form_file).writerows([TITLES] + [
+            ['', availability.name, availability.move_in_date.strftime('%m/%d/%Y'),
+             ', '.join(day.strftime('%m-%d') for day in availability.no_dates),
+             ', '.join(day_of_week.name.capitalize() for day_of_week in availability.no_days),
+             availability.distribution.name.capitalize(), 'Returner' if availability.returner else 'New',
+             'Yes' if availability.community_returner else '']
+            for availability in availabilities])
+    form_responses = SpreadsheetClient(start_date, 'Test', LocalFileBackend()).get_form_responses(form_path)
+
+    from_objects = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff)
+    from_form = DutyScheduler(start_date, end_date, form_responses.availabilities(), holidays, half_staff,
+                              form_responses=form_responses)
+    all_days = list(from_form.day_dict.values())
+    assert from_form.create_eligibility(from_form.create_ras(), all_days) == (
+        from_objects.create_eligibility(from_objects.create_ras(), all_days))
+    assert any(not eligible for eligible in from_form.create_eligibility(from_form.create_ras(), all_days)[0][14:])
+
+
+def test_dates_after_dec_31_are_in_the_next_year():
+    # 2028 is a leap year
+    responses = FormResponses([TITLES, ['', 'RA 1', '12/20/2027', '12-24, 01-02, 02-29', 'Monday']],
+                              date(2027, 12, 20))
+
+    # the bitmap starts at the start date, not at January 1
+    assert responses.no_dates == [1 << 4 | 1 << 13 | 1 << 71]
+    assert responses.availabilities()[0].no_dates == [date(2027, 12, 24), date(2028, 1, 2), date(2028, 2, 29)]
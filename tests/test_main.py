@@ -0,0 +1,78 @@
+import csv
+import os
+from datetime import timedelta
+from instance_generator import generate_instance
+from main import user_input
+from solver_config import SolverConfig
+from spreadsheet_backends import LocalFileBackend
+
+TITLES = ['Timestamp', 'Preferred name', 'Move in date', 'Dates you can not do duty', 'Days you can not do duty',
+          'Frontload or backload', 'Returning RA?', 'Have you previously been an RA in this community?']
+
+
+class FailingPrepareBackend(LocalFileBackend):
+    '''
+    Fails to create the first spreadsheet (the one prepared while the schedule is solved)
+    '''
+
+    def __init__(self, output_dir: str) -> None:
+        super().__init__(output_dir, 'csv')
+        self.num_created = 0
+
+    def create_spreadsheet(self, title: str, sheet_titles: list[str]) -> tuple[str, list[int]]:
+        self.num_created += 1
+        if self.num_created == 1:
+            raise OSError('the spreadsheet could not be created')
+        return super().create_spreadsheet(title, sheet_titles)
+
+
+SOLVER_CONFIG = SolverConfig(num_workers=1, max_time_in_seconds=10.0)
+
+
+def answer_questions(tmp_path, monkeypatch, title: str):
+    '''
+    Writes the form responses of a small fall term and answers the questions of a run with them
+
+    Returns:
+      the first day of duty
+    '''
+    start_date, end_date, availabilities, holidays, _ = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    form_path = str(tmp_path / 'form.csv')
+    with open(form_path, 'w', newline='') as form_file:
+        csv.writer(form_file).writerows([TITLES] + [
+            ['', availability.name, availability.move_in_date.strftime('%m/%d/%Y'),
+             ', '.join(day.strftime('%m-%d') for day in availability.no_dates),
+             ', '.join(day_of_week.name.capitalize() for day_of_week in availability.no_days),
+             availability.distribution.name.capitalize(), 'Returner' if availability.returner else 'New',
+             'Yes' if availability.community_returner else '']
+            for availability in availabilities])
+    answers = iter([str(start_date), str(end_date), ', '.join(map(str, holidays.double_len)), '', '',
+                    form_path, title])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    return start_date
+
+
+def test_schedule_is_published_when_the_spreadsheet_could_not_be_prepared(tmp_path, monkeypatch):
+    answer_questions(tmp_path, monkeypatch, 'Schedule')
+    backend = FailingPrepareBackend(str(tmp_path))
+    user_input(SOLVER_CONFIG, backend=backend)
+
+    assert backend.num_created == 2
+    assert os.path.exists(tmp_path / 'Schedule - Duty.csv')
+    assert len(backend.get_values(str(tmp_path / 'Schedule'), 'Duty')) > 42
+
+
+def test_resolve_reads_the_previous_schedule(tmp_path, monkeypatch):
+    answer_questions(tmp_path, monkeypatch, 'First')
+    backend = LocalFileBackend(str(tmp_path), 'csv')
+    user_input(SOLVER_CONFIG, backend=backend)
+    first = backend.get_values(str(tmp_path / 'First'), 'Duty')
+
+    start_date = answer_questions(tmp_path, monkeypatch, 'Second')
+    user_input(SOLVER_CONFIG, previous_schedule_url=str(tmp_path / 'First'),
+               cutoff_date=start_date + timedelta(days=21), backend=backend)
+    second = backend.get_values(str(tmp_path / 'Second'), 'Duty')
+
+    # nothing changed, so the days before the cutoff are kept
+    assert second[1:22] == first[1:22]
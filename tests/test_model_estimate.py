@@ -0,0 +1,35 @@
+from instance_generator import generate_instance
+from duty_scheduler import DutyScheduler
+from model_estimate import estimate_model
+from solver_config import SolverConfig
+
+
+def scheduler_and_eligibility():
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff,
+                              solver_config=SolverConfig(num_workers=1, max_time_in_seconds=5.0))
+    all_ras = scheduler.create_ras()
+    scheduler.revise_total_pts()
+    eligibility = scheduler.create_eligibility(all_ras, list(scheduler.day_dict.values()))
+    return scheduler, all_ras, eligibility
+
+
+def test_points_family_of_the_whole_schedule():
+    scheduler, all_ras, eligibility = scheduler_and_eligibility()
+    scheduler.schedule_days(all_ras, eligibility=eligibility)
+    estimate = estimate_model(eligibility, scheduler.calendar.ppl, 0, scheduler.calendar.num_days)
+
+    # only the max and min points of every RA, no balance between windows
+    assert estimate.families['points'] == scheduler.model_size['families']['points']
+    assert estimate.families['points']['variables'] == 0
+
+
+def test_points_family_of_a_window():
+    scheduler, all_ras, eligibility = scheduler_and_eligibility()
+    scheduler.schedule_days(all_ras, last_day_idx=21, eligibility=eligibility)
+    estimate = estimate_model(eligibility, scheduler.calendar.ppl, 0, 21)
+
+    # the points off target of every RA and the most points ahead
+    assert estimate.families['points'] == scheduler.model_size['families']['points']
+    assert estimate.families['points']['variables'] == 1 + len(all_ras)
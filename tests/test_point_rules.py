@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+import pytest
+from constants import DaysOfWeek, Semester, WEEKENDS
+from duty_scheduler import DutyScheduler
+from ra_models import Holidays, RaAvailability
+
+
+def old_revise_total_pts(scheduler: DutyScheduler, holidays: Holidays) -> tuple[dict[date, int], int, set[date]]:
+    '''
+    The points and the break days as revise_total_pts calculated them before the point rules
+    (the day before every holiday gets a point, the break and the day before it get points in the fall and spring)
+    '''
+    pts = {day.date: day.pts for day in scheduler.day_dict.values()}
+    ppl = {day.date: day.ppl for day in scheduler.day_dict.values()}
+    breaks = list(holidays.breaks)
+    for holiday in holidays.double_len:
+        pts[holiday - timedelta(days=1)] += 1
+    if scheduler.semester_type != Semester.SUMMER and breaks:
+        breaks.insert(0, breaks[0] - timedelta(days=1))
+        for break_day in breaks:
+            day_of_week = scheduler.day_dict[break_day].day_of_week
+            if scheduler.semester_type == Semester.SPRING or (
+                    day_of_week in [DaysOfWeek.SUNDAY, DaysOfWeek.TUESDAY] or day_of_week in WEEKENDS):
+                pts[break_day] += 1
+            else:
+                pts[break_day] += 2
+    return pts, sum(pts[day] * ppl[day] for day in pts), set(breaks)
+
+
+SEMESTERS = [
+    # Martin Luther King Jr. Day and spring break
+    (date(2024, 1, 8), date(2024, 5, 5), [date(2024, 1, 15)], date(2024, 3, 9), 9),
+    # Independence Day and a week off
+    (date(2024, 5, 13), date(2024, 8, 10), [date(2024, 7, 4)], date(2024, 6, 17), 7),
+    # Labor Day and Thanksgiving break
+    (date(2024, 8, 15), date(2024, 12, 12), [date(2024, 9, 2)], date(2024, 11, 27), 5),
+]
+
+
+@pytest.mark.parametrize('start_date, end_date, holidays, break_start, break_length', SEMESTERS)
+def test_point_rules_match_old_points(start_date, end_date, holidays, break_start, break_length):
+    breaks = [break_start + timedelta(days=day) for day in range(break_length)]
+    scheduler = DutyScheduler(start_date, end_date, [], Holidays(list(holidays), list(breaks)), [])
+    expected_pts, expected_total, expected_breaks = old_revise_total_pts(scheduler, Holidays(holidays, breaks))
+
+    # the points do not change when they are revised again
+    for _ in range(2):
+        scheduler.revise_total_pts()
+        assert {day.date: day.pts for day in scheduler.day_dict.values()} == expected_pts
+        assert scheduler.total_pts == expected_total
+        assert {day.date for day in scheduler.day_dict.values() if scheduler.is_break[day.idx]} == expected_breaks
+
+
+def test_summer_break_is_half_staff_only():
+    start_date, end_date = date(2024, 5, 13), date(2024, 6, 30)
+    break_days = [date(2024, 6, 17) + timedelta(days=day) for day in range(7)]
+    availabilities = [RaAvailability('Half', date(2024, 5, 1), [], [], returner=True, community_returner=True),
+                      RaAvailability('Full', date(2024, 5, 1), [], [], returner=True, community_returner=True)]
+    scheduler = DutyScheduler(start_date, end_date, availabilities, Holidays([], break_days), ['Half'])
+    assert scheduler.semester_type == Semester.SUMMER
+    scheduler.revise_total_pts()
+
+    all_days = list(scheduler.day_dict.values())
+    eligibility = scheduler.create_eligibility(scheduler.create_ras(), all_days)
+    for day_idx, day in enumerate(all_days):
+        assert eligibility[0][day_idx]
+        assert eligibility[1][day_idx] == (day.date not in break_days)
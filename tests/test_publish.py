@@ -0,0 +1,66 @@
+from datetime import timedelta
+import pytest
+from duty_scheduler import DutyScheduler
+from instance_generator import generate_instance
+from ra_models import Holidays
+from schedule_snapshot import ScheduleSnapshot
+from solver_config import SolverConfig
+from spreadsheet_backends import LocalFileBackend
+from spreadsheet_client import SpreadsheetClient
+
+SOLVER_CONFIG = SolverConfig(num_workers=1, max_time_in_seconds=10.0)
+
+
+@pytest.fixture(scope='module')
+def resolved():
+    '''
+    A schedule re-solved after an RA who worked before the cutoff left the staff
+    '''
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    scheduler = DutyScheduler(start_date, end_date, availabilities, Holidays(list(holidays.double_len), []),
+                              half_staff, solver_config=SOLVER_CONFIG)
+    schedule, _ = scheduler.create_or_model()
+    previous_schedule = {day_schedule.day.date: [ra.name for ra in day_schedule.ras_on] for day_schedule in schedule}
+    departed = schedule[0].ras_on[0].name
+
+    staff = [availability for availability in availabilities if availability.name != departed]
+    scheduler = DutyScheduler(start_date, end_date, staff, Holidays(list(holidays.double_len), []),
+                              half_staff, solver_config=SOLVER_CONFIG)
+    schedule, ras = scheduler.resolve(previous_schedule, start_date + timedelta(days=21))
+    return scheduler, schedule, ras, departed
+
+
+def per_ra_rows(backend: LocalFileBackend, spreadsheet_id: str) -> dict[str, list[str]]:
+    return {row[0]: row for row in backend.get_values(spreadsheet_id, 'Per RA')[1:]}
+
+
+def test_publish_after_resolve_with_departed_ra(resolved, tmp_path):
+    scheduler, schedule, ras, departed = resolved
+    backend = LocalFileBackend(str(tmp_path), 'csv')
+    client = SpreadsheetClient(scheduler.start_date, 'Resolved', backend)
+    spreadsheet_id = client.publish(schedule, ras, scheduler.days_per_month)
+
+    published = client.get_schedule(spreadsheet_id)
+    assert departed in published[scheduler.start_date]
+    rows = per_ra_rows(backend, spreadsheet_id)
+    # every name on the Duty sheet has a row on the Per RA sheet, with the points of the shifts on the Duty sheet
+    assert {name for names in published.values() for name in names} <= set(rows)
+    departed_pts = sum(day_schedule.day.pts for day_schedule in schedule
+                       if departed in [ra.name for ra in day_schedule.ras_on])
+    assert int(rows[departed][4]) == departed_pts
+    assert rows[departed][6] == 'No'
+
+    # publishing the same schedule over itself changes nothing
+    assert client.republish(spreadsheet_id, schedule, ras) == 0
+
+
+def test_publish_snapshot_with_departed_ra(resolved, tmp_path):
+    scheduler, schedule, ras, departed = resolved
+    snapshot = scheduler.save_snapshot(str(tmp_path / 'run.snapshot'), schedule, ras)
+    loaded = ScheduleSnapshot.load(str(tmp_path / 'run.snapshot'))
+
+    backend = LocalFileBackend(str(tmp_path), 'csv')
+    client = SpreadsheetClient(snapshot.start_date, 'Snapshot', backend)
+    spreadsheet_id = client.publish_snapshot(loaded, live_formulas=False)
+    assert departed in per_ra_rows(backend, spreadsheet_id)
@@ -0,0 +1,63 @@
+from datetime import date
+import pytest
+from duty_scheduler import DutyScheduler
+from instance_generator import generate_instance
+from ra_models import Holidays
+from schedule_snapshot import ScheduleSnapshot
+from solver_config import SolverConfig
+
+SOLVER_CONFIG = SolverConfig(num_workers=1, max_time_in_seconds=10.0)
+
+
+@pytest.fixture(scope='module')
+def solved():
+    '''
+    A solved schedule with a holiday and a break day
+    '''
+    start_date, end_date, availabilities, holidays, half_staff = generate_instance(
+        12, 42, seed=0, break_length=0, returner_share=1.0)
+    holidays = Holidays(list(holidays.double_len), [date(2024, 9, 20)])
+    scheduler = DutyScheduler(start_date, end_date, availabilities, holidays, half_staff,
+                              solver_config=SOLVER_CONFIG)
+    schedule, ras = scheduler.create_or_model()
+    return scheduler, schedule, ras
+
+
+def day_rows(schedule) -> list[tuple]:
+    return [(day_schedule.day.date, day_schedule.day.ppl, day_schedule.day.pts,
+             [ra.name for ra in day_schedule.ras_on]) for day_schedule in schedule]
+
+
+def test_snapshot_round_trip(solved, tmp_path):
+    scheduler, schedule, ras = solved
+    path = str(tmp_path / 'run.snapshot')
+    scheduler.save_snapshot(path, schedule, ras)
+    snapshot = ScheduleSnapshot.load(path)
+
+    assert (snapshot.start_date, snapshot.end_date) == (scheduler.start_date, scheduler.end_date)
+    assert snapshot.half_staff == scheduler.half_staff
+    assert ([vars(availability) for availability in snapshot.availabilities()] ==
+            [vars(availability) for availability in scheduler.ra_availabilities])
+    holidays = snapshot.holidays()
+    assert (holidays.double_len, holidays.breaks) == (scheduler.holidays.double_len, scheduler.holidays.breaks)
+
+    loaded_schedule, loaded_ras = snapshot.schedule()
+    assert day_rows(loaded_schedule) == day_rows(schedule)
+    assert [(ra.name, ra.pts, ra.half_staff) for ra in loaded_ras] == [(ra.name, ra.pts, ra.half_staff) for ra in ras]
+    assert snapshot.previous_schedule() == {day_schedule.day.date: [ra.name for ra in day_schedule.ras_on]
+                                            for day_schedule in schedule}
+    assert snapshot.days_per_month() == scheduler.days_per_month
+
+
+def test_snapshot_saved_again_is_the_same_file(solved, tmp_path):
+    scheduler, schedule, ras = solved
+    first_path = str(tmp_path / 'first.snapshot')
+    scheduler.save_snapshot(first_path, schedule, ras)
+
+    # a snapshot made from the loaded inputs and schedule writes the same bytes
+    snapshot = ScheduleSnapshot.load(first_path)
+    loaded_schedule, loaded_ras = snapshot.schedule()
+    second_path = str(tmp_path / 'second.snapshot')
+    DutyScheduler.from_snapshot(snapshot).save_snapshot(second_path, loaded_schedule, loaded_ras)
+    with open(first_path, 'rb') as first_file, open(second_path, 'rb') as second_file:
+        assert first_file.read() == second_file.read()
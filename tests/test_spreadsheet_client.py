@@ -0,0 +1,60 @@
+from datetime import date
+from ra_models import Ra
+from schedule_models import Calendar, ScheduleDay
+from spreadsheet_backends import LocalFileBackend
+from spreadsheet_client import SpreadsheetClient, changed_cells_requests
+
+
+def run_of(request: dict) -> tuple[int, int, list]:
+    update = request['updateCells']
+    return (update['start']['rowIndex'], update['start']['columnIndex'],
+            [cell.get('userEnteredValue') for cell in update['rows'][0]['values']])
+
+
+def test_no_changed_cells_make_no_requests():
+    assert changed_cells_requests('0', {}) == []
+
+
+def test_changed_cells_are_written_in_runs_of_neighbouring_cells():
+    changed = {
+        (1, 4): 'C', (1, 2): 'A', (1, 3): 'B',
+        # a gap in the row starts a new run
+        (1, 6): 2,
+        # the next row starts a new run, even right after the last cell of the row above
+        (2, 7): '',
+        (3, 0): '=SUM(A1:A2)',
+    }
+    requests = changed_cells_requests('7', changed)
+
+    assert all(request['updateCells']['start']['sheetId'] == '7' for request in requests)
+    assert [run_of(request) for request in requests] == [
+        (1, 2, [{'stringValue': 'A'}, {'stringValue': 'B'}, {'stringValue': 'C'}]),
+        (1, 6, [{'numberValue': 2}]),
+        (2, 7, [None]),
+        (3, 0, [{'formulaValue': '=SUM(A1:A2)'}]),
+    ]
+
+
+def test_schedule_dates_after_dec_31_are_in_the_next_year():
+    client = SpreadsheetClient(date(2024, 8, 15), 'Test', LocalFileBackend())
+
+    assert client.parse_schedule_date('Aug 15') == date(2024, 8, 15)
+    assert client.parse_schedule_date('Dec 31') == date(2024, 12, 31)
+    assert client.parse_schedule_date('Jan 05') == date(2025, 1, 5)
+    assert client.parse_schedule_date('05/01/2025') == date(2025, 5, 1)
+
+
+def test_schedule_across_dec_31_reads_back(tmp_path):
+    # the Duty sheet of a fall term that runs into January
+    ras = [Ra(name=f'RA {ra_idx}') for ra_idx in range(4)]
+    schedule = []
+    for day in Calendar(date(2024, 12, 20), date(2025, 1, 10)).days():
+        day_schedule = ScheduleDay(day)
+        for shift_idx in range(day.ppl):
+            day_schedule.add_ra(ras[(day.idx + shift_idx) % len(ras)])
+        schedule.append(day_schedule)
+    client = SpreadsheetClient(date(2024, 12, 20), 'New Year', LocalFileBackend(str(tmp_path), 'csv'))
+    spreadsheet_id = client.publish(schedule, ras, Calendar(date(2024, 12, 20), date(2025, 1, 10)).days_per_month())
+
+    assert client.get_schedule(spreadsheet_id) == {
+        day_schedule.day.date: [ra.name for ra in day_schedule.ras_on] for day_schedule in schedule}
@@ -0,0 +1,122 @@
+from datetime import date
+from feasibility import MaxFlowGraph
+from schedule_models import Day
+from ra_models import Ra
+
+
+def create_warm_start(ras: list[Ra], days: list[Day], eligibility: list[list[bool]],
+                      min_pts: int, max_pts: int) -> dict[date, list[str]]:
+    '''
+    Quickly creates a schedule that fills every shift and keeps the RAs close to the points range,
+    used as a hint so the solver does not have to search for a first solution
+
+    The shifts are filled greedily (days with the fewest eligible RAs first, RAs furthest behind first),
+    shifts left empty are filled with a max flow on top of the greedy schedule,
+    then shifts are moved from RAs above the points range to RAs below it
+
+    Parameters:
+      ras - list of RA objects
+      days - list of day objects in date order
+      eligibility - the RA x day eligibility matrix
+      min_pts - min points per RA
+      max_pts - max points per RA
+
+    Returns:
+      the schedule: key -> date, value -> names of the RAs on duty
+    '''
+    num_ras = len(ras)
+    num_days = len(days)
+    days_per_week = 7
+    on_duty = [[False] * num_days for _ in range(num_ras)]
+    pts = [0] * num_ras
+    # points of the eligible days not filled yet
+    pts_left = [sum(day.pts for day, eligible in zip(days, row) if eligible) for row in eligibility]
+    shifts_per_week = {}
+    eligible_ras = [[ra_idx for ra_idx in range(num_ras) if eligibility[ra_idx][day_idx]]
+                    for day_idx in range(num_days)]
+
+    def is_adjacent(ra_idx: int, day_idx: int) -> bool:
+        return ((day_idx > 0 and on_duty[ra_idx][day_idx - 1]) or
+                (day_idx < num_days - 1 and on_duty[ra_idx][day_idx + 1]))
+
+    def assign(ra_idx: int, day_idx: int, on: bool) -> None:
+        on_duty[ra_idx][day_idx] = on
+        change = 1 if on else -1
+        pts[ra_idx] += days[day_idx].pts * change
+        week = (ra_idx, day_idx // days_per_week)
+        shifts_per_week[week] = shifts_per_week.get(week, 0) + change
+
+    # greedy: the days with the fewest eligible RAs per shift first
+    for day_idx in sorted(range(num_days), key=lambda day_idx: len(eligible_ras[day_idx]) / days[day_idx].ppl):
+        day = days[day_idx]
+        candidates = [ra_idx for ra_idx in eligible_ras[day_idx] if pts[ra_idx] + day.pts <= max_pts]
+        # avoid consecutive days and more than 2 shifts a week, then take the RAs
+        # who need the most of the points they can still get
+        candidates.sort(key=lambda ra_idx: (is_adjacent(ra_idx, day_idx),
+                                            shifts_per_week.get((ra_idx, day_idx // days_per_week), 0) >= 2,
+                                            -(min_pts - pts[ra_idx]) / pts_left[ra_idx]))
+        for ra_idx in candidates[:day.ppl]:
+            assign(ra_idx, day_idx, True)
+        for ra_idx in eligible_ras[day_idx]:
+            pts_left[ra_idx] -= day.pts
+
+    # max flow: fill the empty shifts by moving greedy shifts along augmenting paths,
+    # every RA can take as many more of their cheapest days as fit under the max points
+    if any(sum(on_duty[ra_idx][day_idx] for ra_idx in eligible_ras[day_idx]) < days[day_idx].ppl
+           for day_idx in range(num_days)):
+        source = 0
+        sink = num_ras + num_days + 1
+        graph = MaxFlowGraph(sink + 1)
+        for ra_idx, row in enumerate(eligibility):
+            shifts = sum(on_duty[ra_idx])
+            room = max_pts - pts[ra_idx]
+            for day_pts in sorted(day.pts for day, eligible in zip(days, row) if eligible):
+                if day_pts > room:
+                    break
+                room -= day_pts
+                shifts += 1
+            graph.add_edge(source, ra_idx + 1, shifts, sum(on_duty[ra_idx]))
+            for day_idx in range(num_days):
+                if row[day_idx]:
+                    graph.add_edge(ra_idx + 1, num_ras + 1 + day_idx, 1, int(on_duty[ra_idx][day_idx]))
+        for day_idx, day in enumerate(days):
+            filled = sum(on_duty[ra_idx][day_idx] for ra_idx in eligible_ras[day_idx])
+            graph.add_edge(num_ras + 1 + day_idx, sink, day.ppl, filled)
+        graph.max_flow(source, sink)
+        for ra_idx, row in enumerate(eligibility):
+            for day_idx in range(num_days):
+                on = row[day_idx] and graph.residual(ra_idx + 1, num_ras + 1 + day_idx) == 0
+                if on != on_duty[ra_idx][day_idx]:
+                    assign(ra_idx, day_idx, on)
+
+    # repair: move shifts while it brings the RAs closer to the points range
+    def off_range(ra_pts: int) -> int:
+        return max(min_pts - ra_pts, 0) + max(ra_pts - max_pts, 0)
+
+    moved = True
+    while moved:
+        moved = False
+        for ra_idx in range(num_ras):
+            if off_range(pts[ra_idx]) == 0:
+                continue
+            for day_idx in range(num_days):
+                if not eligibility[ra_idx][day_idx]:
+                    continue
+                day_pts = days[day_idx].pts
+                for other_idx in eligible_ras[day_idx]:
+                    # give the shift to whichever of the two RAs is taking it from the other
+                    if on_duty[ra_idx][day_idx] == on_duty[other_idx][day_idx]:
+                        continue
+                    giver, taker = (other_idx, ra_idx) if on_duty[other_idx][day_idx] else (ra_idx, other_idx)
+                    before = off_range(pts[giver]) + off_range(pts[taker])
+                    after = off_range(pts[giver] - day_pts) + off_range(pts[taker] + day_pts)
+                    if after < before:
+                        assign(giver, day_idx, False)
+                        assign(taker, day_idx, True)
+                        moved = True
+                        break
+                if off_range(pts[ra_idx]) == 0:
+                    break
+
+    return {day.date: [ras[ra_idx].name for ra_idx in range(num_ras) if on_duty[ra_idx][day_idx]]
+            for day_idx, day in enumerate(days)}